@@ -14,6 +14,9 @@ from django.db import models
 
 from accounts.singleton import SingletonModel
 
+# Auth group id -> operation group of the technicians in it
+TECH_GROUP_NAMES = {1: None, 2: "MO", 3: "CA", 4: "CE", 5: "DE"}
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(cls, self, email, password, **other_fields):
@@ -104,10 +107,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         return f"{self.email}"
 
     def get_tech_group(self) -> Optional[str]:
-        group_names = { 1: None, 2: "MO", 3: "CA", 4: "CE", 5: "DE" }
         groups = self.groups.values("id")
         if len(groups) > 0:
-            return group_names[groups[0]["id"]]
+            return TECH_GROUP_NAMES[groups[0]["id"]]
         return
 
 
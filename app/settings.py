@@ -231,3 +231,18 @@ CACHES = {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
+
+# Worker processes for the CPU-bound planning, one per operation group is enough
+PLANNER_PROCESSES = int(os.getenv("PLANNER_PROCESSES", 4))
+# Background threads running the plan generation jobs
+PLAN_JOB_THREADS = int(os.getenv("PLAN_JOB_THREADS", 1))
+# Unfinished plan jobs older than this are not waited for anymore
+PLAN_JOB_TIMEOUT = timedelta(minutes=10)
+# Finished plans older than this are built again: their slots start from the moment they were planned
+PLAN_RESULT_TTL = timedelta(minutes=int(os.getenv("PLAN_RESULT_TTL_MINUTES", 15)))
+# Only the orders due within this period from now are re-planned, the later ones keep their place
+PLANNING_HORIZON = timedelta(days=int(os.getenv("PLANNING_HORIZON_DAYS", 60)))
+# Operations considered for pulling forward into the time released by a cancelled order or defective works
+BACKFILL_CANDIDATES = int(os.getenv("BACKFILL_CANDIDATES", 200))
+# Directory to write the planner inputs to for the replay_plan command, nothing is written if empty
+PLAN_CAPTURE_DIR = os.getenv("PLAN_CAPTURE_DIR", "")
@@ -2,9 +2,10 @@ import enum
 from datetime import datetime, timedelta
 
 from django.core.management.base import BaseCommand
+from django.db import connection
 from django.utils import timezone
 
-from operations.models import Operation
+from operations.models import ALLOW_DOUBLE_BOOKING_SETTING, Operation
 from orders.models import Order
 from works.models import Work
 
@@ -76,6 +77,10 @@ class Command(BaseCommand):
 
         print("Start loading data")
 
+        # The demonstration schedule has overlapping operations on purpose, to show the schedule errors
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config(%s, 'on', FALSE)", [ALLOW_DOUBLE_BOOKING_SETTING])
+
         Operation.objects.all().delete()
         Work.objects.all().delete()
         Order.objects.all().delete()
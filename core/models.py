@@ -1,4 +1,5 @@
-from django.db import models
+import pgtrigger
+from django.db import connection, models
 
 
 class BaseModel(models.Model):
@@ -6,3 +7,40 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class ScheduleVersion(models.Model):
+    """
+    Counter bumped by database triggers whenever the data the schedule is built from changes.
+    Results computed from the same version are computed from the same data. The counter is the sequence
+    of the table ids: nextval takes no row lock, so the writers of the schedule tables are not serialized
+    behind one row. No rows are stored.
+    """
+
+    class Meta:
+        verbose_name = "Версия расписания"
+        verbose_name_plural = "Версии расписания"
+
+    @classmethod
+    def current(cls) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, 'id')::regclass)", [cls._meta.db_table]
+            )
+            return cursor.fetchone()[0] or 0
+
+
+def schedule_version_trigger(*fields: str) -> pgtrigger.Trigger:
+    """
+    Bumps ScheduleVersion after a change of a row of the table, or only after a change of one of `fields`.
+    The bump is deferred to the commit, so the new version is not seen long before the data it stands for.
+    """
+    table = ScheduleVersion._meta.db_table
+    return pgtrigger.Trigger(
+        name="bump_schedule_version",
+        when=pgtrigger.After,
+        operation=pgtrigger.UpdateOf(*fields) if fields else pgtrigger.Insert | pgtrigger.Update | pgtrigger.Delete,
+        condition=pgtrigger.AnyChange(*fields) if fields else None,
+        timing=pgtrigger.Deferred,
+        func=f"PERFORM nextval(pg_get_serial_sequence('{table}', 'id')); RETURN NULL;",
+    )
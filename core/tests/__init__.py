@@ -1 +1,2 @@
 from .base_testcase import *
+from .schedule_testcase import *
@@ -0,0 +1,86 @@
+from datetime import date, datetime, time, timedelta
+
+import pytz
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from operations.models import Operation
+from orders.models import Order, OrderStatus
+from works.models import Work, WorkStatus, WorkType
+from works.service import WorkService
+
+
+class ScheduleDataMixin:
+    """
+    Reference data of the lab: technicians of every group, statuses, work and operation types.
+    """
+
+    admin_email = "admin@gmail.com"
+    doctor_email = "doctor@gmail.com"
+
+    url: str = "/api"
+
+    fixtures: list[str] = [
+        "./accounts/fixtures/groups.json",
+        "./accounts/fixtures/users.json",
+        "./core/fixtures/statuses.json",
+        "./core/fixtures/object_types.json",
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(email=self.admin_email))
+
+    @staticmethod
+    def fire_deferred_triggers() -> None:
+        """
+        Runs the triggers deferred to the commit, e.g. the schedule version bump, inside the test transaction.
+        """
+        connection.check_constraints()
+
+    @staticmethod
+    def next_monday(weeks: int = 1) -> date:
+        today = date.today()
+        return today + timedelta(days=7 * weeks - today.weekday())
+
+    @staticmethod
+    def moment(day: date, hour: int, minute: int = 0) -> datetime:
+        return datetime.combine(day, time(hour, minute), tzinfo=pytz.UTC)
+
+    @staticmethod
+    def create_order(deadline: date, *work_types: str, amount: int = 1, status_number: int = 3) -> Order:
+        """
+        Creates the order with one work of every named work type and generates their operations.
+        """
+        doctor = User.objects.get(email=ScheduleDataMixin.doctor_email)
+        order = Order.objects.create(
+            user=doctor,
+            customer=doctor.customers.first(),
+            status=OrderStatus.objects.get(number=status_number),
+            deadline=deadline,
+        )
+        for work_type in work_types:
+            Work.objects.create(
+                work_type=WorkType.objects.get(name=work_type),
+                work_status=WorkStatus.get_default_status(),
+                order=order,
+                amount=amount,
+            )
+        WorkService.generate_operations(order)
+        return order
+
+    @staticmethod
+    def order_operations(order: Order) -> list[Operation]:
+        return list(Operation.objects.filter(work__order=order).order_by("work__work_type__name", "ordinal_number"))
+
+
+class ScheduleTestCase(ScheduleDataMixin, TestCase):
+    pass
+
+
+class ScheduleTransactionTestCase(ScheduleDataMixin, TransactionTestCase):
+    """
+    Runs every test outside of a wrapping transaction, so the deferred database checks fire on commit.
+    """
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from core.admin import BaseModelAdmin, BaseStatusAdmin
-from operations.models import OperationStatus, Operation, OperationType
+from operations.models import OperationStatus, Operation, OperationType, WorkShift, Holiday, TechnicianAbsence, PlanJob
 
 admin.site.register(OperationStatus, BaseStatusAdmin)
 
@@ -13,3 +13,31 @@ class OperationAdmin(BaseModelAdmin):
 
 
 admin.site.register(Operation, OperationAdmin)
+
+
+class WorkShiftAdmin(BaseModelAdmin):
+    list_display = ["weekday", "start", "end", "break_start", "break_end"]
+
+
+admin.site.register(WorkShift, WorkShiftAdmin)
+
+
+class HolidayAdmin(BaseModelAdmin):
+    list_display = ["date", "name"]
+
+
+admin.site.register(Holiday, HolidayAdmin)
+
+
+class TechnicianAbsenceAdmin(BaseModelAdmin):
+    list_display = ["tech", "start", "end", "reason"]
+
+
+admin.site.register(TechnicianAbsence, TechnicianAbsenceAdmin)
+
+
+class PlanJobAdmin(BaseModelAdmin):
+    list_display = ["created_at", "mode", "status", "progress", "snapshot_version"]
+
+
+admin.site.register(PlanJob, PlanJobAdmin)
@@ -0,0 +1,245 @@
+import os
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, Iterator
+
+import django
+import pytz
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+
+from accounts.models import TECH_GROUP_NAMES, User
+from operations.models import Operation, OperationStatus, WorkTypeOperationType
+from operations.scheduling import WorkCalendar
+from operations.service import OperationService
+from orders.models import Order, OrderStatus
+from works.models import Work, WorkStatus, WorkType
+
+BENCHMARK_EMAIL_DOMAIN = "benchmark.local"
+# Orders assigned by one call of the batch assignment
+ASSIGNMENT_BATCH_SIZE = 20
+# Reference data loaded into the benchmark database
+BENCHMARK_FIXTURES = [
+    "./accounts/fixtures/groups.json",
+    "./core/fixtures/statuses.json",
+    "./core/fixtures/object_types.json",
+]
+
+# Name of the database created by benchmark_database, None outside of it
+_benchmark_database: str | None = None
+
+
+@dataclass
+class BacklogParams:
+    orders: int = 100
+    works_per_order: int = 3
+    techs_per_group: int = 3
+    # Deadlines are spread uniformly over this many days from today
+    deadline_days: int = 14
+    seed: int = 0
+
+
+@dataclass
+class Measurement:
+    name: str
+    orders: int
+    operations: int
+    # Wall time of every timed run, in milliseconds
+    times: list[float] = field(default_factory=list)
+    queries: int = 0
+    peak_memory_kb: int = 0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["time_ms"] = {
+            "median": round(statistics.median(self.times), 2),
+            "min": round(min(self.times), 2),
+            "max": round(max(self.times), 2),
+        }
+        del data["times"]
+        return data
+
+
+def generate_backlog(params: BacklogParams) -> list[Order]:
+    """
+    Creates technicians, orders, works and their operations with bulk_create. The operations get
+    an initial schedule: every technician takes the operations of his group one after another.
+    """
+    rng = random.Random(params.seed)
+    calendar = WorkCalendar.load()
+    now = datetime.now(tz=pytz.UTC)
+    today = now.date()
+
+    techs: dict[str, list[User]] = {}
+    memberships = []
+    for group_id, group in TECH_GROUP_NAMES.items():
+        if group is None:
+            continue
+        techs[group] = [
+            User(email=f"{group.lower()}{number}-{params.seed}@{BENCHMARK_EMAIL_DOMAIN}", first_name=group,
+                 last_name=str(number))
+            for number in range(params.techs_per_group)
+        ]
+        memberships += [User.groups.through(user=tech, group_id=group_id) for tech in techs[group]]
+    User.objects.bulk_create([tech for group_techs in techs.values() for tech in group_techs])
+    User.groups.through.objects.bulk_create(memberships)
+
+    doctor = User.objects.create(email=f"doctor-{params.seed}@{BENCHMARK_EMAIL_DOMAIN}")
+    order_status = OrderStatus.get_default_status()
+    work_status = WorkStatus.get_default_status()
+    operation_status = OperationStatus.get_default_status()
+
+    steps: dict = {}
+    for step in WorkTypeOperationType.objects.select_related("operation_type").order_by("ordinal_number"):
+        steps.setdefault(step.work_type_id, []).append(step)
+    work_types = list(WorkType.objects.filter(id__in=steps.keys()))
+    if not work_types:
+        raise ValueError("No work types with operations to generate the backlog from")
+
+    orders = [
+        Order(
+            user=doctor,
+            status=order_status,
+            deadline=today + timedelta(days=rng.randint(1, params.deadline_days)),
+            tooth_color="A1",
+            comment="benchmark",
+        )
+        for _ in range(params.orders)
+    ]
+    Order.objects.bulk_create(orders)
+
+    works = [
+        Work(work_type=rng.choice(work_types), work_status=work_status, order=order, amount=rng.randint(1, 6))
+        for order in orders
+        for _ in range(params.works_per_order)
+    ]
+    Work.objects.bulk_create(works)
+
+    cursors = {tech.id: now for group_techs in techs.values() for tech in group_techs}
+    operations = []
+    for work in works:
+        ready = now
+        for step in steps[work.work_type_id]:
+            tech = rng.choice(techs[step.operation_type.group])
+            duration = step.operation_type.get_exec_duration(work.amount)
+            start, end = calendar.fit(max(ready, cursors[tech.id]), duration)
+            cursors[tech.id] = ready = end + timedelta(minutes=5)
+            operations.append(Operation(
+                work=work,
+                operation_type=step.operation_type,
+                operation_status=operation_status,
+                ordinal_number=step.ordinal_number,
+                tech=tech,
+                exec_start=start,
+            ))
+    Operation.objects.bulk_create(operations, batch_size=1000)
+    return orders
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries, unlike the debug query log it has no size limit.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(name: str, func: Callable, params: BacklogParams, operations: int, repeat: int) -> Measurement:
+    """
+    Times `repeat` runs of `func`, then runs it once more counting the SQL queries and tracing the peak memory.
+    """
+    measurement = Measurement(name=name, orders=params.orders, operations=operations)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        measurement.times.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            func()
+        measurement.queries = counter.count
+        measurement.peak_memory_kb = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+    return measurement
+
+
+@contextmanager
+def benchmark_database() -> Iterator[None]:
+    """
+    Switches the connection to a new test database with the reference data only and drops it on exit,
+    so the benchmark never locks or deletes the rows of the real database.
+    """
+    global _benchmark_database
+    old_name = connection.settings_dict["NAME"]
+    _benchmark_database = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        call_command("loaddata", *BENCHMARK_FIXTURES, verbosity=0)
+        yield
+    finally:
+        _benchmark_database = None
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def run_suite(params: BacklogParams, repeat: int = 3, time_budget: float = 1.0) -> list[Measurement]:
+    """
+    Generates a backlog of `params` on top of an empty schedule and measures the planners and the schedule
+    views on it. Runs only inside benchmark_database; everything is rolled back afterwards.
+    """
+    if _benchmark_database is None or connection.settings_dict["NAME"] != _benchmark_database:
+        raise RuntimeError("The benchmark runs only on the database created by benchmark_database")
+
+    with transaction.atomic():
+        orders = generate_backlog(params)
+        operations = Operation.objects.count()
+        date = datetime.now(tz=pytz.UTC).strftime("%d.%m.%Y")
+        tech_email = (
+            User.objects
+            .filter(email__endswith=BENCHMARK_EMAIL_DOMAIN, groups__isnull=False)
+            .values_list("email", flat=True)
+            .first()
+        )
+        order_request = SimpleNamespace(data={"order": orders[0].id})
+        batch_request = SimpleNamespace(data={"orders": [order.id for order in orders[:ASSIGNMENT_BATCH_SIZE]]})
+
+        cases = {
+            "generate_optimized_plan.greedy": lambda: OperationService._build_plan("greedy", 0),
+            "generate_optimized_plan.local_search": lambda: OperationService._build_plan(
+                "local_search", time_budget
+            ),
+            "assign_order_operations": lambda: OperationService.assign_order_operations(order_request),
+            "assign_orders_operations": lambda: OperationService.assign_orders_operations(batch_request),
+            "get_for_schedule": lambda: OperationService().get_for_schedule(date),
+            "get_for_tech_schedule": lambda: OperationService().get_for_tech_schedule(date, tech_email),
+        }
+        measurements = [
+            measure(name, func, params, operations, repeat)
+            for name, func in cases.items()
+        ]
+        transaction.set_rollback(True)
+    return measurements
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "cpu_count": os.cpu_count(),
+        "planner_processes": settings.PLANNER_PROCESSES,
+    }
@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+
+import pytz
+from django.core.management import BaseCommand
+
+from operations.benchmark import BacklogParams, benchmark_database, environment, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the planners and the schedule views on generated backlogs. "
+        "Runs on a separate test database created for the run, the configured database is not touched"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, nargs="+", default=[50, 200],
+                            help="Backlog sizes, one suite run per size")
+        parser.add_argument("--works-per-order", type=int, default=3)
+        parser.add_argument("--techs-per-group", type=int, default=3)
+        parser.add_argument("--deadline-days", type=int, default=14)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs of every case")
+        parser.add_argument("--time-budget", type=float, default=1.0, help="Local search budget in seconds")
+        parser.add_argument("--output", help="JSON file for the results, printed if omitted")
+
+    def handle(self, **options):
+        results = []
+        with benchmark_database():
+            for orders in options["orders"]:
+                params = BacklogParams(
+                    orders=orders,
+                    works_per_order=options["works_per_order"],
+                    techs_per_group=options["techs_per_group"],
+                    deadline_days=options["deadline_days"],
+                    seed=options["seed"],
+                )
+                for measurement in run_suite(params, repeat=options["repeat"], time_budget=options["time_budget"]):
+                    result = measurement.as_dict()
+                    results.append(result)
+                    self.stderr.write(
+                        f"{result['name']:<40} orders={orders:<6} operations={result['operations']:<7} "
+                        f"median={result['time_ms']['median']:>10.2f} ms queries={result['queries']:<5} "
+                        f"peak={result['peak_memory_kb']} KiB"
+                    )
+
+        report = {
+            "created_at": datetime.now(tz=pytz.UTC).isoformat(),
+            "environment": environment(),
+            "params": {key: value for key, value in options.items() if key in (
+                "works_per_order", "techs_per_group", "deadline_days", "seed", "repeat", "time_budget"
+            )},
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,47 @@
+from django.core.management import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from operations.models import Operation, OperationStatus
+
+
+class Command(BaseCommand):
+    help = ("Lists active operations of a technician that overlap, which the double-booking guard rejects "
+            "as soon as one of them is moved")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--release", action="store_true",
+            help="Unassign the later operation of each pair if it has not started, so it is planned again",
+        )
+
+    def handle(self, **options):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT a.tech_id, a.id, b.id, lower(b.exec_range)
+                FROM operations_operation a
+                JOIN operations_operation b ON b.tech_id = a.tech_id AND b.is_active
+                    AND lower(b.exec_range) >= lower(a.exec_range) AND b.id <> a.id
+                    AND (lower(b.exec_range) > lower(a.exec_range) OR b.id > a.id)
+                    AND b.exec_range && a.exec_range
+                WHERE a.is_active
+                ORDER BY a.tech_id, lower(a.exec_range)
+                """
+            )
+            pairs = cursor.fetchall()
+
+        for tech_id, first_id, second_id, _ in pairs:
+            self.stdout.write(f"Technician {tech_id}: operations {first_id} and {second_id} overlap")
+        self.stdout.write(f"{len(pairs)} overlapping pairs")
+
+        if options["release"] and pairs:
+            released = (
+                Operation.objects
+                .filter(id__in={second_id for _, _, second_id, start in pairs if start >= timezone.now()},
+                        is_exec_start_editable=True)
+                .exclude(operation_status__in=[OperationStatus.get_in_progress_status(),
+                                               OperationStatus.get_completed_status()])
+                .update(tech=None, exec_start=None)
+            )
+            self.stdout.write(f"{released} operations released")
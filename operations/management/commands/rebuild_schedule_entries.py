@@ -0,0 +1,10 @@
+from django.core.management import BaseCommand
+
+from operations.models import ScheduleEntry
+
+
+class Command(BaseCommand):
+    help = "Recreates the schedule projection from the operations"
+
+    def handle(self, **options):
+        ScheduleEntry.rebuild()
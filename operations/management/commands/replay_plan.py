@@ -0,0 +1,114 @@
+import json
+import time
+from dataclasses import asdict
+
+from django.core.management import BaseCommand
+from django.db import connection
+
+from operations.benchmark import QueryCounter
+from operations.scheduling import (
+    DecomposedPlanner,
+    IncrementalPlanner,
+    PlanCapture,
+    PlanMetrics,
+    PlanOperation,
+    SearchProblem,
+    TimelineIndex,
+    TimelinePlanner,
+    improve_plan,
+)
+
+
+def _plan_local_search(index: TimelineIndex, operations: list[PlanOperation], work_operations: list[PlanOperation],
+                       capture: PlanCapture, time_budget: float, seed: int) -> None:
+    planner = TimelinePlanner(index, capture.now)
+    planner.plan(operations, work_operations)
+    problem = SearchProblem.from_plan(work_operations, index, planner.now, planner.pause)
+    assignment, _, _ = improve_plan(problem, time_budget, seed)
+    for op in work_operations:
+        if op.id in assignment:
+            op.tech_id, op.exec_start, _ = assignment[op.id]
+
+
+ALGORITHMS = {
+    "serial": lambda index, operations, work_operations, capture, **kwargs: (
+        TimelinePlanner(index, capture.now).plan(operations, work_operations)
+    ),
+    "decomposed": lambda index, operations, work_operations, capture, **kwargs: (
+        DecomposedPlanner(index, capture.now).plan(operations, work_operations)
+    ),
+    "incremental": lambda index, operations, work_operations, capture, **kwargs: (
+        IncrementalPlanner(index, capture.now).plan(operations, work_operations)
+    ),
+    "local_search": _plan_local_search,
+}
+
+
+def _metrics(capture: PlanCapture, index: TimelineIndex, operations: list[PlanOperation],
+             work_operations: list[PlanOperation]) -> PlanMetrics | None:
+    """
+    Quality of the placement of the operations, None if some of them are not placed.
+    """
+    if any(op.exec_start is None or op.tech_id not in index.timelines for op in operations):
+        return None
+    problem = SearchProblem.from_plan(work_operations, index, capture.now, TimelinePlanner.pause)
+    return problem.evaluate(problem.greedy)
+
+
+class Command(BaseCommand):
+    help = "Replays a planner input written to PLAN_CAPTURE_DIR against the planning algorithms"
+
+    def add_arguments(self, parser):
+        parser.add_argument("capture", help="Path to a captured .json.gz file")
+        parser.add_argument("--algorithms", nargs="+", choices=ALGORITHMS.keys(), default=list(ALGORITHMS))
+        parser.add_argument("--time-budget", type=float, default=5.0, help="Local search budget in seconds")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="JSON file for the results")
+
+    def handle(self, **options):
+        capture = PlanCapture.load(options["capture"])
+        self.stdout.write(
+            f"{capture.kind} captured at {capture.now.isoformat()}: {len(capture.planned)} operations to plan, "
+            f"{len(capture.operations)} operations of their works, {len(capture.technicians)} technicians"
+        )
+
+        index, operations, work_operations = capture.restore()
+        captured = _metrics(capture, index, operations, work_operations)
+        captured_placement = {op.id: (op.tech_id, op.exec_start) for op in operations}
+
+        results = []
+        for algorithm in options["algorithms"]:
+            index, operations, work_operations = capture.restore()
+            counter = QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                ALGORITHMS[algorithm](
+                    index, operations, work_operations, capture,
+                    time_budget=options["time_budget"], seed=options["seed"],
+                )
+            runtime = (time.perf_counter() - started) * 1000
+
+            metrics = _metrics(capture, index, operations, work_operations)
+            results.append({
+                "algorithm": algorithm,
+                "time_ms": round(runtime, 2),
+                "queries": counter.count,
+                "moved_operations": sum(
+                    (op.tech_id, op.exec_start) != captured_placement[op.id] for op in operations
+                ),
+                "metrics": asdict(metrics) if metrics else None,
+            })
+
+        baseline = asdict(captured) if captured else results[0]["metrics"]
+        for result in results:
+            result["delta"] = {
+                key: round(value - baseline[key], 4) for key, value in result["metrics"].items()
+            } if result["metrics"] and baseline else None
+            self.stdout.write(
+                f"{result['algorithm']:<14} {result['time_ms']:>10.2f} ms  queries={result['queries']:<4} "
+                f"moved={result['moved_operations']:<5} metrics={result['metrics']} delta={result['delta']}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump({"baseline": baseline, "results": results}, file, indent=2)
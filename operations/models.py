@@ -2,12 +2,127 @@ import datetime
 import uuid
 
 import pghistory
-from django.db import models
+import pgtrigger
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField
+from django.contrib.postgres.indexes import GistIndex
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models
 from django.utils import timezone
 
-from core.models import BaseModel
-from orders.models import User
-from works.models import WorkType, Work
+from core.models import BaseModel, schedule_version_trigger
+from orders.models import Order, User
+from works.models import WorkStatus, WorkType, Work
+
+
+def _duration_sql(operation_type: str, work: str) -> str:
+    """
+    SQL expression of the operation duration in minutes: fixed time plus time per item for every item of the work.
+    """
+    return (
+        f"(EXTRACT(HOUR FROM {operation_type}.fixed_exec_time) * 60"
+        f" + EXTRACT(MINUTE FROM {operation_type}.fixed_exec_time)"
+        f" + (EXTRACT(HOUR FROM {operation_type}.exec_time_per_item) * 60"
+        f" + EXTRACT(MINUTE FROM {operation_type}.exec_time_per_item)) * {work}.amount)::integer"
+    )
+
+
+def _unfinished_sql(operation: str) -> str:
+    """
+    SQL condition of the operations whose duration still follows their type and work amount: not completed,
+    not of a cancelled order and not started before now. The other operations keep the duration they had.
+    """
+    return (
+        f"(({operation}.exec_start IS NULL OR {operation}.exec_start >= now())"
+        f" AND NOT EXISTS (SELECT 1 FROM operations_operationstatus os"
+        f" WHERE os.id = {operation}.operation_status_id AND os.number = 3)"
+        f" AND NOT EXISTS (SELECT 1 FROM works_work ow JOIN orders_order oo ON oo.id = ow.order_id"
+        f" JOIN orders_orderstatus oos ON oos.id = oo.status_id WHERE ow.id = {operation}.work_id AND oos.number = 6))"
+    )
+
+
+# Working intervals of a day used while no shifts are configured: weekdays 04:00-13:00 UTC with a break 08:00-09:00
+DEFAULT_WORK_SHIFTS = {weekday: [(datetime.time(4), datetime.time(8)), (datetime.time(9), datetime.time(13))]
+                       for weekday in range(5)}
+
+
+def _working_pieces_sql() -> str:
+    """
+    SQL query of the working intervals (weekday, start_time, end_time) of the active shifts split at their breaks,
+    the same as WorkCalendar.load builds them.
+    """
+    defaults = ", ".join(
+        f"({weekday}, time '{start:%H:%M}', time '{end:%H:%M}')"
+        for weekday, pieces in DEFAULT_WORK_SHIFTS.items() for start, end in pieces
+    )
+    return f"""
+        SELECT p.weekday, p.start_time, p.end_time FROM (
+            SELECT s.weekday, s."start" AS start_time, s.break_start AS end_time FROM operations_workshift s
+            WHERE s.is_active AND s.break_start IS NOT NULL AND s.break_end IS NOT NULL
+            UNION ALL
+            SELECT s.weekday, s.break_end, s."end" FROM operations_workshift s
+            WHERE s.is_active AND s.break_start IS NOT NULL AND s.break_end IS NOT NULL
+            UNION ALL
+            SELECT s.weekday, s."start", s."end" FROM operations_workshift s
+            WHERE s.is_active AND (s.break_start IS NULL OR s.break_end IS NULL)
+            UNION ALL
+            SELECT d.weekday, d.start_time, d.end_time FROM (VALUES {defaults}) AS d (weekday, start_time, end_time)
+            WHERE NOT EXISTS (SELECT 1 FROM operations_workshift s WHERE s.is_active)
+        ) p
+        WHERE p.start_time < p.end_time
+    """
+
+
+def _exec_end_sql() -> str:
+    """
+    PL/pgSQL statements that store the end of NEW per the work calendar into `exec_end`, as WorkCalendar.end_of:
+    operations longer than any working interval are continued after breaks, nights and holidays.
+    """
+    return f"""
+        SELECT max(p.end_time - p.start_time) INTO longest FROM ({_working_pieces_sql()}) p;
+        exec_end := NEW.exec_start + make_interval(mins => NEW.duration);
+        IF make_interval(mins => NEW.duration) > longest THEN
+            exec_end := COALESCE((
+            SELECT c.period_end - (c.total - make_interval(mins => NEW.duration))
+            FROM (
+                SELECT i.period_start, i.period_end,
+                    sum(i.period_end - i.period_start) OVER (
+                        ORDER BY i.period_start, i.period_end ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                    ) AS total
+                FROM (
+                    SELECT GREATEST((d.day + p.start_time) AT TIME ZONE 'UTC', NEW.exec_start) AS period_start,
+                        (d.day + p.end_time) AT TIME ZONE 'UTC' AS period_end
+                    FROM (
+                        SELECT (NEW.exec_start AT TIME ZONE 'UTC')::date + n AS day FROM generate_series(0, 366) n
+                    ) d
+                    JOIN ({_working_pieces_sql()}) p ON p.weekday = EXTRACT(ISODOW FROM d.day)::integer - 1
+                    WHERE NOT EXISTS (SELECT 1 FROM operations_holiday h WHERE h.is_active AND h.date = d.day)
+                ) i
+                WHERE i.period_start < i.period_end
+            ) c
+            WHERE c.total >= make_interval(mins => NEW.duration)
+            ORDER BY c.period_start
+            LIMIT 1
+            ), exec_end);
+        END IF;
+    """
+
+
+def recompute_exec_ranges_trigger() -> pgtrigger.Trigger:
+    """
+    Recomputes the ranges of the operations not finished yet when the work calendar changes.
+    """
+    return pgtrigger.Trigger(
+        name="recompute_exec_ranges",
+        level=pgtrigger.Statement,
+        when=pgtrigger.After,
+        operation=pgtrigger.Insert | pgtrigger.Update | pgtrigger.Delete,
+        func="""
+            UPDATE operations_operation SET exec_range = exec_range
+            WHERE exec_range IS NOT NULL AND upper(exec_range) > now();
+            RETURN NULL;
+        """,
+    )
 
 
 # Create your models here.
@@ -40,10 +155,32 @@ class OperationType(BaseModel):
     class Meta:
         verbose_name = "Тип операции"
         verbose_name_plural = "Типы операций"
+        triggers = [
+            pgtrigger.Trigger(
+                name="update_operations_duration",
+                when=pgtrigger.After,
+                operation=pgtrigger.UpdateOf("fixed_exec_time", "exec_time_per_item"),
+                condition=pgtrigger.AnyChange("fixed_exec_time", "exec_time_per_item"),
+                func=f"""
+                    UPDATE operations_operation o SET duration = {_duration_sql("NEW", "w")}
+                    FROM works_work w
+                    WHERE o.operation_type_id = NEW.id AND w.id = o.work_id AND {_unfinished_sql("o")};
+                    RETURN NULL;
+                """,
+            ),
+        ]
 
     def get_group(self):
         return self.OperationGroup(self.group).label
 
+    def get_exec_duration(self, amount: int) -> datetime.timedelta:
+        """
+        Execution time for a work of `amount` items, the same as the `duration` computed by the database.
+        """
+        fixed = self.fixed_exec_time.hour * 60 + self.fixed_exec_time.minute
+        per_item = self.exec_time_per_item.hour * 60 + self.exec_time_per_item.minute
+        return datetime.timedelta(minutes=fixed + per_item * amount)
+
     def __str__(self):
         return f"{self.name}, группа: {self.get_group()}"
 
@@ -52,6 +189,14 @@ class WorkTypeOperationType(models.Model):
     work_type = models.ForeignKey(WorkType, on_delete=models.CASCADE, verbose_name="Тип работы")
     operation_type = models.ForeignKey(OperationType, on_delete=models.CASCADE, verbose_name="Тип операции")
     ordinal_number = models.PositiveIntegerField(verbose_name="Порядковый номер выполнения")
+    # When no step of the work type has predecessors, the steps follow each other by ordinal number
+    predecessors = ArrayField(
+        models.PositiveIntegerField(),
+        default=list,
+        blank=True,
+        verbose_name="Предыдущие операции",
+        help_text="Порядковые номера операций, после которых выполняется эта",
+    )
 
     class Meta:
         unique_together = (
@@ -59,6 +204,10 @@ class WorkTypeOperationType(models.Model):
             "ordinal_number",
         )
 
+    def clean(self):
+        if self.ordinal_number in self.predecessors:
+            raise ValidationError({"predecessors": "Операция не может выполняться после самой себя"})
+
 
 class OperationStatus(BaseModel):
     id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False, unique=True)
@@ -79,6 +228,91 @@ class OperationStatus(BaseModel):
             status = OperationStatus.objects.create(name="Default status", number=1)
         return status
 
+    @staticmethod
+    def get_in_progress_status():
+        status = OperationStatus.objects.filter(number=2).first()
+        if not status:
+            status = OperationStatus.objects.create(name="В работе", number=2)
+        return status
+
+    @staticmethod
+    def get_completed_status():
+        status = OperationStatus.objects.filter(number=3).first()
+        if not status:
+            status = OperationStatus.objects.create(name="Готово", number=3)
+        return status
+
+
+# Setting of the database session that switches the double-booking check off, e.g. to load demonstration data
+ALLOW_DOUBLE_BOOKING_SETTING = "dental_lab.allow_double_booking"
+
+
+def _no_double_booking_triggers() -> list[pgtrigger.Trigger]:
+    """
+    Rejects operations overlapping another operation of the same technician. The check is deferred
+    to the commit, so plans that swap operations between technicians can be written row by row.
+    Concurrent transactions are serialized per technician by an advisory lock. NEW is the row as it was
+    when the change was queued, so the row is read again: it may have been moved later in the transaction.
+    Updates are checked only when the technician, the execution range or the activity change, so saving
+    other fields of a row that overlapped before the guard was installed still works
+    (see the check_double_bookings command). The check is skipped while ALLOW_DOUBLE_BOOKING_SETTING is "on".
+    """
+    func = f"""
+            IF current_setting('{ALLOW_DOUBLE_BOOKING_SETTING}', TRUE) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            SELECT * INTO current_row FROM operations_operation WHERE id = NEW.id;
+            IF NOT FOUND OR current_row.tech_id IS NULL OR current_row.exec_range IS NULL
+                OR NOT current_row.is_active THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_advisory_xact_lock(hashtext(current_row.tech_id::text));
+            IF EXISTS (
+                SELECT 1 FROM operations_operation o
+                WHERE o.tech_id = current_row.tech_id AND o.id <> current_row.id AND o.is_active
+                    AND o.exec_range && current_row.exec_range
+            ) THEN
+                RAISE EXCEPTION 'Technician % is already busy at %', current_row.tech_id, current_row.exec_range
+                    USING ERRCODE = 'exclusion_violation', DETAIL = current_row.id::text;
+            END IF;
+            RETURN NULL;
+        """
+    return [
+        pgtrigger.Trigger(
+            name="prevent_tech_double_booking",
+            when=pgtrigger.After,
+            operation=pgtrigger.Insert,
+            timing=pgtrigger.Deferred,
+            declare=[("current_row", "operations_operation")],
+            func=func,
+        ),
+        pgtrigger.Trigger(
+            name="prevent_tech_double_booking_update",
+            when=pgtrigger.After,
+            operation=pgtrigger.Update,
+            condition=pgtrigger.AnyChange("tech", "exec_range", "is_active"),
+            timing=pgtrigger.Deferred,
+            declare=[("current_row", "operations_operation")],
+            func=func,
+        ),
+    ]
+
+
+class OperationQuerySet(models.QuerySet):
+    def with_exec_end(self) -> "OperationQuerySet":
+        """
+        Annotates `exec_end`, the upper bound of `exec_range`: the end per the work calendar.
+        """
+        return self.annotate(
+            exec_end=models.Func(models.F("exec_range"), function="upper", output_field=models.DateTimeField())
+        )
+
+    def overlapping(self, start: datetime.datetime, end: datetime.datetime) -> "OperationQuerySet":
+        """
+        Operations whose `exec_range` overlaps [start, end), looked up by the GiST index.
+        """
+        return self.filter(exec_range__overlap=(start, end))
+
 
 class Operation(BaseModel):
     id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False, unique=True)
@@ -93,10 +327,58 @@ class Operation(BaseModel):
     ordinal_number = models.PositiveIntegerField(verbose_name="Порядковый номер")
     exec_start = models.DateTimeField(null=True, blank=True, verbose_name="Начало выполнения")
     is_exec_start_editable = models.BooleanField(default=True, verbose_name="Можно ли редактировать время выполнения")
+    # Bumped by the database on every change of the row, used to detect plans built from stale data
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="Версия")
+    # Execution time in minutes, computed by the database from the operation type and the work amount.
+    # Finished operations keep the duration they were executed with
+    duration = models.PositiveIntegerField(default=0, editable=False, verbose_name="Длительность, мин")
+    # [exec_start, end per the work calendar), computed by the database as WorkCalendar.end_of
+    exec_range = DateTimeRangeField(null=True, blank=True, editable=False, verbose_name="Время выполнения")
+
+    objects = OperationQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Операция"
         verbose_name_plural = "Операции"
+        triggers = [
+            schedule_version_trigger(),
+            pgtrigger.Trigger(
+                name="bump_operation_version",
+                when=pgtrigger.Before,
+                operation=pgtrigger.Update,
+                condition=pgtrigger.Condition("OLD.* IS DISTINCT FROM NEW.*"),
+                func="NEW.version := OLD.version + 1; RETURN NEW;",
+            ),
+            pgtrigger.Trigger(
+                name="set_operation_exec_time",
+                when=pgtrigger.Before,
+                operation=pgtrigger.Insert | pgtrigger.Update,
+                declare=[("longest", "interval"), ("exec_end", "timestamptz")],
+                func=f"""
+                    IF TG_OP = 'UPDATE' AND NOT {_unfinished_sql("NEW")}
+                        AND NEW.operation_type_id = OLD.operation_type_id AND NEW.work_id = OLD.work_id
+                        AND NEW.exec_start IS NOT DISTINCT FROM OLD.exec_start THEN
+                        NEW.duration := OLD.duration;
+                        NEW.exec_range := OLD.exec_range;
+                        RETURN NEW;
+                    END IF;
+                    SELECT {_duration_sql("t", "w")} INTO NEW.duration
+                    FROM operations_operationtype t, works_work w
+                    WHERE t.id = NEW.operation_type_id AND w.id = NEW.work_id;
+                    IF NEW.exec_start IS NULL THEN
+                        NEW.exec_range := NULL;
+                        RETURN NEW;
+                    END IF;
+                    {_exec_end_sql()}
+                    NEW.exec_range := tstzrange(NEW.exec_start, exec_end, '[)');
+                    RETURN NEW;
+                """,
+            ),
+            *_no_double_booking_triggers(),
+        ]
+        indexes = [
+            GistIndex(fields=["exec_range"], name="operation_exec_range_gist"),
+        ]
         unique_together = (
             "work",
             "ordinal_number",
@@ -105,16 +387,303 @@ class Operation(BaseModel):
     def __str__(self):
         return f'Операция "{self.operation_type.name}" для работы "{self.work.work_type}" от даты {self.work.order.order_date}'
 
+    def get_exec_duration(self) -> datetime.timedelta:
+        return datetime.timedelta(minutes=self.duration)
+
+    @staticmethod
+    def duration_as_time(duration: int) -> datetime.time:
+        """
+        Duration in minutes as a time of day, capped at 23:59. Use `duration` for longer operations.
+        """
+        hours, minutes = divmod(min(duration, 24 * 60 - 1), 60)
+        return datetime.time(hour=hours, minute=minutes)
+
     def get_exec_time(self) -> datetime.time:
-        fixed = self.operation_type.fixed_exec_time
-        per_item = self.operation_type.exec_time_per_item
-        minutes = fixed.minute + per_item.minute * self.work.amount
-        hours = fixed.hour + per_item.hour * self.work.amount + minutes // 60
-        return datetime.time(
-            hour=hours,
-            minute=minutes % 60,
+        return self.duration_as_time(self.duration)
+
+
+# Keeps Operation.duration of the unfinished operations in sync with the amount of the work
+pgtrigger.register(
+    pgtrigger.Trigger(
+        name="update_operations_duration",
+        when=pgtrigger.After,
+        operation=pgtrigger.UpdateOf("amount"),
+        condition=pgtrigger.AnyChange("amount"),
+        func=f"""
+            UPDATE operations_operation o SET duration = {_duration_sql("t", "NEW")}
+            FROM operations_operationtype t
+            WHERE o.work_id = NEW.id AND t.id = o.operation_type_id AND {_unfinished_sql("o")};
+            RETURN NULL;
+        """,
+    )
+)(Work)
+
+
+class WorkShift(BaseModel):
+    class Weekday(models.IntegerChoices):
+        MONDAY = 0, "Понедельник"
+        TUESDAY = 1, "Вторник"
+        WEDNESDAY = 2, "Среда"
+        THURSDAY = 3, "Четверг"
+        FRIDAY = 4, "Пятница"
+        SATURDAY = 5, "Суббота"
+        SUNDAY = 6, "Воскресенье"
+
+    weekday = models.PositiveSmallIntegerField(choices=Weekday.choices, verbose_name="День недели")
+    start = models.TimeField(verbose_name="Начало смены (UTC)")
+    end = models.TimeField(verbose_name="Конец смены (UTC)")
+    break_start = models.TimeField(null=True, blank=True, verbose_name="Начало перерыва (UTC)")
+    break_end = models.TimeField(null=True, blank=True, verbose_name="Конец перерыва (UTC)")
+
+    class Meta:
+        verbose_name = "Рабочая смена"
+        verbose_name_plural = "Рабочие смены"
+        triggers = [schedule_version_trigger(), recompute_exec_ranges_trigger()]
+        ordering = ("weekday", "start")
+
+    def __str__(self):
+        return f"{self.get_weekday_display()}, {self.start:%H:%M}-{self.end:%H:%M}"
+
+
+class Holiday(BaseModel):
+    date = models.DateField(unique=True, verbose_name="Дата")
+    name = models.CharField(max_length=128, default="", blank=True, verbose_name="Наименование")
+
+    class Meta:
+        verbose_name = "Нерабочий день"
+        verbose_name_plural = "Нерабочие дни"
+        triggers = [schedule_version_trigger(), recompute_exec_ranges_trigger()]
+        ordering = ("date",)
+
+    def __str__(self):
+        return f"{self.date} {self.name}"
+
+
+class TechnicianAbsence(BaseModel):
+    tech = models.ForeignKey(User, related_name="absences", on_delete=models.CASCADE, verbose_name="Техник")
+    start = models.DateTimeField(verbose_name="Начало отсутствия")
+    end = models.DateTimeField(verbose_name="Конец отсутствия")
+    reason = models.CharField(max_length=128, default="", blank=True, verbose_name="Причина")
+
+    class Meta:
+        verbose_name = "Отсутствие техника"
+        verbose_name_plural = "Отсутствия техников"
+        triggers = [schedule_version_trigger()]
+
+    def __str__(self):
+        return f"{self.tech}: {self.start:%d.%m.%Y %H:%M} - {self.end:%d.%m.%Y %H:%M}"
+
+
+class PlanJob(BaseModel):
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    # Mode of the jobs that generate and place the operations of a confirmed order
+    ORDER_ASSIGNMENT_MODE = "order_assignment"
+
+    id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False, unique=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING, verbose_name="Статус")
+    mode = models.CharField(max_length=16, verbose_name="Режим")
+    order = models.ForeignKey(Order, related_name="plan_jobs", null=True, blank=True, on_delete=models.CASCADE,
+                              verbose_name="Заказ")
+    time_budget = models.FloatField(verbose_name="Время на оптимизацию, с")
+    snapshot_version = models.BigIntegerField(null=True, blank=True, verbose_name="Версия расписания")
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="Прогресс, %")
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Результат")
+    error = models.TextField(default="", blank=True, verbose_name="Ошибка")
+    created_by = models.ForeignKey(User, related_name="plan_jobs", null=True, blank=True, on_delete=models.SET_NULL,
+                                   verbose_name="Автор")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Дата создания")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата завершения")
+
+    class Meta:
+        verbose_name = "Задача планирования"
+        verbose_name_plural = "Задачи планирования"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"План ({self.mode}) от {self.created_at:%d.%m.%Y %H:%M}: {self.get_status_display()}"
+
+
+class PlanDraftOperation(models.Model):
+    """
+    Placement of an operation in a generated plan. Only the operations the plan moves are stored,
+    with the version of the operation the plan was built from.
+    """
+
+    job = models.ForeignKey(PlanJob, related_name="draft_operations", on_delete=models.CASCADE,
+                            verbose_name="Задача планирования")
+    operation = models.ForeignKey(Operation, related_name="draft_placements", on_delete=models.CASCADE,
+                                  verbose_name="Операция")
+    tech = models.ForeignKey(User, related_name="draft_operations", null=True, on_delete=models.SET_NULL,
+                             verbose_name="Техник")
+    exec_start = models.DateTimeField(verbose_name="Начало выполнения")
+    version = models.PositiveIntegerField(verbose_name="Версия операции")
+
+    class Meta:
+        verbose_name = "Операция черновика плана"
+        verbose_name_plural = "Операции черновика плана"
+        unique_together = (
+            "job",
+            "operation",
         )
 
+    def __str__(self):
+        return f"{self.operation_id}: {self.exec_start:%d.%m.%Y %H:%M}"
+
+
+class ScheduleEntry(models.Model):
+    """
+    Flat copy of an operation with everything the schedule views show, maintained by database triggers.
+    """
+
+    operation = models.OneToOneField(Operation, primary_key=True, related_name="schedule_entry",
+                                     on_delete=models.DO_NOTHING, db_constraint=False, verbose_name="Операция")
+    work_id = models.UUIDField(verbose_name="Работа")
+    order_id = models.UUIDField(verbose_name="Заказ")
+    tech_email = models.CharField(max_length=254, null=True, blank=True, verbose_name="Почта техника")
+    group = models.CharField(max_length=2, verbose_name="Группа")
+    exec_start = models.DateTimeField(null=True, blank=True, verbose_name="Начало выполнения")
+    exec_end = models.DateTimeField(null=True, blank=True, verbose_name="Конец выполнения")
+    deadline = models.DateField(verbose_name="Крайний срок выполнения")
+    ordinal_number = models.PositiveIntegerField(verbose_name="Порядковый номер")
+    editable = models.BooleanField(verbose_name="Можно ли редактировать время выполнения")
+    duration = models.PositiveIntegerField(verbose_name="Длительность, мин")
+    version = models.PositiveIntegerField(verbose_name="Версия")
+    operation_type_id = models.UUIDField(verbose_name="Тип операции")
+    operation_type_name = models.CharField(max_length=128, verbose_name="Наименование типа операции")
+    fixed_exec_time = models.TimeField(verbose_name="Фиксированное время выполнения операции")
+    exec_time_per_item = models.TimeField(verbose_name="Время выполнения операции для 1 ед. изделия/работы")
+    operation_status_id = models.UUIDField(null=True, blank=True, verbose_name="Статус")
+    operation_status_name = models.CharField(max_length=128, null=True, blank=True, verbose_name="Наименование статуса")
+    operation_status_number = models.PositiveIntegerField(null=True, blank=True, verbose_name="Номер статуса")
+    work_type_id = models.UUIDField(verbose_name="Тип работы")
+    work_type_name = models.CharField(max_length=128, verbose_name="Наименование типа работы")
+    work_type_cost = models.DecimalField(max_digits=9, decimal_places=2, verbose_name="Цена типа работы")
+    work_status_id = models.UUIDField(verbose_name="Статус работы")
+    work_status_name = models.CharField(max_length=128, verbose_name="Наименование статуса работы")
+    work_discount = models.IntegerField(verbose_name="Скидка на работу")
+    work_amount = models.IntegerField(verbose_name="Количество")
+    order_discount = models.IntegerField(verbose_name="Скидка на заказ")
+    work_teeth = ArrayField(models.IntegerField(), default=list, blank=True, verbose_name="Номера зубов")
+
+    class Meta:
+        verbose_name = "Запись расписания"
+        verbose_name_plural = "Записи расписания"
+        indexes = [
+            models.Index(fields=["exec_start"], name="schedule_entry_start_idx"),
+            models.Index(fields=["tech_email", "exec_start"], name="schedule_entry_tech_start_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.operation_type_name}: {self.tech_email} {self.exec_start}"
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """
+        Recreates the entries of all operations, e.g. after the table has been added to an existing database.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {cls._meta.db_table} e WHERE NOT EXISTS "
+                           f"(SELECT 1 FROM operations_operation o WHERE o.id = e.operation_id)")
+            cursor.execute(_refresh_schedule_entries_sql("TRUE"))
+
+
+_SCHEDULE_ENTRY_COLUMNS = {
+    "operation_id": "o.id",
+    "work_id": "o.work_id",
+    "order_id": "w.order_id",
+    "tech_email": "u.email",
+    '"group"': 't."group"',
+    "exec_start": "o.exec_start",
+    "exec_end": "upper(o.exec_range)",
+    "deadline": "ord.deadline",
+    "ordinal_number": "o.ordinal_number",
+    "editable": "o.is_exec_start_editable",
+    "duration": "o.duration",
+    "version": "o.version",
+    "operation_type_id": "t.id",
+    "operation_type_name": "t.name",
+    "fixed_exec_time": "t.fixed_exec_time",
+    "exec_time_per_item": "t.exec_time_per_item",
+    "operation_status_id": "s.id",
+    "operation_status_name": "s.name",
+    "operation_status_number": "s.number",
+    "work_type_id": "wt.id",
+    "work_type_name": "wt.name",
+    "work_type_cost": "wt.cost",
+    "work_status_id": "ws.id",
+    "work_status_name": "ws.name",
+    "work_discount": "w.discount",
+    "work_amount": "w.amount",
+    "order_discount": "ord.discount",
+    "work_teeth": "w.teeth",
+}
+
+
+def _refresh_schedule_entries_sql(condition: str) -> str:
+    """
+    Upserts the schedule entries of the operations matching `condition`.
+    """
+    columns = ", ".join(_SCHEDULE_ENTRY_COLUMNS)
+    values = ", ".join(_SCHEDULE_ENTRY_COLUMNS.values())
+    updates = ", ".join(
+        f"{column} = EXCLUDED.{column}" for column in _SCHEDULE_ENTRY_COLUMNS if column != "operation_id"
+    )
+    return f"""
+        INSERT INTO operations_scheduleentry ({columns})
+        SELECT {values}
+        FROM operations_operation o
+        JOIN operations_operationtype t ON t.id = o.operation_type_id
+        JOIN works_work w ON w.id = o.work_id
+        JOIN works_worktype wt ON wt.id = w.work_type_id
+        JOIN works_workstatus ws ON ws.id = w.work_status_id
+        JOIN orders_order ord ON ord.id = w.order_id
+        LEFT JOIN operations_operationstatus s ON s.id = o.operation_status_id
+        LEFT JOIN accounts_user u ON u.id = o.tech_id
+        WHERE {condition}
+        ON CONFLICT (operation_id) DO UPDATE SET {updates};
+    """
+
+
+def _refresh_schedule_entries_trigger(condition: str, *fields: str) -> pgtrigger.Trigger:
+    """
+    Refreshes the entries of the operations matching `condition` when the row (or one of `fields`) changes.
+    """
+    return pgtrigger.Trigger(
+        name="refresh_schedule_entries",
+        when=pgtrigger.After,
+        operation=pgtrigger.Update,
+        condition=pgtrigger.AnyChange(*fields) if fields else pgtrigger.Condition("OLD.* IS DISTINCT FROM NEW.*"),
+        func=_refresh_schedule_entries_sql(condition) + "RETURN NULL;",
+    )
+
+
+pgtrigger.register(
+    pgtrigger.Trigger(
+        name="refresh_schedule_entry",
+        when=pgtrigger.After,
+        operation=pgtrigger.Insert | pgtrigger.Update,
+        func=_refresh_schedule_entries_sql("o.id = NEW.id") + "RETURN NULL;",
+    ),
+    pgtrigger.Trigger(
+        name="delete_schedule_entry",
+        when=pgtrigger.After,
+        operation=pgtrigger.Delete,
+        func="DELETE FROM operations_scheduleentry WHERE operation_id = OLD.id; RETURN NULL;",
+    ),
+)(Operation)
+pgtrigger.register(_refresh_schedule_entries_trigger("o.operation_type_id = NEW.id"))(OperationType)
+pgtrigger.register(_refresh_schedule_entries_trigger("o.operation_status_id = NEW.id"))(OperationStatus)
+pgtrigger.register(_refresh_schedule_entries_trigger("o.work_id = NEW.id"))(Work)
+pgtrigger.register(_refresh_schedule_entries_trigger("w.work_type_id = NEW.id"))(WorkType)
+pgtrigger.register(_refresh_schedule_entries_trigger("w.work_status_id = NEW.id"))(WorkStatus)
+pgtrigger.register(_refresh_schedule_entries_trigger("w.order_id = NEW.id"))(Order)
+pgtrigger.register(_refresh_schedule_entries_trigger("o.tech_id = NEW.id", "email"))(User)
+
 
 # История изменения статусов операций
 BaseOperationEvent = pghistory.create_event_model(Operation, fields=["operation_status"])
@@ -0,0 +1,44 @@
+from .backfill import BackfillPlanner
+from .capacity import CapacityGrid, capacity_fingerprint
+from .capture import PlanCapture
+from .decomposed import DecomposedPlanner
+from .incremental import IncrementalPlanner
+from .local_search import PlanMetrics, SearchProblem, improve_plan
+from .planner import TimelinePlanner
+from .precedence import Precedence
+from .records import PlanOperation, WorkTypePrecedence, changed_operations
+from .repair import ScheduleRepair
+from .slack import OrderSlack, order_fingerprints
+from .snapshot import ScheduleSnapshot
+from .timeline import TechTimeline, TimelineIndex
+from .validation import validate_schedule
+from .work_calendar import WorkCalendar
+from .workers import map_in_processes, run_in_background, run_in_process
+
+__all__ = [
+    "BackfillPlanner",
+    "CapacityGrid",
+    "DecomposedPlanner",
+    "IncrementalPlanner",
+    "OrderSlack",
+    "PlanCapture",
+    "PlanMetrics",
+    "PlanOperation",
+    "Precedence",
+    "ScheduleRepair",
+    "ScheduleSnapshot",
+    "SearchProblem",
+    "TechTimeline",
+    "TimelineIndex",
+    "TimelinePlanner",
+    "WorkCalendar",
+    "WorkTypePrecedence",
+    "capacity_fingerprint",
+    "changed_operations",
+    "improve_plan",
+    "map_in_processes",
+    "order_fingerprints",
+    "run_in_background",
+    "run_in_process",
+    "validate_schedule",
+]
@@ -0,0 +1,70 @@
+from datetime import datetime
+from uuid import UUID
+
+from .planner import TimelinePlanner
+from .precedence import Precedence
+from .records import PlanOperation
+from .timeline import TimelineIndex
+
+
+class BackfillPlanner:
+    """
+    Pulls operations forward into the time released on some technician timelines. The operations are
+    taken by deadline and moved to the earliest slot on a released timeline of their group, if it starts
+    before their current start and after their predecessors. Operations only move earlier, so their
+    successors keep their order.
+    """
+
+    pause = TimelinePlanner.pause
+
+    def __init__(self, index: TimelineIndex, now: datetime):
+        self.index = index
+        self.calendar = index.calendar
+        self.now = now
+
+    def plan(
+        self,
+        candidates: list[PlanOperation],
+        work_operations: list[PlanOperation],
+        released_techs: set[UUID],
+    ) -> list[PlanOperation]:
+        """
+        `candidates` are sorted by deadline and start, `work_operations` are all operations of their works,
+        the same instances. Returns the candidates that have moved.
+        """
+        precedence = Precedence(work_operations)
+        moved = []
+        for op in candidates:
+            timelines = [
+                timeline for timeline in self.index.groups.get(op.group, [])
+                if timeline.tech.id in released_techs
+            ]
+            if not timelines:
+                continue
+
+            earliest = max(
+                (
+                    self.calendar.end_of(prev_op.exec_start, prev_op.get_exec_duration()) + self.pause
+                    for prev_op in precedence.predecessors[op.id]
+                    if prev_op.exec_start is not None
+                ),
+                default=self.now,
+            )
+            old_end = self.calendar.end_of(op.exec_start, op.get_exec_duration())
+            self.index.remove(op.tech_id, op.id)
+
+            best = None
+            for timeline in timelines:
+                start, end = timeline.first_fit(max(self.now, earliest), op.get_exec_duration(), self.pause)
+                if best is None or start < best[0]:
+                    best = (start, end, timeline)
+
+            start, end, timeline = best
+            if start >= op.exec_start:
+                self.index.add(op.tech_id, op.exec_start, old_end, op.id)
+                continue
+            timeline.add(start, end, op.id)
+            op.exec_start = start
+            op.tech_id = timeline.tech.id
+            moved.append(op)
+        return moved
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from uuid import UUID
+
+import numpy as np
+import pytz
+from django.db import connection
+
+from .timeline import TechTimeline, TimelineIndex
+from .validation import MICROSECOND, to_microseconds
+from .work_calendar import WorkCalendar
+
+MINUTE = timedelta(minutes=1) // MICROSECOND
+
+# Everything the capacity of a range is computed from: the operations and absences in the range,
+# the shifts, the holidays in the range and the technician groups
+CAPACITY_FINGERPRINT_SQL = """
+    SELECT md5(concat_ws('|',
+        (SELECT string_agg(concat_ws(':', o.id, o.version), ',' ORDER BY o.id)
+         FROM operations_operation o
+         WHERE o.exec_range && tstzrange(%(start)s, %(end)s)),
+        (SELECT string_agg(concat_ws(':', a.id, a.tech_id, a.start, a."end", a.is_active), ',' ORDER BY a.id)
+         FROM operations_technicianabsence a
+         WHERE a.start < %(end)s AND a."end" > %(start)s),
+        (SELECT string_agg(concat_ws(':', s.id, s.weekday, s.start, s."end", s.break_start, s.break_end, s.is_active),
+                           ',' ORDER BY s.id)
+         FROM operations_workshift s),
+        (SELECT string_agg(concat_ws(':', h.date, h.is_active), ',' ORDER BY h.date)
+         FROM operations_holiday h
+         WHERE h.date >= %(start)s::date AND h.date < %(end)s::date),
+        (SELECT string_agg(concat_ws(':', g.user_id, g.group_id), ',' ORDER BY g.user_id, g.group_id)
+         FROM accounts_user_groups g)
+    ))
+"""
+
+
+def capacity_fingerprint(start: datetime, end: datetime) -> str:
+    """
+    Hash of the data the capacity of [start, end) depends on, computed by one query.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(CAPACITY_FINGERPRINT_SQL, {"start": start, "end": end})
+        return cursor.fetchone()[0]
+
+
+def _working_positions(calendar: WorkCalendar, first: datetime, last: datetime, moments: np.ndarray) -> np.ndarray:
+    """
+    Working time in microseconds from `first` to each of the moments, the moments are clamped to [first, last].
+    """
+    periods = calendar.working_periods(first, last)
+    if not periods:
+        return np.zeros(len(moments), dtype=np.int64)
+
+    starts = to_microseconds([start for start, _ in periods])
+    lengths = to_microseconds([end for _, end in periods]) - starts
+    offsets = np.cumsum(lengths) - lengths
+    index = np.minimum(np.searchsorted(starts + lengths, moments, side="right"), len(periods) - 1)
+    return offsets[index] + np.clip(moments - starts[index], 0, lengths[index])
+
+
+@dataclass
+class CapacityGrid:
+    """
+    Booked and available working minutes of every technician on every day of a range.
+    """
+
+    days: list[date]
+    timelines: list[TechTimeline]
+    # Rows are the technicians of `timelines`, columns are the days
+    booked: np.ndarray
+    available: np.ndarray
+
+    @classmethod
+    def build(cls, index: TimelineIndex, busy: list[tuple[UUID, datetime, int]], first_day: date,
+              days: int) -> "CapacityGrid":
+        """
+        Bins the busy intervals, (tech id, start, duration in minutes), by technician and day. Both the
+        operations and the days are mapped to working time positions of the calendar, so the booked time
+        of a day is the overlap of two position ranges and breaks and nights are never counted.
+        """
+        timelines = list(index.timelines.values())
+        rows = {timeline.tech.id: row for row, timeline in enumerate(timelines)}
+        busy = [(tech_id, start, duration) for tech_id, start, duration in busy if tech_id in rows]
+
+        edges = [
+            datetime.combine(first_day + timedelta(days=day), time(), tzinfo=pytz.UTC) for day in range(days + 1)
+        ]
+        first, last = edges[0], edges[-1]
+        edges_us = to_microseconds(edges)
+
+        available = np.zeros((len(timelines), days), dtype=np.int64)
+        by_calendar: dict[int, np.ndarray] = {}
+        for row, timeline in enumerate(timelines):
+            calendar = timeline.calendar or index.calendar
+            if id(calendar) not in by_calendar:
+                by_calendar[id(calendar)] = np.diff(_working_positions(calendar, first, last, edges_us))
+            available[row] = by_calendar[id(calendar)]
+
+        booked = np.zeros((len(timelines), days), dtype=np.int64)
+        if busy:
+            techs = np.array([rows[tech_id] for tech_id, _, _ in busy], dtype=np.int64)
+            starts = to_microseconds([start for _, start, _ in busy])
+            durations = np.array([duration for _, _, duration in busy], dtype=np.int64) * MINUTE
+
+            # Counted from the earliest start, so that operations started before the range keep their length
+            origin = min(first, min(start for _, start, _ in busy))
+            start_positions = _working_positions(index.calendar, origin, last, starts)
+            edge_positions = _working_positions(index.calendar, origin, last, edges_us)
+            # Operations longer than any working interval continue after breaks and nights, see WorkCalendar.end_of
+            continued = durations > index.calendar.longest_interval // MICROSECOND
+            end_positions = np.where(
+                continued,
+                start_positions + durations,
+                _working_positions(index.calendar, origin, last, starts + durations),
+            )
+
+            overlap = (
+                np.minimum(end_positions[:, None], edge_positions[None, 1:])
+                - np.maximum(start_positions[:, None], edge_positions[None, :-1])
+            )
+            np.add.at(booked, techs, np.clip(overlap, 0, None))
+
+        return cls([first_day + timedelta(days=day) for day in range(days)], timelines, booked, available)
+
+    def by_group(self) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Booked and available time per day summed over the technicians of every group.
+        """
+        groups: dict[str, int] = {}
+        codes = np.array(
+            [groups.setdefault(timeline.group, len(groups)) for timeline in self.timelines], dtype=np.int64
+        )
+        booked = np.zeros((len(groups), len(self.days)), dtype=np.int64)
+        available = np.zeros((len(groups), len(self.days)), dtype=np.int64)
+        np.add.at(booked, codes, self.booked)
+        np.add.at(available, codes, self.available)
+        return {group: (booked[code], available[code]) for group, code in groups.items()}
+
+    @staticmethod
+    def minutes(microseconds: np.ndarray) -> list[int]:
+        return np.rint(microseconds / MINUTE).astype(np.int64).tolist()
@@ -0,0 +1,187 @@
+import gzip
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from uuid import UUID
+
+from accounts.models import User
+
+from .records import PlanOperation
+from .timeline import TimelineIndex
+from .work_calendar import Interval, WorkCalendar
+
+FORMAT_VERSION = 2
+# Version 1 captures have no predecessors, all their works are linear
+SUPPORTED_VERSIONS = (1, 2)
+
+OPERATION_FIELDS = (
+    "id",
+    "work_id",
+    "ordinal_number",
+    "group",
+    "duration",
+    "deadline",
+    "is_exec_start_editable",
+    "tech_id",
+    "exec_start",
+    "predecessors",
+)
+
+
+def _interval(interval: Interval) -> list[str]:
+    return [moment.isoformat() for moment in interval]
+
+
+def _parse_interval(interval: list[str]) -> Interval:
+    start, end = interval
+    return datetime.fromisoformat(start), datetime.fromisoformat(end)
+
+
+def _parse_operation(row: list) -> tuple:
+    operation_id, work_id, ordinal_number, group, duration, deadline, editable, tech_id, exec_start, *rest = row
+    predecessors = rest[0] if rest else None
+    return (
+        UUID(operation_id), UUID(work_id), ordinal_number, group, duration, date.fromisoformat(deadline),
+        editable, UUID(tech_id) if tech_id else None, datetime.fromisoformat(exec_start) if exec_start else None,
+        tuple(predecessors) if predecessors is not None else None,
+    )
+
+
+@dataclass
+class PlanCapture:
+    """
+    Everything a planner reads from the database and the clock, as plain data. It is written to a gzipped
+    JSON file and can be restored into planner inputs without touching the database.
+    """
+
+    # Which service call was captured: "optimized_plan", "incremental_plan" or "order_assignment"
+    kind: str
+    now: datetime
+    calendar: WorkCalendar
+    # (tech id, email, group, absences)
+    technicians: list[tuple[UUID, str, str, list[Interval]]]
+    # (tech id, start, end, operation id) of the intervals already in the timelines
+    busy: list[tuple[UUID, datetime, datetime, UUID]]
+    # Rows of OPERATION_FIELDS of all operations of the affected works
+    operations: list[tuple]
+    # Operations that had to be planned
+    planned: list[UUID]
+
+    @classmethod
+    def from_planner_input(
+        cls,
+        kind: str,
+        index: TimelineIndex,
+        operations: list[PlanOperation],
+        work_operations: list[PlanOperation],
+        now: datetime,
+    ) -> "PlanCapture":
+        technicians = []
+        busy = []
+        for tech_id, timeline in index.timelines.items():
+            technicians.append((tech_id, timeline.tech.email, timeline.group, list(timeline.calendar.absences)))
+            busy += [(tech_id, start, end, operation_id) for start, end, operation_id in timeline]
+
+        rows = [
+            (
+                op.id,
+                op.work_id,
+                op.ordinal_number,
+                op.group,
+                int(op.duration.total_seconds() // 60),
+                op.deadline,
+                op.is_exec_start_editable,
+                op.tech_id,
+                op.exec_start,
+                op.predecessors,
+            )
+            for op in work_operations
+        ]
+        return cls(kind, now, index.calendar, technicians, busy, rows, [op.id for op in operations])
+
+    def dump(self, path: str) -> None:
+        data = {
+            "version": FORMAT_VERSION,
+            "kind": self.kind,
+            "now": self.now.isoformat(),
+            "calendar": {
+                "shifts": {
+                    weekday: [[start.isoformat(), end.isoformat()] for start, end in pieces]
+                    for weekday, pieces in self.calendar.shifts.items()
+                },
+                "holidays": sorted(day.isoformat() for day in self.calendar.holidays),
+            },
+            "technicians": [
+                [str(tech_id), email, group, [_interval(absence) for absence in absences]]
+                for tech_id, email, group, absences in self.technicians
+            ],
+            "busy": [
+                [str(tech_id), start.isoformat(), end.isoformat(), str(operation_id)]
+                for tech_id, start, end, operation_id in self.busy
+            ],
+            "operation_fields": OPERATION_FIELDS,
+            "operations": [
+                [
+                    str(operation_id), str(work_id), ordinal_number, group, duration, deadline.isoformat(),
+                    editable, str(tech_id) if tech_id else None, exec_start.isoformat() if exec_start else None,
+                    list(predecessors) if predecessors is not None else None,
+                ]
+                for (operation_id, work_id, ordinal_number, group, duration, deadline, editable, tech_id, exec_start,
+                     predecessors) in self.operations
+            ],
+            "planned": [str(operation_id) for operation_id in self.planned],
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "PlanCapture":
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            data = json.load(file)
+        if data["version"] not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported capture format version {data['version']}")
+
+        calendar = WorkCalendar(
+            {
+                int(weekday): [(time.fromisoformat(start), time.fromisoformat(end)) for start, end in pieces]
+                for weekday, pieces in data["calendar"]["shifts"].items()
+            },
+            [date.fromisoformat(day) for day in data["calendar"]["holidays"]],
+        )
+        operations = [_parse_operation(row) for row in data["operations"]]
+        return cls(
+            kind=data["kind"],
+            now=datetime.fromisoformat(data["now"]),
+            calendar=calendar,
+            technicians=[
+                (UUID(tech_id), email, group, [_parse_interval(absence) for absence in absences])
+                for tech_id, email, group, absences in data["technicians"]
+            ],
+            busy=[
+                (UUID(tech_id), datetime.fromisoformat(start), datetime.fromisoformat(end), UUID(operation_id))
+                for tech_id, start, end, operation_id in data["busy"]
+            ],
+            operations=operations,
+            planned=[UUID(operation_id) for operation_id in data["planned"]],
+        )
+
+    def restore(self) -> tuple[TimelineIndex, list[PlanOperation], list[PlanOperation]]:
+        """
+        Returns fresh planner inputs: the timeline index, the operations to plan and all operations
+        of their works.
+        """
+        index = TimelineIndex(self.calendar)
+        for tech_id, email, group, absences in self.technicians:
+            calendar = self.calendar.with_absences(absences) if absences else self.calendar
+            index.add_technician(User(id=tech_id, email=email), group, calendar)
+        for tech_id, start, end, operation_id in self.busy:
+            index.add(tech_id, start, end, operation_id)
+
+        work_operations = [
+            PlanOperation(operation_id, work_id, ordinal_number, group, timedelta(minutes=duration), deadline,
+                          editable, tech_id, exec_start, predecessors)
+            for (operation_id, work_id, ordinal_number, group, duration, deadline, editable, tech_id, exec_start,
+                 predecessors) in self.operations
+        ]
+        planned = set(self.planned)
+        return index, [op for op in work_operations if op.id in planned], work_operations
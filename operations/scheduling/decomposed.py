@@ -0,0 +1,163 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+from uuid import UUID
+
+import pytz
+
+from .planner import TimelinePlanner
+from .precedence import Precedence
+from .records import PlanOperation
+from .timeline import TechTimeline, TimelineIndex
+from .workers import map_in_processes
+
+Assignment = dict[UUID, tuple[UUID, datetime, datetime]]
+
+
+@dataclass(slots=True)
+class GroupOperation:
+    id: UUID
+    duration: timedelta
+    # Predecessors planned in the same run
+    predecessors: tuple[UUID, ...]
+
+
+@dataclass
+class GroupProblem:
+    """
+    Operations of one group in planning order with plain copies of the group technician timelines.
+    """
+
+    group: str
+    operations: list[GroupOperation]
+    timelines: dict[UUID, TechTimeline]
+    pause: timedelta
+
+
+def plan_group(problem: GroupProblem, releases: dict[UUID, datetime]) -> Assignment:
+    """
+    Greedy plan of one group: every operation goes to the earliest slot not before its release time
+    and the ends of its predecessors that belong to the same group.
+    """
+    if not problem.timelines:
+        raise ValueError(f"No available technician for operation type {problem.group}")
+
+    timelines = {tech_id: timeline.copy() for tech_id, timeline in problem.timelines.items()}
+    assignment: Assignment = {}
+    for op in problem.operations:
+        earliest = releases[op.id]
+        for predecessor in op.predecessors:
+            if predecessor in assignment:
+                earliest = max(earliest, assignment[predecessor][2] + problem.pause)
+
+        best: tuple[datetime, datetime, UUID] | None = None
+        for tech_id, timeline in timelines.items():
+            start, end = timeline.first_fit(earliest, op.duration, problem.pause)
+            if best is None or start < best[0]:
+                best = (start, end, tech_id)
+
+        start, end, tech_id = best
+        timelines[tech_id].add(start, end, op.id)
+        assignment[op.id] = (tech_id, start, end)
+    return assignment
+
+
+class DecomposedPlanner:
+    """
+    Greedy planner that plans every operation group in its own worker process.
+
+    Groups share no technicians, so they only depend on each other through the order of operations
+    inside the works. The groups are planned in rounds: after each round the release time of every
+    operation is set to the latest end of its predecessors planned in other groups, until no release
+    time changes. The plan of TimelinePlanner is such a fixed point, and every round fixes at least one more
+    link of the cross-group chains; if the fixed point is not reached in `max_rounds`, the plan is made
+    by TimelinePlanner.
+    """
+
+    pause = TimelinePlanner.pause
+    max_rounds = 8
+
+    def __init__(
+        self,
+        index: TimelineIndex,
+        now: datetime | None = None,
+        map_func: Callable[..., Iterable] = map_in_processes,
+    ):
+        self.index = index
+        self.calendar = index.calendar
+        self.now = now or datetime.now(tz=pytz.UTC)
+        self.map_func = map_func
+        self.rounds = 0
+
+    def plan(self, operations: list[PlanOperation], work_operations: list[PlanOperation]) -> list[PlanOperation]:
+        """
+        Same contract as TimelinePlanner.plan.
+        """
+        planned_ids = {op.id for op in operations}
+        precedence = Precedence(work_operations)
+
+        base_releases: dict[UUID, datetime] = {}
+        predecessors: dict[UUID, tuple[UUID, ...]] = {}
+        groups: dict[str, list[GroupOperation]] = defaultdict(list)
+        for op in precedence.order(operations):
+            release = self.now
+            planned_predecessors = []
+            for prev_op in precedence.predecessors[op.id]:
+                if prev_op.id in planned_ids:
+                    planned_predecessors.append(prev_op.id)
+                elif prev_op.exec_start is not None:
+                    prev_end = self.calendar.end_of(prev_op.exec_start, prev_op.get_exec_duration())
+                    release = max(release, prev_end + self.pause)
+            if planned_predecessors:
+                predecessors[op.id] = tuple(planned_predecessors)
+            base_releases[op.id] = release
+            groups[op.group].append(
+                GroupOperation(op.id, op.get_exec_duration(), tuple(planned_predecessors))
+            )
+
+        problems = [
+            GroupProblem(group, group_operations, self._group_timelines(group, planned_ids), self.pause)
+            for group, group_operations in groups.items()
+        ]
+
+        releases = dict(base_releases)
+        assignment: Assignment = {}
+        for self.rounds in range(1, self.max_rounds + 1):
+            group_releases = [{op.id: releases[op.id] for op in problem.operations} for problem in problems]
+            assignment = {}
+            for group_assignment in self.map_func(plan_group, problems, group_releases):
+                assignment.update(group_assignment)
+
+            changed = False
+            for operation_id, predecessor_ids in predecessors.items():
+                release = max(
+                    base_releases[operation_id],
+                    *(assignment[predecessor_id][2] + self.pause for predecessor_id in predecessor_ids),
+                )
+                if release != releases[operation_id]:
+                    releases[operation_id] = release
+                    changed = True
+            if not changed:
+                return self._apply(operations, assignment)
+
+        return TimelinePlanner(self.index, self.now).plan(operations, work_operations)
+
+    def _group_timelines(self, group: str, planned_ids: set[UUID]) -> dict[UUID, TechTimeline]:
+        timelines: dict[UUID, TechTimeline] = {}
+        for timeline in self.index.groups.get(group, []):
+            fixed = TechTimeline(tech=None, group=group, calendar=timeline.calendar)
+            for start, end, operation_id in timeline:
+                if operation_id not in planned_ids:
+                    fixed.add(start, end, operation_id)
+            timelines[timeline.tech.id] = fixed
+        return timelines
+
+    def _apply(self, operations: list[PlanOperation], assignment: Assignment) -> list[PlanOperation]:
+        for op in operations:
+            tech_id, start, end = assignment[op.id]
+            self.index.remove(op.tech_id, op.id)
+            self.index.add(tech_id, start, end, op.id)
+            op.exec_start = start
+            op.tech_id = tech_id
+        return operations
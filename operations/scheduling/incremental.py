@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from .planner import TimelinePlanner
+from .records import PlanOperation
+
+
+class IncrementalPlanner(TimelinePlanner):
+    """
+    Treats the already planned schedule as fixed timelines and inserts new or changed operations
+    into their gaps. Successors are re-timed only when a placement breaks their order.
+    """
+
+    def _after_place(self, op: PlanOperation, end: datetime) -> None:
+        for successor in self.precedence.successors[op.id]:
+            if successor.exec_start is None or not successor.is_exec_start_editable:
+                continue
+            if successor.exec_start >= end + self.pause:
+                continue
+            self._place(successor)
@@ -0,0 +1,236 @@
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import pytz
+
+from .precedence import Precedence
+from .records import PlanOperation
+from .timeline import TechTimeline, TimelineIndex
+
+Assignment = dict[UUID, tuple[UUID, datetime, datetime]]
+Sequences = dict[UUID, list[UUID]]
+
+
+@dataclass(slots=True)
+class SearchOperation:
+    id: UUID
+    group: str
+    duration: timedelta
+    deadline: datetime
+    predecessors: tuple[UUID, ...]
+
+
+@dataclass(slots=True)
+class PlanMetrics:
+    # Minutes past the order deadlines, summed over the operations
+    tardiness: int
+    late_operations: int
+    # Minutes from the planning moment to the end of the last operation
+    makespan: int
+    # Share of the technicians working time up to the makespan that is booked
+    utilization: float
+
+    def cost(self) -> tuple[int, int]:
+        return self.tardiness, self.makespan
+
+
+@dataclass
+class SearchProblem:
+    """
+    Plain data copy of a greedy plan, picklable so that it can be improved in a worker process.
+    Timelines hold only the operations that cannot be moved.
+    """
+
+    operations: dict[UUID, SearchOperation]
+    fixed_ends: dict[UUID, datetime]
+    timelines: dict[UUID, TechTimeline]
+    techs_by_group: dict[str, list[UUID]]
+    greedy: Assignment
+    now: datetime
+    pause: timedelta
+
+    @classmethod
+    def from_plan(
+        cls,
+        operations: list[PlanOperation],
+        index: TimelineIndex,
+        now: datetime,
+        pause: timedelta,
+    ) -> "SearchProblem":
+        precedence = Precedence(operations)
+        search_operations: dict[UUID, SearchOperation] = {}
+        fixed_ends: dict[UUID, datetime] = {}
+        greedy: Assignment = {}
+
+        for op in operations:
+            duration = op.get_exec_duration()
+            if not op.is_exec_start_editable:
+                if op.exec_start:
+                    fixed_ends[op.id] = index.calendar.end_of(op.exec_start, duration)
+                continue
+            deadline = datetime.combine(op.deadline + timedelta(days=1), datetime.min.time(), pytz.UTC)
+            search_operations[op.id] = SearchOperation(
+                id=op.id,
+                group=op.group,
+                duration=duration,
+                deadline=deadline,
+                predecessors=tuple(predecessor.id for predecessor in precedence.predecessors[op.id]),
+            )
+            calendar = index.timelines[op.tech_id].calendar
+            greedy[op.id] = (op.tech_id, op.exec_start, calendar.end_of(op.exec_start, duration))
+
+        timelines: dict[UUID, TechTimeline] = {}
+        techs_by_group: dict[str, list[UUID]] = {}
+        for tech_id, timeline in index.timelines.items():
+            fixed = TechTimeline(tech=None, group=timeline.group, calendar=timeline.calendar)
+            for start, end, operation_id in timeline:
+                if operation_id not in search_operations:
+                    fixed.add(start, end, operation_id)
+            timelines[tech_id] = fixed
+            techs_by_group.setdefault(timeline.group, []).append(tech_id)
+
+        return cls(search_operations, fixed_ends, timelines, techs_by_group, greedy, now, pause)
+
+    def evaluate(self, assignment: Assignment) -> PlanMetrics:
+        tardiness = timedelta(0)
+        late_operations = 0
+        makespan_end = self.now
+        booked = timedelta(0)
+        for operation_id, (_, start, end) in assignment.items():
+            late = end - self.operations[operation_id].deadline
+            if late > timedelta(0):
+                tardiness += late
+                late_operations += 1
+            makespan_end = max(makespan_end, end)
+            booked += self.operations[operation_id].duration
+
+        available = timedelta(0)
+        for timeline in self.timelines.values():
+            available += timeline.calendar.working_time_between(self.now, makespan_end)
+            for start, end, _ in timeline:
+                if start >= self.now and end <= makespan_end:
+                    booked += timeline.calendar.working_time_between(start, end)
+
+        return PlanMetrics(
+            tardiness=int(tardiness.total_seconds() // 60),
+            late_operations=late_operations,
+            makespan=int((makespan_end - self.now).total_seconds() // 60),
+            utilization=round(booked / available, 4) if available else 0.0,
+        )
+
+    def decode(self, sequences: Sequences) -> Assignment | None:
+        """
+        Builds a schedule in which every technician takes the operations in the order of his sequence.
+        Returns None if the sequences contradict the order of operations inside the works.
+        """
+        timelines = {tech_id: timeline.copy() for tech_id, timeline in self.timelines.items()}
+        positions = {tech_id: 0 for tech_id in sequences}
+        assignment: Assignment = {}
+        remaining = sum(len(sequence) for sequence in sequences.values())
+
+        while remaining:
+            best: tuple[datetime, datetime, UUID, UUID] | None = None
+            for tech_id, sequence in sequences.items():
+                position = positions[tech_id]
+                if position == len(sequence):
+                    continue
+                op = self.operations[sequence[position]]
+                earliest = self._ready_at(op, assignment)
+                if earliest is None:
+                    continue
+                start, end = timelines[tech_id].first_fit(earliest, op.duration, self.pause)
+                if best is None or start < best[0]:
+                    best = (start, end, tech_id, op.id)
+
+            if best is None:
+                return None
+
+            start, end, tech_id, operation_id = best
+            timelines[tech_id].add(start, end, operation_id)
+            assignment[operation_id] = (tech_id, start, end)
+            positions[tech_id] += 1
+            remaining -= 1
+
+        return assignment
+
+    def _ready_at(self, op: SearchOperation, assignment: Assignment) -> datetime | None:
+        ready = self.now
+        for predecessor in op.predecessors:
+            if predecessor in assignment:
+                ready = max(ready, assignment[predecessor][2] + self.pause)
+            elif predecessor in self.operations:
+                return None
+            elif predecessor in self.fixed_ends:
+                ready = max(ready, self.fixed_ends[predecessor] + self.pause)
+        return ready
+
+    def _neighbour(self, sequences: Sequences, rng: random.Random) -> Sequences | None:
+        tech_from = rng.choice([tech_id for tech_id, sequence in sequences.items() if sequence])
+        position_from = rng.randrange(len(sequences[tech_from]))
+        op = self.operations[sequences[tech_from][position_from]]
+        tech_to = rng.choice(self.techs_by_group[op.group])
+
+        candidate = dict(sequences)
+        if rng.random() < 0.5:
+            # Move the operation to another place of the same or another technician
+            candidate[tech_from] = list(sequences[tech_from])
+            del candidate[tech_from][position_from]
+            candidate[tech_to] = list(candidate[tech_to]) if tech_to != tech_from else candidate[tech_from]
+            candidate[tech_to].insert(rng.randint(0, len(candidate[tech_to])), op.id)
+            return candidate
+
+        # Swap with an operation of the same group
+        others = [
+            position for position, operation_id in enumerate(sequences[tech_to])
+            if self.operations[operation_id].group == op.group and operation_id != op.id
+        ]
+        if not others:
+            return None
+        position_to = rng.choice(others)
+        candidate[tech_from] = list(sequences[tech_from])
+        candidate[tech_to] = list(sequences[tech_to]) if tech_to != tech_from else candidate[tech_from]
+        candidate[tech_from][position_from], candidate[tech_to][position_to] = (
+            candidate[tech_to][position_to], candidate[tech_from][position_from]
+        )
+        return candidate
+
+
+def improve_plan(problem: SearchProblem, time_budget: float, seed: int | None = None) -> tuple[
+    Assignment, PlanMetrics, PlanMetrics
+]:
+    """
+    Starts from the greedy plan and improves it by moves and swaps between technicians of the same group
+    until the time budget (in seconds) is spent. Returns the best assignment with the greedy and the
+    improved metrics.
+    """
+    deadline = time.monotonic() + time_budget
+    rng = random.Random(seed)
+
+    greedy_metrics = problem.evaluate(problem.greedy)
+    best, best_metrics = problem.greedy, greedy_metrics
+
+    sequences: Sequences = {tech_id: [] for tech_id in problem.timelines}
+    for operation_id, (tech_id, start, _) in sorted(problem.greedy.items(), key=lambda item: item[1][1]):
+        sequences[tech_id].append(operation_id)
+    current = problem.decode(sequences)
+    if current is None or not sequences or not problem.operations:
+        return best, greedy_metrics, best_metrics
+    current_cost = problem.evaluate(current).cost()
+
+    while time.monotonic() < deadline:
+        candidate = problem._neighbour(sequences, rng)
+        if candidate is None:
+            continue
+        assignment = problem.decode(candidate)
+        if assignment is None:
+            continue
+        metrics = problem.evaluate(assignment)
+        if metrics.cost() <= current_cost:
+            sequences, current_cost = candidate, metrics.cost()
+            if metrics.cost() < best_metrics.cost():
+                best, best_metrics = assignment, metrics
+
+    return best, greedy_metrics, best_metrics
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import pytz
+
+from .precedence import Precedence
+from .records import PlanOperation
+from .timeline import TimelineIndex
+
+
+class TimelinePlanner:
+    """
+    Greedy planner: every operation goes to the earliest slot of its group that respects
+    its predecessors in the work. Idle gaps between planned operations are reused.
+    """
+
+    pause = timedelta(minutes=5)
+
+    def __init__(self, index: TimelineIndex, now: datetime | None = None):
+        self.index = index
+        self.calendar = index.calendar
+        self.now = now or datetime.now(tz=pytz.UTC)
+        self.precedence: Precedence | None = None
+        self.changed: dict[UUID, PlanOperation] = {}
+
+    def plan(self, operations: list[PlanOperation], work_operations: list[PlanOperation]) -> list[PlanOperation]:
+        """
+        Places `operations` (sorted by deadline, work and ordinal number) by deadline and critical path.
+        `work_operations` are all operations of the affected works, the same instances as in `operations`.
+        Returns the operations whose technician or start time has changed.
+        """
+        self.precedence = Precedence(work_operations)
+        for op in self.precedence.order(operations):
+            if op.id not in self.changed:
+                self._place(op)
+
+        return list(self.changed.values())
+
+    def _predecessor_end(self, op: PlanOperation) -> datetime:
+        return max(
+            (
+                self.calendar.end_of(prev_op.exec_start, prev_op.get_exec_duration()) + self.pause
+                for prev_op in self.precedence.predecessors[op.id]
+                if prev_op.exec_start is not None
+            ),
+            default=self.now,
+        )
+
+    def _place(self, op: PlanOperation) -> None:
+        self.index.remove(op.tech_id, op.id)
+
+        earliest = max(self.now, self._predecessor_end(op))
+        start, end, timeline = self.index.first_fit(
+            op.group, earliest, op.get_exec_duration(), self.pause
+        )
+        timeline.add(start, end, op.id)
+        op.exec_start = start
+        op.tech_id = timeline.tech.id
+        self.changed[op.id] = op
+
+        self._after_place(op, end)
+
+    def _after_place(self, op: PlanOperation, end: datetime) -> None:
+        pass
@@ -0,0 +1,77 @@
+import heapq
+from datetime import date, timedelta
+from uuid import UUID
+
+from .records import PlanOperation
+
+
+class Precedence:
+    """
+    Dependency graph of the operations of the affected works. The predecessors and successors of every
+    operation are found once, together with its critical path tail: its duration plus the longest chain
+    of durations of the operations that wait for it.
+    """
+
+    def __init__(self, work_operations: list[PlanOperation]):
+        by_work_ordinal = {(op.work_id, op.ordinal_number): op for op in work_operations}
+        self.predecessors: dict[UUID, list[PlanOperation]] = {}
+        self.successors: dict[UUID, list[PlanOperation]] = {op.id: [] for op in work_operations}
+        for op in work_operations:
+            predecessors = [
+                by_work_ordinal[(op.work_id, number)]
+                for number in op.predecessor_numbers()
+                if (op.work_id, number) in by_work_ordinal
+            ]
+            self.predecessors[op.id] = predecessors
+            for predecessor in predecessors:
+                self.successors[predecessor.id].append(op)
+        self.tails = self._tails(work_operations)
+
+    def _tails(self, work_operations: list[PlanOperation]) -> dict[UUID, timedelta]:
+        """
+        Walks the graph from the last operations of the works back to the first ones.
+        """
+        waiting = {op.id: len(self.successors[op.id]) for op in work_operations}
+        ready = [op for op in work_operations if not waiting[op.id]]
+        tails: dict[UUID, timedelta] = {}
+        while ready:
+            op = ready.pop()
+            tails[op.id] = op.get_exec_duration() + max(
+                (tails[successor.id] for successor in self.successors[op.id]), default=timedelta(0)
+            )
+            for predecessor in self.predecessors[op.id]:
+                waiting[predecessor.id] -= 1
+                if not waiting[predecessor.id]:
+                    ready.append(predecessor)
+
+        if len(tails) != len(work_operations):
+            work_id = next(op.work_id for op in work_operations if op.id not in tails)
+            raise ValueError(f"The order of operations of work {work_id} has a cycle")
+        return tails
+
+    def order(self, operations: list[PlanOperation]) -> list[PlanOperation]:
+        """
+        Planning order of `operations`: every operation comes after its predecessors, among the ready ones
+        the earliest deadline goes first and then the longest critical path tail.
+        """
+        planned = {op.id for op in operations}
+        waiting = {
+            op.id: sum(predecessor.id in planned for predecessor in self.predecessors[op.id]) for op in operations
+        }
+        positions = {op.id: position for position, op in enumerate(operations)}
+
+        def key(op: PlanOperation) -> tuple:
+            return op.deadline or date.max, -self.tails[op.id], positions[op.id]
+
+        ready = [(key(op), op) for op in operations if not waiting[op.id]]
+        heapq.heapify(ready)
+        ordered = []
+        while ready:
+            _, op = heapq.heappop(ready)
+            ordered.append(op)
+            for successor in self.successors[op.id]:
+                if successor.id in planned:
+                    waiting[successor.id] -= 1
+                    if not waiting[successor.id]:
+                        heapq.heappush(ready, (key(successor), successor))
+        return ordered
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterable
+from uuid import UUID
+
+from django.db.models import QuerySet
+
+from operations.models import Operation, WorkTypeOperationType
+
+
+class WorkTypePrecedence:
+    """
+    Explicit predecessors of the steps of work types. The steps of a work type in which no step has
+    predecessors follow each other by ordinal number.
+    """
+
+    def __init__(self, steps: Iterable[tuple[UUID, int, list[int]]]):
+        # (work type id, ordinal number) -> ordinal numbers of the predecessors
+        self.predecessors: dict[tuple[UUID, int], tuple[int, ...]] = {}
+        self.work_type_ids: set[UUID] = set()
+        for work_type_id, ordinal_number, predecessors in steps:
+            if predecessors:
+                self.predecessors[(work_type_id, ordinal_number)] = tuple(predecessors)
+                self.work_type_ids.add(work_type_id)
+
+    @classmethod
+    def load(cls, work_type_ids: Iterable[UUID]) -> "WorkTypePrecedence":
+        return cls(
+            WorkTypeOperationType.objects
+            .filter(work_type_id__in=set(work_type_ids), predecessors__len__gt=0)
+            .values_list("work_type_id", "ordinal_number", "predecessors")
+        )
+
+    def get(self, work_type_id: UUID, ordinal_number: int) -> tuple[int, ...] | None:
+        """
+        Predecessors of a step, None when the work type is linear.
+        """
+        if work_type_id not in self.work_type_ids:
+            return None
+        return self.predecessors.get((work_type_id, ordinal_number), ())
+
+
+@dataclass(slots=True)
+class PlanOperation:
+    """
+    What the planners need to know about an operation, loaded from one values query.
+    """
+
+    id: UUID
+    work_id: UUID
+    ordinal_number: int
+    group: str
+    duration: timedelta
+    # None for operations of orders that do not exist yet
+    deadline: date | None
+    is_exec_start_editable: bool
+    tech_id: UUID | None
+    exec_start: datetime | None
+    # Ordinal numbers of the operations of the work that must be finished first, None for the previous one
+    predecessors: tuple[int, ...] | None = None
+
+    FIELDS = (
+        "id",
+        "work_id",
+        "work__work_type_id",
+        "ordinal_number",
+        "operation_type__group",
+        "duration",
+        "work__order__deadline",
+        "is_exec_start_editable",
+        "tech_id",
+        "exec_start",
+    )
+    LOAD_CHUNK_SIZE = 2000
+
+    def get_exec_duration(self) -> timedelta:
+        return self.duration
+
+    def predecessor_numbers(self) -> tuple[int, ...]:
+        if self.predecessors is None:
+            return (self.ordinal_number - 1,)
+        return self.predecessors
+
+    @classmethod
+    def load(cls, operations: QuerySet, *extra_fields: str) -> list["PlanOperation"] | list[tuple]:
+        """
+        Loads the operations of the queryset in the planning order. With `extra_fields` every item is
+        a (record, *extra values) tuple.
+        """
+        rows = list(
+            operations
+            .order_by("work__order__deadline", "work_id", "ordinal_number")
+            .values_list(*cls.FIELDS, *extra_fields)
+            .iterator(chunk_size=cls.LOAD_CHUNK_SIZE)
+        )
+        if not rows:
+            return []
+        precedence = WorkTypePrecedence.load({row[2] for row in rows})
+        size = len(cls.FIELDS)
+        if not extra_fields:
+            return [cls._from_row(row, precedence) for row in rows]
+        return [(cls._from_row(row[:size], precedence), *row[size:]) for row in rows]
+
+    @classmethod
+    def _from_row(cls, row: tuple, precedence: WorkTypePrecedence) -> "PlanOperation":
+        (operation_id, work_id, work_type_id, ordinal_number, group, duration, deadline, editable, tech_id,
+         exec_start) = row
+        return cls(operation_id, work_id, ordinal_number, group, timedelta(minutes=duration), deadline, editable,
+                   tech_id, exec_start, precedence.get(work_type_id, ordinal_number))
+
+
+def changed_operations(records: list[PlanOperation], original: dict[UUID, tuple]) -> list[Operation]:
+    """
+    Returns unsaved operations with the new technician and start of the records that have changed
+    compared to `original` (operation id -> (tech id, exec start)), ready for bulk_update.
+    """
+    return [
+        Operation(id=record.id, tech_id=record.tech_id, exec_start=record.exec_start)
+        for record in records
+        if original.get(record.id) != (record.tech_id, record.exec_start)
+    ]
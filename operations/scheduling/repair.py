@@ -0,0 +1,169 @@
+import heapq
+import itertools
+from datetime import datetime
+from uuid import UUID
+
+from django.db.models import QuerySet
+
+from operations.models import Operation, OperationStatus
+
+from .planner import TimelinePlanner
+from .precedence import Precedence
+from .records import PlanOperation
+from .timeline import TimelineIndex
+
+
+class ScheduleRepair:
+    """
+    Shifts the operations that follow an operation which ends earlier or later than planned: its
+    successors in the work, the operations it now overlaps in the technician timeline, and then everything
+    that has to move because of them. Works and technician timelines are loaded when the ripple first
+    reaches them, so the cost grows with the number of touched operations, not with the backlog.
+
+    Only editable operations that have not been started are moved, and they stay with their technician.
+    A moved operation frees its old place, so the next operation of the technician may move up into it.
+    """
+
+    pause = TimelinePlanner.pause
+
+    def __init__(self, index: TimelineIndex, now: datetime):
+        # Technicians with their calendars, the timelines are filled on demand
+        self.index = index
+        self.calendar = index.calendar
+        self.now = now
+        self.operations: dict[UUID, PlanOperation] = {}
+        self.original: dict[UUID, tuple] = {}
+        self.precedence: dict[UUID, Precedence] = {}
+        self.loaded_techs: set[UUID] = set()
+        # The operation whose actual end is known and its end
+        self.trigger: PlanOperation | None = None
+        self.ends: dict[UUID, datetime] = {}
+        self._queue: list[tuple[datetime, int, UUID]] = []
+        self._counter = itertools.count()
+
+    @staticmethod
+    def _load(operations: QuerySet) -> list[PlanOperation]:
+        started = {OperationStatus.get_in_progress_status().id, OperationStatus.get_completed_status().id}
+        records = []
+        for record, status_id in PlanOperation.load(operations, "operation_status_id"):
+            # Started operations keep their place and still block the technician
+            record.is_exec_start_editable = record.is_exec_start_editable and status_id not in started
+            records.append(record)
+        return records
+
+    def load_work(self, work_id: UUID) -> list[PlanOperation]:
+        return self._load(
+            Operation.objects
+            .filter(work_id=work_id)
+            .exclude(operation_status=OperationStatus.get_completed_status())
+        )
+
+    def load_technician(self, tech_id: UUID) -> list[PlanOperation]:
+        return self._load(Operation.objects.filter(tech_id=tech_id, exec_range__overlap=(self.now, None)))
+
+    def _register(self, record: PlanOperation) -> PlanOperation:
+        if record.id in self.operations:
+            return self.operations[record.id]
+        self.operations[record.id] = record
+        self.original[record.id] = (record.tech_id, record.exec_start)
+        if record.tech_id in self.loaded_techs and record.exec_start is not None:
+            self.index.add(record.tech_id, record.exec_start, self._end(record), record.id)
+        return record
+
+    def _work(self, work_id: UUID) -> Precedence:
+        if work_id not in self.precedence:
+            records = [self._register(record) for record in self.load_work(work_id)]
+            # A completed trigger is not loaded with its work, but its successors still wait for it
+            if self.trigger.work_id == work_id and self.trigger not in records:
+                records.append(self.trigger)
+            self.precedence[work_id] = Precedence(records)
+        return self.precedence[work_id]
+
+    def _technician(self, tech_id: UUID | None) -> None:
+        if tech_id is None or tech_id in self.loaded_techs or tech_id not in self.index.timelines:
+            return
+        self.loaded_techs.add(tech_id)
+        for record in self.load_technician(tech_id):
+            record = self._register(record)
+            if record.tech_id == tech_id and record.exec_start is not None:
+                self.index.remove(tech_id, record.id)
+                self.index.add(tech_id, record.exec_start, self._end(record), record.id)
+
+    def _end(self, op: PlanOperation) -> datetime:
+        if op.id in self.ends:
+            return self.ends[op.id]
+        return self.calendar.end_of(op.exec_start, op.get_exec_duration())
+
+    def _push(self, operation_id: UUID | None) -> None:
+        op = self.operations.get(operation_id)
+        if op is not None and op.exec_start is not None:
+            heapq.heappush(self._queue, (op.exec_start, next(self._counter), op.id))
+
+    def _push_next(self, tech_id: UUID, moment: datetime) -> None:
+        timeline = self.index.timelines.get(tech_id)
+        if timeline is not None:
+            self._push(timeline.next_operation(moment))
+
+    def repair(self, operation: PlanOperation, end: datetime) -> list[PlanOperation]:
+        """
+        Takes `end` as the actual end of the operation and moves the operations that depend on it.
+        Returns the operations whose start has changed.
+        """
+        self._technician(operation.tech_id)
+        operation = self.trigger = self._register(operation)
+        planned_end = self._end(operation)
+        self.ends[operation.id] = end
+        # The database keeps the planned interval of the operation, so its place only grows
+        self.index.remove(operation.tech_id, operation.id)
+        self.index.add(operation.tech_id, operation.exec_start, max(end, planned_end), operation.id)
+
+        for successor in self._work(operation.work_id).successors.get(operation.id, []):
+            self._push(successor.id)
+        timeline = self.index.timelines.get(operation.tech_id)
+        if timeline is not None:
+            for operation_id in timeline.overlapping(operation.exec_start, end, self.pause):
+                if operation_id != operation.id:
+                    self._push(operation_id)
+
+        while self._queue:
+            start, _, operation_id = heapq.heappop(self._queue)
+            op = self.operations[operation_id]
+            if op.exec_start == start:
+                self._move(op)
+
+        return [
+            op for op in self.operations.values()
+            if self.original[op.id] != (op.tech_id, op.exec_start)
+        ]
+
+    def _move(self, op: PlanOperation) -> None:
+        if (
+            op is self.trigger
+            or not op.is_exec_start_editable
+            or op.tech_id not in self.index.timelines
+        ):
+            return
+        self._technician(op.tech_id)
+        precedence = self._work(op.work_id)
+        earliest = max(
+            (
+                self._end(prev_op) + self.pause
+                for prev_op in precedence.predecessors.get(op.id, [])
+                if prev_op.exec_start is not None
+            ),
+            default=self.now,
+        )
+
+        timeline = self.index.timelines[op.tech_id]
+        old_start = op.exec_start
+        timeline.remove(op.id)
+        start, end = timeline.first_fit(max(self.now, earliest), op.get_exec_duration(), self.pause)
+        timeline.add(start, end, op.id)
+        if start == old_start:
+            return
+
+        op.exec_start = start
+        for successor in precedence.successors.get(op.id, []):
+            self._push(successor.id)
+        # The next operation of the technician may move up into the freed place
+        self._push_next(op.tech_id, old_start)
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from uuid import UUID
+
+import pytz
+from django.db import connection
+
+from .precedence import Precedence
+from .records import PlanOperation
+from .work_calendar import WorkCalendar
+
+# Everything the slack of an order is computed from: its deadline and its operations
+ORDER_FINGERPRINTS_SQL = """
+    SELECT o.id, md5(concat_ws('|', o.deadline,
+                               string_agg(concat_ws(':', op.id, op.version), ',' ORDER BY op.id)))
+    FROM orders_order o
+    JOIN works_work w ON w.order_id = o.id
+    JOIN operations_operation op ON op.work_id = w.id
+    WHERE o.status_id <> %(canceled)s
+    GROUP BY o.id
+    HAVING bool_or(op.operation_status_id IS DISTINCT FROM %(completed)s)
+"""
+
+
+def order_fingerprints(canceled_status_id: UUID, completed_status_id: UUID) -> dict[UUID, str]:
+    """
+    Hash of the deadline and the operations of every not cancelled order with unfinished operations,
+    computed by one query.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(ORDER_FINGERPRINTS_SQL, {"canceled": canceled_status_id, "completed": completed_status_id})
+        return dict(cursor.fetchall())
+
+
+@dataclass(slots=True)
+class OrderSlack:
+    """
+    How far the unfinished operations of an order are from its deadline.
+    """
+
+    deadline: date
+    # Working minutes of the longest chain of unfinished operations
+    critical_path: int
+    # End of the last operation, unassigned operations are projected to the earliest working time
+    finish: datetime
+    # Working minutes from the finish to the end of the deadline day, negative when the order is late
+    slack: int
+    at_risk: bool
+
+    @classmethod
+    def analyze(
+        cls, operations: list[PlanOperation], calendar: WorkCalendar, now: datetime, pause: timedelta
+    ) -> "OrderSlack":
+        """
+        One pass over the operations of an order in the order of precedence: assigned operations end
+        where they are planned, the others start after their predecessors and not before `now`.
+        """
+        precedence = Precedence(operations)
+        ends: dict[UUID, datetime] = {}
+        for op in precedence.order(operations):
+            if op.exec_start is not None:
+                ends[op.id] = calendar.end_of(op.exec_start, op.get_exec_duration())
+                continue
+            earliest = max(
+                (ends[prev_op.id] + pause for prev_op in precedence.predecessors[op.id]), default=now
+            )
+            ends[op.id] = calendar.fit(max(now, earliest), op.get_exec_duration())[1]
+
+        deadline = operations[0].deadline
+        deadline_end = datetime.combine(deadline + timedelta(days=1), time(), tzinfo=pytz.UTC)
+        finish = max(ends.values())
+        if finish <= deadline_end:
+            slack = calendar.working_time_between(finish, deadline_end)
+        else:
+            slack = -calendar.working_time_between(deadline_end, finish)
+        return cls(
+            deadline=deadline,
+            critical_path=int(max(precedence.tails.values()).total_seconds() // 60),
+            finish=finish,
+            slack=int(slack / timedelta(minutes=1)),
+            at_risk=finish > deadline_end,
+        )
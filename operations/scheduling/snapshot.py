@@ -0,0 +1,56 @@
+import threading
+from datetime import datetime
+from typing import Callable, TypeVar
+
+import pytz
+
+from core.models import ScheduleVersion
+from operations.models import Operation
+
+from .timeline import TechTimeline, TimelineIndex
+from .work_calendar import WorkCalendar
+
+T = TypeVar("T")
+
+
+class ScheduleSnapshot:
+    """
+    Technician timelines of the current schedule kept in memory between requests.
+    The snapshot is rebuilt when ScheduleVersion or the day changes; every caller works on its own copy.
+    """
+
+    _lock = threading.Lock()
+    _key: tuple[int, datetime] | None = None
+    _index: TimelineIndex | None = None
+
+    @staticmethod
+    def _today() -> datetime:
+        # The work calendar is in UTC
+        return datetime.now(tz=pytz.UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def _load(cls, today: datetime) -> TimelineIndex:
+        index = TimelineIndex.for_technicians(WorkCalendar.load())
+        index.load_busy(Operation.objects.filter(exec_start__gte=today))
+        return index
+
+    @staticmethod
+    def _clone(index: TimelineIndex) -> TimelineIndex:
+        clone = TimelineIndex(index.calendar)
+        for tech_id, timeline in index.timelines.items():
+            copy: TechTimeline = timeline.copy()
+            clone.timelines[tech_id] = copy
+            clone.groups[copy.group].append(copy)
+        return clone
+
+    @classmethod
+    def run(cls, func: Callable[[TimelineIndex], T]) -> T:
+        """
+        Calls `func` with a copy of the current timelines. Calls are serialized, because the work
+        calendars shared by the copies compile their intervals lazily.
+        """
+        key = (ScheduleVersion.current(), cls._today())
+        with cls._lock:
+            if cls._index is None or cls._key != key:
+                cls._index, cls._key = cls._load(key[1]), key
+            return func(cls._clone(cls._index))
@@ -0,0 +1,227 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from django.db.models import F, QuerySet
+
+from accounts.models import TECH_GROUP_NAMES, User
+from operations.models import TechnicianAbsence
+
+from .work_calendar import Interval, WorkCalendar
+
+
+class TechTimeline:
+    """
+    Busy intervals of one technician, kept sorted by start time.
+
+    Every lookup only scans the intervals starting in [start - longest interval, end), so overlap checks
+    and gap searches cost O(log n) plus the few neighbours actually touching the queried window.
+    """
+
+    def __init__(self, tech: User | None, group: str | None, calendar: WorkCalendar | None = None):
+        self.tech = tech
+        self.group = group
+        self.calendar = calendar
+        self._starts: list[datetime] = []
+        self._intervals: list[tuple[datetime, datetime, UUID]] = []
+        self._by_operation: dict[UUID, tuple[datetime, datetime, UUID]] = {}
+        self._longest = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __iter__(self):
+        return iter(self._intervals)
+
+    def copy(self) -> "TechTimeline":
+        timeline = TechTimeline(self.tech, self.group, self.calendar)
+        timeline._starts = list(self._starts)
+        timeline._intervals = list(self._intervals)
+        timeline._by_operation = dict(self._by_operation)
+        timeline._longest = self._longest
+        return timeline
+
+    def add(self, start: datetime, end: datetime, operation_id: UUID) -> None:
+        interval = (start, end, operation_id)
+        index = bisect_right(self._intervals, interval)
+        self._intervals.insert(index, interval)
+        self._starts.insert(index, start)
+        self._by_operation[operation_id] = interval
+        self._longest = max(self._longest, end - start)
+
+    def remove(self, operation_id: UUID) -> None:
+        interval = self._by_operation.pop(operation_id, None)
+        if interval is None:
+            return
+        index = bisect_left(self._intervals, interval)
+        del self._intervals[index]
+        del self._starts[index]
+
+    def next_operation(self, moment: datetime) -> UUID | None:
+        """
+        Returns the first operation starting at or after `moment`.
+        """
+        index = bisect_left(self._starts, moment)
+        return self._intervals[index][2] if index < len(self._intervals) else None
+
+    def _lower_bound(self, start: datetime, pause: timedelta) -> int:
+        # No interval starting at or before this point can reach `start`
+        return bisect_right(self._starts, start - self._longest - pause)
+
+    def overlapping(self, start: datetime, end: datetime, pause: timedelta = timedelta(0)) -> list[UUID]:
+        """
+        Returns the operations that are closer than `pause` to the [start, end) interval.
+        """
+        lower = self._lower_bound(start, pause)
+        upper = bisect_left(self._starts, end + pause)
+        return [
+            operation_id
+            for busy_start, busy_end, operation_id in self._intervals[lower:upper]
+            if busy_end + pause > start
+        ]
+
+    def first_fit(self, earliest: datetime, duration: timedelta, pause: timedelta) -> Interval:
+        """
+        Returns the earliest (start, end) not before `earliest` that fits between the busy intervals
+        with `pause` on both sides and lies in the working time of the technician calendar.
+        """
+        start, end = self.calendar.fit(earliest, duration)
+        index = self._lower_bound(start, pause)
+
+        while index < len(self._intervals):
+            busy_start, busy_end, _ = self._intervals[index]
+            if busy_end + pause <= start:
+                index += 1
+                continue
+            if end + pause <= busy_start:
+                break
+            start, end = self.calendar.fit(busy_end + pause, duration)
+            index += 1
+
+        return start, end
+
+    def free_gaps(self, start: datetime, end: datetime, pause: timedelta) -> list[Interval]:
+        """
+        Returns the gaps inside [start, end) that keep `pause` to the busy intervals.
+        """
+        gaps: list[Interval] = []
+        cursor = start
+        for busy_start, busy_end, _ in self._intervals[self._lower_bound(start, pause):]:
+            if busy_start >= end + pause:
+                break
+            if busy_start - pause > cursor:
+                gaps.append((cursor, min(busy_start - pause, end)))
+            cursor = max(cursor, busy_end + pause)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+
+class TimelineIndex:
+    """
+    Timelines of all technicians, grouped by the operation group they work in.
+    """
+
+    BUSY_FIELDS = (
+        "id",
+        "tech_id",
+        "exec_start",
+        "duration",
+    )
+
+    def __init__(self, calendar: WorkCalendar):
+        self.calendar = calendar
+        self.timelines: dict[UUID, TechTimeline] = {}
+        self.groups: dict[str, list[TechTimeline]] = defaultdict(list)
+
+    @classmethod
+    def for_technicians(cls, calendar: WorkCalendar, group: str | None = None) -> "TimelineIndex":
+        index = cls(calendar)
+        tech_group_ids = [
+            group_id for group_id, tech_group in TECH_GROUP_NAMES.items()
+            if tech_group and (group is None or tech_group == group)
+        ]
+        technicians = User.objects.filter(groups__id__in=tech_group_ids).annotate(group_id=F("groups__id"))
+
+        absences: dict[UUID, list[Interval]] = defaultdict(list)
+        for tech_id, start, end in (
+            TechnicianAbsence.objects
+            .filter(is_active=True, tech__groups__id__in=tech_group_ids)
+            .values_list("tech_id", "start", "end")
+        ):
+            absences[tech_id].append((start, end))
+
+        for tech in technicians:
+            tech_calendar = calendar.with_absences(absences[tech.id]) if tech.id in absences else calendar
+            index.add_technician(tech, TECH_GROUP_NAMES[tech.group_id], tech_calendar)
+        return index
+
+    def add_technician(self, tech: User, group: str | None, calendar: WorkCalendar | None = None) -> TechTimeline:
+        if tech.id not in self.timelines:
+            timeline = TechTimeline(tech, group, calendar or self.calendar)
+            self.timelines[tech.id] = timeline
+            self.groups[group].append(timeline)
+        return self.timelines[tech.id]
+
+    def add(self, tech_id: UUID, start: datetime, end: datetime, operation_id: UUID) -> None:
+        timeline = self.timelines.get(tech_id)
+        if timeline is not None:
+            timeline.add(start, end, operation_id)
+
+    def remove(self, tech_id: UUID | None, operation_id: UUID) -> None:
+        timeline = self.timelines.get(tech_id)
+        if timeline is not None:
+            timeline.remove(operation_id)
+
+    LOAD_CHUNK_SIZE = 2000
+
+    def load_busy(self, operations: QuerySet) -> None:
+        """
+        Marks the assigned operations of the queryset as busy intervals without instantiating models.
+        """
+        busy = operations.filter(tech__isnull=False, exec_start__isnull=False).values_list(*self.BUSY_FIELDS)
+        for operation_id, tech_id, exec_start, duration in busy.iterator(chunk_size=self.LOAD_CHUNK_SIZE):
+            end = self.calendar.end_of(exec_start, timedelta(minutes=duration))
+            self.add(tech_id, exec_start, end, operation_id)
+
+    def first_fit(
+        self,
+        group: str,
+        earliest: datetime,
+        duration: timedelta,
+        pause: timedelta,
+    ) -> tuple[datetime, datetime, TechTimeline]:
+        """
+        Returns the earliest slot over all technicians of the group and the timeline it belongs to.
+        """
+        timelines = self.groups.get(group)
+        if not timelines:
+            raise ValueError(f"No available technician for operation type {group}")
+
+        best: tuple[datetime, datetime, TechTimeline] | None = None
+        for timeline in timelines:
+            start, end = timeline.first_fit(earliest, duration, pause)
+            if best is None or start < best[0]:
+                best = (start, end, timeline)
+        return best
+
+    def free_slots(
+        self,
+        group: str,
+        start: datetime,
+        end: datetime,
+        pause: timedelta,
+        min_duration: timedelta = timedelta(0),
+    ) -> list[tuple[TechTimeline, datetime, datetime]]:
+        """
+        Returns the free slots of the group technicians inside their working time in [start, end).
+        """
+        slots = []
+        for timeline in self.groups.get(group, []):
+            for period_start, period_end in timeline.calendar.working_periods(start, end):
+                for gap_start, gap_end in timeline.free_gaps(period_start, period_end, pause):
+                    if gap_end - gap_start >= min_duration:
+                        slots.append((timeline, gap_start, gap_end))
+        slots.sort(key=lambda slot: (slot[1], slot[0].tech.email))
+        return slots
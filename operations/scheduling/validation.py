@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from .records import WorkTypePrecedence
+from .work_calendar import WorkCalendar
+
+OPERATIONS_ORDER_ERROR = "Порядок операций нарушен"
+DEADLINE_ERROR = "Срок выполнения заказа нарушен"
+NO_PAUSE_ERROR = "Между операциями должен быть перерыв 5+ минут"
+OPERATION_IN_BREAK_ERROR = "Операция во время обеденного перерыва"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.UTC)
+EPOCH_ORDINAL = EPOCH.toordinal()
+MICROSECOND = timedelta(microseconds=1)
+MICROSECONDS_PER_DAY = timedelta(days=1) // MICROSECOND
+
+
+def to_microseconds(moments: list[datetime]) -> np.ndarray:
+    """
+    Microseconds since the epoch, naive moments are taken as UTC.
+    """
+    return np.fromiter(
+        (((moment if moment.tzinfo else moment.replace(tzinfo=pytz.UTC)) - EPOCH) // MICROSECOND for moment in moments),
+        dtype=np.int64,
+        count=len(moments),
+    )
+
+
+def _codes(values: list) -> np.ndarray:
+    """
+    Numbers the distinct values in the order of their first appearance.
+    """
+    codes: dict = {}
+    return np.array([codes.setdefault(value, len(codes)) for value in values], dtype=np.int64)
+
+
+def _pause_conflicts(starts: np.ndarray, ends: np.ndarray, techs: np.ndarray, pause: int) -> np.ndarray:
+    """
+    Operations closer than `pause` to another operation of the same technician.
+
+    With the operations of a technician sorted by start, an operation conflicts with an earlier one
+    exactly when the latest end among the earlier ones is closer than `pause` to its start, and with
+    a later one exactly when the next start is closer than `pause` to its end.
+    """
+    conflicts = np.zeros(len(starts), dtype=bool)
+    order = np.lexsort((starts, techs))
+    starts, ends, techs = starts[order], ends[order], techs[order]
+    same_tech = techs[1:] == techs[:-1]
+
+    # Shift every technician above the previous ones so that one running maximum does not leak between them
+    origin = min(starts.min(), ends.min())
+    span = max(starts.max(), ends.max()) - origin + 1
+    shifted = ends - origin + techs * span
+    latest_end = np.maximum.accumulate(shifted)[:-1] - techs[1:] * span + origin
+
+    after_previous = same_tech & (latest_end + pause > starts[1:])
+    before_next = same_tech & (starts[1:] < ends[:-1] + pause)
+    conflicts[order[1:][after_previous]] = True
+    conflicts[order[:-1][before_next]] = True
+    return conflicts
+
+
+def _in_breaks(starts: np.ndarray, ends: np.ndarray, calendar: WorkCalendar) -> np.ndarray:
+    """
+    Operations touching a break between two working intervals of one day.
+    """
+    first = EPOCH + int(starts.min()) * MICROSECOND
+    last = EPOCH + int(ends.max()) * MICROSECOND
+    breaks = calendar.breaks(first, last)
+    if not breaks:
+        return np.zeros(len(starts), dtype=bool)
+
+    break_starts = to_microseconds([start for start, _ in breaks])
+    break_ends = to_microseconds([end for _, end in breaks])
+    # The breaks do not overlap, the first one ending after the start is the only candidate
+    index = np.searchsorted(break_ends, starts, side="right")
+    found = index < len(breaks)
+    return found & (break_starts[np.minimum(index, len(breaks) - 1)] < ends)
+
+
+def _precedence_pairs(operations: list[dict], precedence: WorkTypePrecedence) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Positions of the (predecessor, successor) rows of the work types with explicit predecessors.
+    """
+    positions = {
+        (operation["work_id"], operation["ordinal_number"]): position
+        for position, operation in enumerate(operations)
+        if operation["work"]["work_type"]["id"] in precedence.work_type_ids
+    }
+    pairs = [
+        (positions[(work_id, number)], position)
+        for (work_id, ordinal_number), position in positions.items()
+        for number in precedence.get(operations[position]["work"]["work_type"]["id"], ordinal_number)
+        if (work_id, number) in positions
+    ]
+    if not pairs:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    before, after = np.array(pairs, dtype=np.int64).T
+    return before, after
+
+
+def validate_schedule(
+    operations: list[dict],
+    calendar: WorkCalendar,
+    pause: timedelta,
+    precedence: WorkTypePrecedence | None = None,
+) -> list[dict]:
+    """
+    Marks the schedule rows that break the schedule rules with `error` and `error_description` and returns
+    them grouped by work. All rules are checked at once on arrays of the row times, when a row breaks
+    several rules, the order of operations is reported first, then the deadline, the break and the pause.
+    Rows of the work types with explicit predecessors in `precedence` are checked against them.
+    """
+    if not operations:
+        return []
+
+    starts = to_microseconds([operation["start"] for operation in operations])
+    ends = to_microseconds([operation["end"] for operation in operations])
+    works = _codes([operation["work_id"] for operation in operations])
+    pause_us = pause // MICROSECOND
+
+    no_pause = np.zeros(len(operations), dtype=bool)
+    in_break = np.zeros(len(operations), dtype=bool)
+    assigned = np.array([operation["resource_id"] is not None for operation in operations], dtype=bool)
+    if assigned.any():
+        positions = np.flatnonzero(assigned)
+        techs = _codes([operations[position]["resource_id"] for position in positions])
+        no_pause[positions] = _pause_conflicts(starts[positions], ends[positions], techs, pause_us)
+
+        longest = calendar.longest_interval // MICROSECOND
+        short = positions[ends[positions] - starts[positions] <= longest]
+        if len(short):
+            in_break[short] = _in_breaks(starts[short], ends[short], calendar)
+
+    # Operations of linear works are compared with the previous one in the order they were given
+    grouped = np.argsort(works, kind="stable")
+    linear = works[grouped[1:]] == works[grouped[:-1]]
+    before, after = grouped[:-1], grouped[1:]
+    if precedence is not None and precedence.work_type_ids:
+        explicit = np.array(
+            [operation["work"]["work_type"]["id"] in precedence.work_type_ids for operation in operations],
+            dtype=bool,
+        )
+        linear &= ~explicit[after]
+        edge_before, edge_after = _precedence_pairs(operations, precedence)
+        before = np.concatenate([before[linear], edge_before])
+        after = np.concatenate([after[linear], edge_after])
+    else:
+        before, after = before[linear], after[linear]
+
+    out_of_order = ends[before] >= starts[after]
+    wrong_order = np.zeros(len(operations), dtype=bool)
+    wrong_order[before[out_of_order]] = True
+    wrong_order[after[out_of_order]] = True
+
+    checked = after[~out_of_order]
+    deadlines = np.fromiter(
+        (operations[position]["deadline"].toordinal() for position in checked), dtype=np.int64, count=len(checked)
+    )
+    late = np.zeros(len(operations), dtype=bool)
+    late[checked[ends[checked] // MICROSECONDS_PER_DAY + EPOCH_ORDINAL > deadlines]] = True
+
+    errors = [
+        (wrong_order, OPERATIONS_ORDER_ERROR),
+        (late, DEADLINE_ERROR),
+        (in_break, OPERATION_IN_BREAK_ERROR),
+        (no_pause, NO_PAUSE_ERROR),
+    ]
+    descriptions = np.select([flags for flags, _ in errors], [description for _, description in errors], "")
+    for position in np.flatnonzero(descriptions != ""):
+        operations[position]["error"] = True
+        operations[position]["error_description"] = str(descriptions[position])
+
+    return [operations[position] for position in grouped]
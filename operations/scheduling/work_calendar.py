@@ -0,0 +1,234 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator
+
+import pytz
+
+from operations.models import DEFAULT_WORK_SHIFTS, Holiday, WorkShift
+
+Interval = tuple[datetime, datetime]
+
+
+def _subtract(intervals: list[Interval], cut_start: datetime, cut_end: datetime) -> list[Interval]:
+    result = []
+    for start, end in intervals:
+        if cut_end <= start or end <= cut_start:
+            result.append((start, end))
+            continue
+        if start < cut_start:
+            result.append((start, cut_start))
+        if cut_end < end:
+            result.append((cut_end, end))
+    return result
+
+
+class WorkCalendar:
+    """
+    Working time of the lab compiled into sorted working intervals together with the working time
+    accumulated before each of them. "Next working instant" and "add N working minutes" are binary
+    searches over the compiled intervals. The intervals are compiled lazily, a couple of months ahead.
+    """
+
+    # Used while no shifts are configured
+    DEFAULT_SHIFTS = DEFAULT_WORK_SHIFTS
+    COMPILE_DAYS = 62
+    MAX_SEARCH_DAYS = 366
+
+    def __init__(
+        self,
+        shifts: dict[int, list[tuple[time, time]]],
+        holidays: Iterable[date] = (),
+        absences: Iterable[Interval] = (),
+    ):
+        self.shifts = {weekday: sorted(pieces) for weekday, pieces in shifts.items()}
+        self.holidays = frozenset(holidays)
+        self.absences = sorted(absences)
+        self.longest_interval = max(
+            (
+                datetime.combine(date.min, end) - datetime.combine(date.min, start)
+                for pieces in self.shifts.values() for start, end in pieces
+            ),
+            default=timedelta(0),
+        )
+        if self.longest_interval <= timedelta(0):
+            raise ValueError("Work calendar has no working time")
+
+        self._first_day: date | None = None
+        self._last_day: date | None = None
+        self._starts: list[datetime] = []
+        self._ends: list[datetime] = []
+        self._offsets: list[timedelta] = []
+
+    @classmethod
+    def load(cls) -> "WorkCalendar":
+        shifts: dict[int, list[tuple[time, time]]] = defaultdict(list)
+        for shift in WorkShift.objects.filter(is_active=True):
+            if shift.break_start and shift.break_end:
+                shifts[shift.weekday] += [(shift.start, shift.break_start), (shift.break_end, shift.end)]
+            else:
+                shifts[shift.weekday].append((shift.start, shift.end))
+        holidays = Holiday.objects.filter(is_active=True).values_list("date", flat=True)
+        return cls(shifts or cls.DEFAULT_SHIFTS, holidays)
+
+    def with_absences(self, absences: Iterable[Interval]) -> "WorkCalendar":
+        return WorkCalendar(self.shifts, self.holidays, absences)
+
+    def _day_intervals(self, day: date) -> list[Interval]:
+        if day in self.holidays:
+            return []
+        intervals = [
+            (datetime.combine(day, start, tzinfo=pytz.UTC), datetime.combine(day, end, tzinfo=pytz.UTC))
+            for start, end in self.shifts.get(day.weekday(), [])
+            if start < end
+        ]
+        for absence_start, absence_end in self.absences:
+            intervals = _subtract(intervals, absence_start, absence_end)
+        return intervals
+
+    def _append_days(self, last_day: date) -> None:
+        total = self._offsets[-1] + (self._ends[-1] - self._starts[-1]) if self._starts else timedelta(0)
+        day = self._last_day
+        while day < last_day:
+            for start, end in self._day_intervals(day):
+                self._starts.append(start)
+                self._ends.append(end)
+                self._offsets.append(total)
+                total += end - start
+            day += timedelta(days=1)
+        self._last_day = last_day
+
+    def _ensure(self, day: date) -> None:
+        """
+        Compiles the working intervals up to `day` and a couple of months after it.
+        """
+        if self._first_day is None or day < self._first_day:
+            last_day = max(self._last_day or day, day) + timedelta(days=self.COMPILE_DAYS)
+            self._starts, self._ends, self._offsets = [], [], []
+            self._first_day = self._last_day = day
+            self._append_days(last_day)
+        elif day >= self._last_day:
+            self._append_days(day + timedelta(days=self.COMPILE_DAYS))
+
+    def _extend(self, searched_from: date) -> None:
+        if (self._last_day - searched_from).days > self.MAX_SEARCH_DAYS:
+            raise ValueError("No working time in the calendar")
+        self._ensure(self._last_day)
+
+    @staticmethod
+    def _aware(moment: datetime) -> datetime:
+        return moment.replace(tzinfo=pytz.UTC) if moment.tzinfo is None else moment
+
+    def _interval_index(self, moment: datetime) -> int:
+        """
+        Index of the first working interval that ends after `moment`.
+        """
+        self._ensure(moment.date())
+        index = bisect_right(self._ends, moment)
+        while index == len(self._ends):
+            self._extend(moment.date())
+        return index
+
+    def _offset(self, moment: datetime) -> timedelta:
+        index = self._interval_index(moment)
+        if moment <= self._starts[index]:
+            return self._offsets[index]
+        return self._offsets[index] + (moment - self._starts[index])
+
+    def next_working_instant(self, moment: datetime) -> datetime:
+        moment = self._aware(moment)
+        index = self._interval_index(moment)
+        return max(moment, self._starts[index])
+
+    def add_working_time(self, moment: datetime, duration: timedelta) -> datetime:
+        """
+        Returns the moment when `duration` of working time starting at `moment` has passed.
+        """
+        moment = self._aware(moment)
+        if duration <= timedelta(0):
+            return moment
+
+        target = self._offset(moment) + duration
+        while self._offsets[-1] + (self._ends[-1] - self._starts[-1]) < target:
+            self._extend(moment.date())
+
+        index = bisect_left(self._offsets, target) - 1
+        return self._starts[index] + (target - self._offsets[index])
+
+    def add_working_minutes(self, moment: datetime, minutes: int) -> datetime:
+        return self.add_working_time(moment, timedelta(minutes=minutes))
+
+    def working_time_between(self, start: datetime, end: datetime) -> timedelta:
+        start, end = self._aware(start), self._aware(end)
+        if end <= start:
+            return timedelta(0)
+        # The start goes first: compiling an earlier day renumbers the offsets, a later one only appends
+        start_offset = self._offset(start)
+        return self._offset(end) - start_offset
+
+    def end_of(self, start: datetime, duration: timedelta) -> datetime:
+        """
+        End of an operation started at `start`. Only operations longer than any working interval
+        are continued after breaks and nights.
+        """
+        if duration > self.longest_interval:
+            return self.add_working_time(start, duration)
+        return start + duration
+
+    def fit(self, start: datetime, duration: timedelta) -> Interval:
+        """
+        Returns the earliest (start, end) not before `start` that lies inside one working interval.
+        Operations longer than any working interval start at the next working instant and are continued
+        in the following intervals.
+        """
+        start = self._aware(start)
+        if duration > self.longest_interval:
+            start = self.next_working_instant(start)
+            return start, self.add_working_time(start, duration)
+
+        index = self._interval_index(start)
+        while True:
+            candidate = max(start, self._starts[index])
+            if self._ends[index] - candidate >= duration:
+                return candidate, candidate + duration
+            index += 1
+            while index == len(self._ends):
+                self._extend(start.date())
+
+    def working_periods(self, start: datetime, end: datetime) -> list[Interval]:
+        """
+        Returns the working intervals clipped to [start, end).
+        """
+        start, end = self._aware(start), self._aware(end)
+        self._ensure(start.date())
+        self._ensure(end.date())
+        periods = []
+        for index in range(bisect_right(self._ends, start), len(self._ends)):
+            if self._starts[index] >= end:
+                break
+            periods.append((max(start, self._starts[index]), min(end, self._ends[index])))
+        return periods
+
+    def _breaks(self, start: datetime, end: datetime) -> Iterator[Interval]:
+        start, end = self._aware(start), self._aware(end)
+        self._ensure(start.date())
+        self._ensure(end.date())
+        index = max(bisect_right(self._ends, start) - 1, 0)
+        while index + 1 < len(self._starts) and self._ends[index] < end:
+            gap_start, gap_end = self._ends[index], self._starts[index + 1]
+            if gap_start.date() == gap_end.date() and gap_start < end and start < gap_end:
+                yield gap_start, gap_end
+            index += 1
+
+    def overlaps_break(self, start: datetime, end: datetime) -> bool:
+        """
+        Returns True if [start, end) touches the non-working time between two working intervals of one day.
+        """
+        return next(self._breaks(start, end), None) is not None
+
+    def breaks(self, start: datetime, end: datetime) -> list[Interval]:
+        """
+        Returns the non-working gaps between two working intervals of one day that touch [start, end),
+        sorted by time.
+        """
+        return list(self._breaks(start, end))
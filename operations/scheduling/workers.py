@@ -0,0 +1,67 @@
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.context import BaseContext
+
+import django
+from django.conf import settings
+from django.db import connection
+
+_process_pool: ProcessPoolExecutor | None = None
+_thread_pool: ThreadPoolExecutor | None = None
+
+
+def _new_process_pool(mp_context: BaseContext | None = None) -> ProcessPoolExecutor:
+    # Workers started by "spawn" or "forkserver" import the planning modules, and with them the models, into
+    # a fresh interpreter: Django has to be set up there first. The initializer must not live in this package,
+    # it is unpickled before it runs. The settings module is taken from the inherited environment.
+    return ProcessPoolExecutor(
+        max_workers=settings.PLANNER_PROCESSES,
+        mp_context=mp_context,
+        initializer=django.setup,
+    )
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = _new_process_pool()
+    return _process_pool
+
+
+def run_in_process(func, *args, timeout: float | None = None):
+    """
+    Runs a CPU-bound planning function in the shared worker process pool and waits for the result.
+    """
+    return map_in_processes(func, *([arg] for arg in args), timeout=timeout)[0]
+
+
+def map_in_processes(func, *iterables, timeout: float | None = None) -> list:
+    """
+    Calls `func` for every set of arguments at once in the shared worker process pool.
+    Returns the results in the order of the arguments.
+    """
+    global _process_pool
+    pool = _get_process_pool()
+    try:
+        futures = [pool.submit(func, *args) for args in zip(*iterables)]
+        return [future.result(timeout=timeout) for future in futures]
+    except BrokenProcessPool:
+        _process_pool = None
+        raise
+
+
+def _close_connection_after(func, *args):
+    try:
+        return func(*args)
+    finally:
+        connection.close()
+
+
+def run_in_background(func, *args) -> Future:
+    """
+    Runs a planning job in a background thread of the web process. The job uses its own database connection.
+    """
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=settings.PLAN_JOB_THREADS, thread_name_prefix="plan-job")
+    return _thread_pool.submit(_close_connection_after, func, *args)
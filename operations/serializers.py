@@ -1,10 +1,11 @@
 from datetime import time
+from uuid import UUID
 
 from rest_framework import serializers
 
 from accounts.serializers import UserProfileSerializer
 from core.serializers import PaginationSerializer
-from operations.models import OperationType, OperationStatus, Operation, OperationEvent
+from operations.models import OperationType, OperationStatus, Operation, OperationEvent, PlanJob
 from orders.models import Order
 from orders.serializers import OrderFileSerializer
 
@@ -48,6 +49,7 @@ class FullOperationSerializer(serializers.ModelSerializer):
             "history",
             "is_exec_start_editable",
             "exec_time",
+            "duration",
         ]
 
     def get_exec_time(self, obj: Operation) -> time:
@@ -76,6 +78,7 @@ class OperationSerializer(serializers.ModelSerializer):
             "ordinal_number",
             "is_exec_start_editable",
             "exec_time",
+            "duration",
             "files",
             "color",
         ]
@@ -92,6 +95,22 @@ class OperationSerializer(serializers.ModelSerializer):
         return obj.work.order.tooth_color
 
 
+class MovedOperationSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    exec_start = serializers.DateTimeField()
+
+
+class UpdatedOperationSerializer(OperationSerializer):
+    """
+    Operation after a status update with the operations the schedule repair has moved.
+    """
+
+    moved_operations = MovedOperationSerializer(many=True, read_only=True)
+
+    class Meta(OperationSerializer.Meta):
+        fields = OperationSerializer.Meta.fields + ["moved_operations"]
+
+
 class OperationsPaginatedListSerializer(PaginationSerializer):
     results = OperationSerializer(many=True)
 
@@ -105,6 +124,8 @@ class OperationForTechScheduleSerializer(serializers.Serializer):
     work = WorkSerializer(required=True)
     editable = serializers.BooleanField(required=True)
     exec_time = serializers.TimeField(required=True)
+    duration = serializers.IntegerField(required=True)
+    version = serializers.IntegerField(required=True)
 
 
 class OperationForScheduleSerializer(OperationForTechScheduleSerializer):
@@ -113,6 +134,131 @@ class OperationForScheduleSerializer(OperationForTechScheduleSerializer):
     error_description = serializers.CharField()
 
 
+class ScheduleWorkSerializer(WorkSerializer):
+    """
+    Work of a schedule entry, the cost is already computed from the projection row.
+    """
+
+    def get_cost(self, obj: dict) -> float:
+        return obj["cost"]
+
+
+class ScheduleEntryForTechSerializer(OperationForTechScheduleSerializer):
+    work = ScheduleWorkSerializer(required=True)
+
+
+class ScheduleEntrySerializer(OperationForScheduleSerializer):
+    work = ScheduleWorkSerializer(required=True)
+
+
+class GeneratePlanSerializer(serializers.Serializer):
+    mode = serializers.ChoiceField(choices=["greedy", "local_search"], required=False, default="greedy")
+    # Seconds the local search may spend improving the greedy plan
+    time_budget = serializers.FloatField(required=False, min_value=0.1, max_value=60, default=5)
+
+
+class PlanMetricsSerializer(serializers.Serializer):
+    tardiness = serializers.IntegerField()
+    late_operations = serializers.IntegerField()
+    makespan = serializers.IntegerField()
+    utilization = serializers.FloatField()
+
+
+class PlanComparisonSerializer(serializers.Serializer):
+    greedy = PlanMetricsSerializer()
+    improved = PlanMetricsSerializer()
+
+
+class OptimizedPlanSerializer(serializers.Serializer):
+    operations = ScheduleEntrySerializer(many=True)
+    metrics = PlanComparisonSerializer()
+
+
+class PlanJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlanJob
+        fields = [
+            "id",
+            "status",
+            "progress",
+            "mode",
+            "order",
+            "time_budget",
+            "snapshot_version",
+            "error",
+            "result",
+            "created_at",
+            "finished_at",
+        ]
+
+
+class PlanDraftOperationSerializer(serializers.Serializer):
+    operation_id = serializers.UUIDField()
+    tech_email = serializers.CharField(allow_null=True)
+    exec_start = serializers.DateTimeField()
+    # Placement of the operation in the current schedule
+    current_tech_email = serializers.CharField(allow_null=True)
+    current_exec_start = serializers.DateTimeField(allow_null=True)
+    version = serializers.IntegerField()
+    # The operation has changed since the plan was built
+    stale = serializers.BooleanField()
+
+
+class PlanDraftSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    snapshot_version = serializers.IntegerField(allow_null=True)
+    # The schedule has not changed since the plan was built
+    is_current = serializers.BooleanField()
+    operations = PlanDraftOperationSerializer(many=True)
+
+
+class ScheduleExportQuerySerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(choices=["ndjson", "csv"], required=False, default="ndjson")
+    tech_email = serializers.CharField(required=False)
+    group = serializers.ChoiceField(choices=OperationType.OperationGroup.values, required=False)
+
+
+class FreeSlotsQuerySerializer(serializers.Serializer):
+    min_duration = serializers.IntegerField(required=False, min_value=0, default=0)
+
+
+class FreeSlotSerializer(serializers.Serializer):
+    resource_id = serializers.CharField()
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class CapacityRowSerializer(serializers.Serializer):
+    # Working minutes per day of CapacitySerializer.days
+    booked = serializers.ListField(child=serializers.IntegerField())
+    available = serializers.ListField(child=serializers.IntegerField())
+
+
+class GroupCapacitySerializer(CapacityRowSerializer):
+    group = serializers.CharField()
+    name = serializers.CharField()
+
+
+class TechnicianCapacitySerializer(CapacityRowSerializer):
+    resource_id = serializers.CharField()
+    group = serializers.CharField()
+
+
+class CapacitySerializer(serializers.Serializer):
+    days = serializers.ListField(child=serializers.DateField())
+    groups = GroupCapacitySerializer(many=True)
+    technicians = TechnicianCapacitySerializer(many=True)
+
+
+class OrderSlackSerializer(serializers.Serializer):
+    order = serializers.UUIDField()
+    deadline = serializers.DateField()
+    critical_path = serializers.IntegerField()
+    finish = serializers.DateTimeField()
+    slack = serializers.IntegerField()
+    at_risk = serializers.BooleanField()
+
+
 class SetOperationDataSerializer(serializers.Serializer):
     operation_id = serializers.UUIDField()
     tech_email = serializers.CharField(required=False)
@@ -134,17 +280,47 @@ class UpdateOperationStatusSerializer(serializers.Serializer):
 
 
 class ApplyOperationsSerializer(serializers.Serializer):
-    operation_id = serializers.CharField(required=True)
+    operation_id = serializers.UUIDField(required=True)
     tech_email = serializers.CharField(required=True)
     exec_start = serializers.DateTimeField(required=True)
+    # Version of the operation the plan was built from
+    version = serializers.IntegerField(required=True)
 
 
 class ApplyOperationsPlanSerializer(serializers.Serializer):
     operations = ApplyOperationsSerializer(many=True)
 
 
+class PlanConflictSerializer(serializers.Serializer):
+    operation_id = serializers.UUIDField()
+    reason = serializers.ChoiceField(choices=["not_found", "changed", "tech_not_found", "double_booking"])
+    version = serializers.IntegerField(allow_null=True)
+
+
+class PlanConflictsSerializer(serializers.Serializer):
+    conflicts = PlanConflictSerializer(many=True)
+
+
+class IncrementalPlanSerializer(serializers.Serializer):
+    operations = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+
+
 class AssignOrderOperations(serializers.Serializer):
     order = serializers.PrimaryKeyRelatedField(
         queryset=Order.objects.all(),
         pk_field=serializers.UUIDField(),
     )
+
+
+class AssignOrdersOperations(serializers.Serializer):
+    orders = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate_orders(self, value: list[UUID]) -> list[Order]:
+        # One query for the whole batch instead of one per primary key
+        orders = list(Order.objects.filter(id__in=value))
+        missing = set(value) - {order.id for order in orders}
+        if missing:
+            raise serializers.ValidationError(
+                f"Заказы не найдены: {', '.join(sorted(str(order_id) for order_id in missing))}"
+            )
+        return orders
@@ -1,22 +1,80 @@
-import heapq
+import csv
+import json
+import os
 from collections import defaultdict
-from datetime import datetime, timedelta, time
+from dataclasses import asdict
+from datetime import datetime, timedelta
 from uuid import UUID
 
 import pytz
+from django.conf import settings
+from django.core.cache import cache
 from django.core.handlers.wsgi import WSGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, ExpressionWrapper, BooleanField, QuerySet
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from djangorestframework_camel_case.util import camelize
 from rest_framework import status
 from rest_framework.response import Response
 
 from accounts.models import User
-from accounts.services.user_service import UserService
+from core.models import ScheduleVersion
 from core.paginations import StandardResultsSetPagination
+from operations.scheduling import (
+    BackfillPlanner,
+    CapacityGrid,
+    DecomposedPlanner,
+    IncrementalPlanner,
+    OrderSlack,
+    PlanCapture,
+    PlanOperation,
+    ScheduleRepair,
+    SearchProblem,
+    TimelineIndex,
+    TimelinePlanner,
+    WorkCalendar,
+    WorkTypePrecedence,
+    capacity_fingerprint,
+    changed_operations,
+    improve_plan,
+    order_fingerprints,
+    run_in_background,
+    run_in_process,
+    validate_schedule,
+)
+from operations.models import PlanDraftOperation, ScheduleEntry
 from operations.serializers import *
-from works.models import Work
+from orders.models import OrderStatus
+from works.models import Work, WorkStatus
+from works.service import WorkService
+
+
+class _LineBuffer:
+    """
+    File-like object for csv.writer that returns the written line instead of storing it.
+    """
+
+    def write(self, value: str) -> str:
+        return value
 
 
 class OperationService:
+    PAUSE = timedelta(minutes=5)
+    TECH_BUSY_ERROR = "Техник уже занят в это время"
+
+    @staticmethod
+    def _double_booked_operation(error: IntegrityError) -> UUID | None:
+        """
+        Returns the operation rejected by the double-booking trigger, None for other integrity errors.
+        """
+        diag = getattr(error.__cause__, "diag", None)
+        if diag is None or diag.sqlstate != "23P01" or not diag.message_detail:
+            return None
+        return UUID(diag.message_detail)
+
     @staticmethod
     def get_for_tech(request: WSGIRequest) -> Response:
         user = request.user
@@ -40,111 +98,168 @@ class OperationService:
         return Response(serializer.data)
 
     @staticmethod
-    def _preprocess_operation_for_schedule(operation: Operation, with_tech: bool = False) -> dict[
-        str, UUID | datetime | OperationType | OperationStatus | Work | list
-    ]:
-        processed = {}
-        exec_time = operation.get_exec_time()
-        delta = timedelta(hours=exec_time.hour, minutes=exec_time.minute, seconds=exec_time.second)
-
-        processed["id"] = operation.id
-        processed["start"] = operation.exec_start
-        processed["end"] = operation.exec_start + delta
-        processed["operation_type"] = operation.operation_type
-        processed["operation_status"] = operation.operation_status
-        processed["work"] = operation.work
-        processed["editable"] = operation.is_exec_start_editable
-        processed["deadline"] = operation.work.order.deadline
-        processed["exec_time"] = operation.get_exec_time()
+    def _schedule_entry_for_schedule(entry: ScheduleEntry, with_tech: bool = False) -> dict:
+        """
+        Schedule row of an operation, built from the schedule projection without extra queries.
+        """
+        processed = {
+            "id": entry.operation_id,
+            "work_id": entry.work_id,
+            "ordinal_number": entry.ordinal_number,
+            "start": entry.exec_start,
+            "end": entry.exec_end,
+            "operation_type": {
+                "id": entry.operation_type_id,
+                "name": entry.operation_type_name,
+                "exec_time_per_item": entry.exec_time_per_item,
+                "fixed_exec_time": entry.fixed_exec_time,
+                "group": entry.group,
+            },
+            "operation_status": {
+                "id": entry.operation_status_id,
+                "name": entry.operation_status_name,
+                "number": entry.operation_status_number,
+            } if entry.operation_status_id else None,
+            "work": {
+                "id": entry.work_id,
+                "work_type": {"id": entry.work_type_id, "name": entry.work_type_name, "cost": entry.work_type_cost},
+                "work_status": {"id": entry.work_status_id, "name": entry.work_status_name},
+                "discount": entry.work_discount,
+                "amount": entry.work_amount,
+                "cost": Work.calculate_cost(
+                    entry.work_type_cost, entry.work_amount, max(entry.work_discount, entry.order_discount)
+                ),
+                "teeth": entry.work_teeth,
+            },
+            "editable": entry.editable,
+            "deadline": entry.deadline,
+            "exec_time": Operation.duration_as_time(entry.duration),
+            "duration": entry.duration,
+            "version": entry.version,
+        }
         if with_tech:
-            processed["resource_id"] = operation.tech.email if operation.tech else None
-            processed["group_id"] = operation.operation_type.group
+            processed["resource_id"] = entry.tech_email
+            processed["group_id"] = entry.group
             processed["error"] = False
             processed["error_description"] = ""
 
         return processed
 
     @staticmethod
-    def _group_operations_by_work(operations: list[dict]) -> list[dict]:
-        operations_order_error = "Порядок операций нарушен"
-        deadline_error = "Срок выполнения заказа нарушен"
-        no_pause_error = "Между операциями должен быть перерыв 5+ минут"
-        operation_in_break_error = "Операция во время обеденного перерыва"
-
-        break_start = time(hour=8)
-        break_end = time(hour=9)
-
-        work_operations: dict[int, list[dict]] = defaultdict(list)
-        tech_operations: dict[int, list[dict]] = defaultdict(list)
-
-        for operation in operations:
-            work_operations[operation["work"].id].append(operation)
-            tech_operations[operation["resource_id"]].append(operation)
-
-        for tech_email, operations in tech_operations.items():
-            sorted_operations = sorted(operations, key=lambda op: op["start"])
-
-            for i in range(1, len(sorted_operations)):
-                if sorted_operations[i]["start"] - sorted_operations[i - 1]["end"] < timedelta(minutes=5):
-                    sorted_operations[i - 1]["error"] = True
-                    sorted_operations[i - 1]["error_description"] = no_pause_error
-                    sorted_operations[i]["error"] = True
-                    sorted_operations[i]["error_description"] = no_pause_error
-
-            for i in range(len(sorted_operations)):
-                operation = sorted_operations[i]
-                op_start = operation["start"].time()
-                op_end = operation["end"].time()
-                if break_start < op_end and op_start < break_end:
-                    sorted_operations[i]["error"] = True
-                    sorted_operations[i]["error_description"] = operation_in_break_error
-
-        for work, operations in work_operations.items():
-            for i in range(1, len(operations)):
-                if operations[i - 1]["end"] >= operations[i]["start"]:
-                    operations[i - 1]["error"] = True
-                    operations[i - 1]["error_description"] = operations_order_error
-                    operations[i]["error"] = True
-                    operations[i]["error_description"] = operations_order_error
-                elif operations[i]["end"].date() > operations[i]["deadline"]:
-                    operations[i]["error"] = True
-                    operations[i]["error_description"] = deadline_error
+    def _group_operations_by_work(operations: list[dict], calendar: WorkCalendar) -> list[dict]:
+        precedence = WorkTypePrecedence.load({operation["work"]["work_type"]["id"] for operation in operations})
+        return validate_schedule(operations, calendar, OperationService.PAUSE, precedence)
 
+    @staticmethod
+    def _planned_for_schedule(
+        records: list[PlanOperation],
+        index: TimelineIndex,
+        calendar: WorkCalendar,
+    ) -> list[dict]:
+        """
+        Schedule rows of the planned operations: the projection rows with the planned technician and start.
+        """
+        entries = ScheduleEntry.objects.in_bulk([record.id for record in records])
         operations = []
-        for operations_row in work_operations.values():
-            operations += operations_row
-
-        return operations
+        for record in records:
+            if record.id not in entries:
+                continue
+            operation = OperationService._schedule_entry_for_schedule(entries[record.id], with_tech=True)
+            operation["start"] = record.exec_start
+            operation["end"] = calendar.end_of(record.exec_start, record.duration)
+            if record.tech_id in index.timelines:
+                operation["resource_id"] = index.timelines[record.tech_id].tech.email
+            operations.append(operation)
+        return OperationService._group_operations_by_work(operations, calendar)
 
     def get_for_tech_schedule(self, date: str, user_email: str) -> Response:
         date_start = datetime.strptime(date, "%d.%m.%Y").date()
         date_end = date_start + timedelta(days=5)
-        user = User.objects.filter(email=user_email).first()
-        operations = (
-            Operation.objects
-            .filter(tech=user, exec_start__gte=str(date_start), exec_start__lte=str(date_end))
+        entries = ScheduleEntry.objects.filter(
+            tech_email=user_email, exec_start__lte=str(date_end), exec_end__gte=str(date_start)
         )
-        operations = [
-            self._preprocess_operation_for_schedule(operation) for operation in operations
-        ]
-        serializer = OperationForTechScheduleSerializer(operations, many=True)
+        operations = [self._schedule_entry_for_schedule(entry) for entry in entries]
+        serializer = ScheduleEntryForTechSerializer(operations, many=True)
         return Response(serializer.data)
 
     def get_for_schedule(self, date: str) -> Response:
         date_start = datetime.strptime(date, "%d.%m.%Y").date() - timedelta(days=1)
         date_end = date_start + timedelta(days=15)
-        operations = (
-            Operation.objects
+        entries = (
+            ScheduleEntry.objects
             .filter(exec_start__gte=str(date_start), exec_start__lte=str(date_end))
             .order_by("ordinal_number")
         )
-        operations = [
-            self._preprocess_operation_for_schedule(operation, with_tech=True) for operation in operations
-        ]
-        operations = self._group_operations_by_work(operations)
-        serializer = OperationForScheduleSerializer(operations, many=True)
+        operations = [self._schedule_entry_for_schedule(entry, with_tech=True) for entry in entries]
+        operations = self._group_operations_by_work(operations, WorkCalendar.load())
+        serializer = ScheduleEntrySerializer(operations, many=True)
         return Response(serializer.data)
 
+    EXPORT_FIELDS = (
+        "operation_id",
+        "exec_start",
+        "exec_end",
+        "duration",
+        "tech_email",
+        "group",
+        "operation_type_name",
+        "operation_status_name",
+        "editable",
+        "order_id",
+        "deadline",
+        "work_id",
+        "work_type_name",
+        "work_amount",
+    )
+    EXPORT_MAX_DAYS = 366
+
+    @staticmethod
+    def _export_rows(entries: QuerySet, file_format: str):
+        """
+        Yields the export lines one by one. The entries are read through a server-side cursor,
+        so memory does not depend on the length of the range.
+        """
+        keys = list(camelize({field: None for field in OperationService.EXPORT_FIELDS}))
+        rows = entries.values_list(*OperationService.EXPORT_FIELDS).iterator(chunk_size=2000)
+        if file_format == "csv":
+            buffer = _LineBuffer()
+            writer = csv.writer(buffer)
+            yield writer.writerow(keys)
+            for row in rows:
+                yield writer.writerow(row)
+        else:
+            for row in rows:
+                yield json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+    @staticmethod
+    def export_schedule(request, date_start: str, date_end: str) -> StreamingHttpResponse | Response:
+        serializer = ScheduleExportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        period_start = datetime.strptime(date_start, "%d.%m.%Y").replace(tzinfo=pytz.UTC)
+        period_end = datetime.strptime(date_end, "%d.%m.%Y").replace(tzinfo=pytz.UTC) + timedelta(days=1)
+        if not period_start < period_end <= period_start + timedelta(days=OperationService.EXPORT_MAX_DAYS):
+            return Response(
+                {"date_end": [f"Период должен быть от 1 до {OperationService.EXPORT_MAX_DAYS} дней"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        entries = ScheduleEntry.objects.filter(exec_start__lt=period_end, exec_end__gt=period_start)
+        if "tech_email" in serializer.validated_data:
+            entries = entries.filter(tech_email=serializer.validated_data["tech_email"])
+        if "group" in serializer.validated_data:
+            entries = entries.filter(group=serializer.validated_data["group"])
+        entries = entries.order_by("exec_start", "operation_id")
+
+        file_format = serializer.validated_data["file_format"]
+        content_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(
+            OperationService._export_rows(entries, file_format), content_type=f"{content_type}; charset=utf-8"
+        )
+        response["Content-Disposition"] = f'attachment; filename="schedule_{date_start}_{date_end}.{file_format}"'
+        return response
+
     @staticmethod
     def update_operation(request: SetOperationDataSerializer) -> Response:
         operation = get_object_or_404(Operation, id=request.data["operation_id"])
@@ -156,7 +271,12 @@ class OperationService:
         if "editable" in request.data:
             operation.is_exec_start_editable = request.data["editable"]
 
-        operation.save()
+        try:
+            operation.save()
+        except IntegrityError as e:
+            if OperationService._double_booked_operation(e) is None:
+                raise
+            return Response({"exec_start": [OperationService.TECH_BUSY_ERROR]}, status=status.HTTP_409_CONFLICT)
 
         return Response(status=status.HTTP_200_OK)
 
@@ -169,7 +289,12 @@ class OperationService:
         operation = get_object_or_404(Operation, id=serializer.validated_data["id"])
         operation.tech = get_object_or_404(User, email=serializer.validated_data["tech_email"])
         operation.exec_start = datetime.strptime(serializer.validated_data["exec_start"], "%a, %d %b %Y %H:%M:%S %Z")
-        operation.save()
+        try:
+            operation.save()
+        except IntegrityError as e:
+            if OperationService._double_booked_operation(e) is None:
+                raise
+            return Response({"exec_start": [OperationService.TECH_BUSY_ERROR]}, status=status.HTTP_409_CONFLICT)
         return Response(status=status.HTTP_200_OK)
 
     @staticmethod
@@ -177,290 +302,770 @@ class OperationService:
         serializer = UpdateOperationStatusSerializer(data=request.data)
         if serializer.is_valid():
             operation = get_object_or_404(Operation, id=operation_id)
-            operation.operation_status = serializer.validated_data["status"]
-            operation.save()
-            return Response(OperationSerializer(operation).data)
+            try:
+                with transaction.atomic():
+                    operation.operation_status = serializer.validated_data["status"]
+                    operation.save()
+                    operation.moved_operations = OperationService._repair_schedule(operation)
+            except IntegrityError as e:
+                if OperationService._double_booked_operation(e) is None:
+                    raise
+                return Response({"exec_start": [OperationService.TECH_BUSY_ERROR]}, status=status.HTTP_409_CONFLICT)
+            return Response(UpdatedOperationSerializer(operation).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @staticmethod
-    def _get_operations_to_distribute():
-        operations = (
+    def _repair_schedule(operation: Operation) -> list[PlanOperation]:
+        """
+        Shifts the operations that depend on an operation reported completed or still in progress past its
+        planned end, and writes the operations that have moved with one bulk update.
+        """
+        if operation.tech_id is None or operation.exec_start is None:
+            return []
+
+        now = datetime.now(tz=pytz.UTC)
+        calendar = WorkCalendar.load()
+        planned_end = calendar.end_of(operation.exec_start, operation.get_exec_duration())
+        if operation.operation_status == OperationStatus.get_completed_status():
+            end = now
+        elif operation.operation_status == OperationStatus.get_in_progress_status() and planned_end < now:
+            end = now
+        else:
+            return []
+
+        record = PlanOperation.load(Operation.objects.filter(id=operation.id))[0]
+        moved = ScheduleRepair(TimelineIndex.for_technicians(calendar), now).repair(record, end)
+        Operation.objects.bulk_update(
+            [Operation(id=op.id, exec_start=op.exec_start) for op in moved],
+            ["exec_start"],
+        )
+        return moved
+
+    @staticmethod
+    def release_and_backfill(operations: QuerySet) -> int:
+        """
+        Releases the technician intervals of the operations that have not been started, then pulls the earliest
+        deadline editable operations of the same groups forward into the released timelines. Both are written
+        with one bulk update. Returns the number of operations that have moved forward.
+        The released operations are left unassigned and are not planned again: the planning skips the operations
+        of cancelled orders and defective works.
+        """
+        now = datetime.now(tz=pytz.UTC)
+        not_started = ~Q(
+            operation_status__in=[OperationStatus.get_in_progress_status(), OperationStatus.get_completed_status()]
+        )
+        released = list(
+            operations
+            .filter(not_started, tech__isnull=False, exec_range__overlap=(now, None))
+            .values_list("id", "tech_id", "exec_start", "operation_type__group")
+        )
+        if not released:
+            return 0
+        released_ids = {operation_id for operation_id, _, _, _ in released}
+        released_techs = {tech_id for _, tech_id, _, _ in released}
+        released_from = max(now, min(exec_start for _, _, exec_start, _ in released))
+
+        index = TimelineIndex.for_technicians(WorkCalendar.load())
+        index.load_busy(
             Operation.objects
-            .select_related(
-                "work__order",
-            )
-            .order_by(
-                "work__order__deadline",
-                "work_id",
-                "ordinal_number"
+            .filter(tech_id__in=released_techs, exec_range__overlap=(now, None))
+            .exclude(id__in=released_ids)
+        )
+
+        candidate_rows = list(
+            Operation.objects
+            .filter(
+                not_started,
+                is_exec_start_editable=True,
+                tech__isnull=False,
+                exec_start__gt=released_from,
+                operation_type__group__in={group for _, _, _, group in released},
             )
+            .exclude(id__in=released_ids)
+            .exclude(work__order__status=OrderStatus.get_canceled_status())
+            .exclude(work__work_status=WorkStatus.get_defect_status())
+            .order_by("work__order__deadline", "exec_start")
+            .values_list("id", "work_id")[:settings.BACKFILL_CANDIDATES]
         )
-        return operations
+        work_operations = PlanOperation.load(
+            Operation.objects
+            .filter(work_id__in={work_id for _, work_id in candidate_rows})
+            .exclude(id__in=released_ids)
+        )
+        positions = {operation_id: position for position, (operation_id, _) in enumerate(candidate_rows)}
+        candidates = sorted(
+            (op for op in work_operations if op.id in positions), key=lambda op: positions[op.id]
+        )
+        moved = BackfillPlanner(index, now).plan(candidates, work_operations, released_techs)
+
+        Operation.objects.bulk_update(
+            [Operation(id=operation_id, tech_id=None, exec_start=None) for operation_id in released_ids]
+            + [Operation(id=op.id, tech_id=op.tech_id, exec_start=op.exec_start) for op in moved],
+            ["tech", "exec_start"],
+        )
+        return len(moved)
 
     @staticmethod
-    def _adjust_to_work_hours(start_time: datetime, duration: timedelta) -> tuple[datetime, datetime]:
+    def _planning_filters(now: datetime) -> tuple[Q, Q]:
         """
-        Adjusts operation time to fit within work hours (8:00-12:00, 13:00-17:00).
-        Returns tuple of (adjusted_start_time, adjusted_end_time)
+        Returns the filters of the operations to load for planning and of the operations that only block
+        the technicians. Completed operations, cancelled orders and everything finished before `now` are left out.
+        The operations of defective works are not planned again, the started ones only block the technicians.
         """
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=pytz.UTC)
-
-        workday_start = time(4, 0, tzinfo=pytz.UTC)
-        break_start = time(8, 0, tzinfo=pytz.UTC)
-        break_end = time(9, 0, tzinfo=pytz.UTC)
-        workday_end = time(13, 0, tzinfo=pytz.UTC)
+        active = (
+            ~Q(operation_status=OperationStatus.get_completed_status())
+            & ~Q(work__order__status=OrderStatus.get_canceled_status())
+        )
+        unfinished = Q(exec_range__overlap=(now, None))
+        in_horizon = (
+            active
+            & ~Q(work__work_status=WorkStatus.get_defect_status())
+            & Q(work__order__deadline__lte=(now + settings.PLANNING_HORIZON).date())
+        )
+        to_plan = in_horizon & Q(is_exec_start_editable=True)
+        # Unfinished fixed operations are loaded too, the planned operations must not start before them
+        return in_horizon & (Q(is_exec_start_editable=True) | unfinished), active & unfinished & ~to_plan
 
-        current_day_start = datetime.combine(start_time.date(), workday_start)
-        current_break_start = datetime.combine(start_time.date(), break_start)
-        current_break_end = datetime.combine(start_time.date(), break_end)
-        current_day_end = datetime.combine(start_time.date(), workday_end)
+    @staticmethod
+    def _get_operations_to_distribute(now: datetime) -> tuple[list[tuple[PlanOperation, int]], QuerySet]:
+        """
+        Returns the operations of the orders due within the planning horizon with their versions and the
+        queryset of the operations that keep their place and block the technician timelines.
+        """
+        loaded, blocking = OperationService._planning_filters(now)
+        return PlanOperation.load(Operation.objects.filter(loaded), "version"), Operation.objects.filter(blocking)
 
-        # If operation starts before work hours, move to workday start
-        end_time = start_time + duration
+    FREE_SLOTS_MAX_DAYS = 62
 
-        if start_time < current_day_start:
-            start_time = current_day_start
-        elif current_break_start < end_time and start_time < current_break_end:
-            start_time = current_break_end + timedelta(minutes=5)
+    @staticmethod
+    def get_free_slots(request, group: str, date_start: str, date_end: str) -> Response:
+        serializer = FreeSlotsQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        end_time = start_time + duration
+        period_start = datetime.strptime(date_start, "%d.%m.%Y").replace(tzinfo=pytz.UTC)
+        period_end = datetime.strptime(date_end, "%d.%m.%Y").replace(tzinfo=pytz.UTC) + timedelta(days=1)
+        if not period_start < period_end <= period_start + timedelta(days=OperationService.FREE_SLOTS_MAX_DAYS):
+            return Response(
+                {"date_end": [f"Период должен быть от 1 до {OperationService.FREE_SLOTS_MAX_DAYS} дней"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        # If operation ends after work hours, move to next workday
-        if end_time > current_day_end:
-            days_to_skip = 1 if datetime.now().weekday() != 4 else 3
-            next_workday = current_day_start + timedelta(days=days_to_skip, minutes=10)
-            start_time = next_workday
-            end_time = start_time + duration
+        index = TimelineIndex.for_technicians(WorkCalendar.load(), group)
+        index.load_busy(
+            Operation.objects.filter(
+                tech_id__in=index.timelines.keys(),
+                exec_range__overlap=(period_start, period_end),
+            )
+        )
+        slots = index.free_slots(
+            group,
+            period_start,
+            period_end,
+            OperationService.PAUSE,
+            timedelta(minutes=serializer.validated_data["min_duration"]),
+        )
+        serializer = FreeSlotSerializer(
+            [{"resource_id": timeline.tech.email, "start": start, "end": end} for timeline, start, end in slots],
+            many=True,
+        )
+        return Response(serializer.data)
 
-        return start_time, end_time
+    CAPACITY_MAX_DAYS = 62
+    CAPACITY_CACHE_TIMEOUT = 60 * 60
 
     @staticmethod
-    def generate_optimized_plan() -> Response:
-        pause = timedelta(minutes=5)
+    def get_capacity(date_start: str, date_end: str) -> Response:
+        """
+        Booked and available working minutes per day of every group and technician. The result is cached
+        until the operations, absences, shifts, holidays or technicians it was computed from change.
+        """
+        period_start = datetime.strptime(date_start, "%d.%m.%Y").replace(tzinfo=pytz.UTC)
+        period_end = datetime.strptime(date_end, "%d.%m.%Y").replace(tzinfo=pytz.UTC) + timedelta(days=1)
+        if not period_start < period_end <= period_start + timedelta(days=OperationService.CAPACITY_MAX_DAYS):
+            return Response(
+                {"date_end": [f"Период должен быть от 1 до {OperationService.CAPACITY_MAX_DAYS} дней"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        busy_start = period_start - timedelta(days=1)
+        # Taken before the data is read: a change made meanwhile only makes the next request recompute
+        fingerprint = capacity_fingerprint(busy_start, period_end)
+        cache_key = f"capacity:{date_start}:{date_end}"
+        cached = cache.get(cache_key)
+        if cached is not None and cached[0] == fingerprint:
+            return Response(cached[1])
 
-        operations: list[Operation] = OperationService._get_operations_to_distribute()
-        technicians: list[User] = UserService.get_technician_models()
+        index = TimelineIndex.for_technicians(WorkCalendar.load())
+        busy = (
+            Operation.objects
+            .overlapping(busy_start, period_end)
+            .filter(tech__isnull=False)
+            .values_list("tech_id", "exec_start", "duration")
+        )
+        grid = CapacityGrid.build(index, list(busy), period_start.date(), (period_end - period_start).days)
+
+        groups = grid.by_group()
+        empty = [0] * len(grid.days)
+        serializer = CapacitySerializer({
+            "days": grid.days,
+            "groups": [
+                {
+                    "group": group,
+                    "name": name,
+                    "booked": grid.minutes(groups[group][0]) if group in groups else empty,
+                    "available": grid.minutes(groups[group][1]) if group in groups else empty,
+                }
+                for group, name in OperationType.OperationGroup.choices
+            ],
+            "technicians": sorted(
+                (
+                    {
+                        "resource_id": timeline.tech.email,
+                        "group": timeline.group,
+                        "booked": grid.minutes(grid.booked[row]),
+                        "available": grid.minutes(grid.available[row]),
+                    }
+                    for row, timeline in enumerate(grid.timelines)
+                ),
+                key=lambda row: (row["group"], row["resource_id"]),
+            ),
+        })
+        cache.set(cache_key, (fingerprint, serializer.data), OperationService.CAPACITY_CACHE_TIMEOUT)
+        return Response(serializer.data)
 
-        # Prepare data structures
-        operations_by_work: dict[UUID, list[Operation]] = defaultdict(list)
-        for op in operations:
-            operations_by_work[op.work_id].append(op)
+    SLACK_CACHE_TIMEOUT = 10 * 60
 
-        # Initialize tech queues with their current assignments
-        tech_queues: dict[str, list[tuple[datetime, UUID, User]]] = defaultdict(list)
+    @staticmethod
+    def get_order_slack() -> Response:
+        """
+        Critical path, projected finish and slack against the deadline of every order with unfinished
+        operations, the most late first. The analysis of an order is cached until its deadline or one of its
+        operations changes; unassigned operations are projected from the current moment, so the cache also
+        expires after SLACK_CACHE_TIMEOUT.
+        """
+        fingerprints = order_fingerprints(
+            OrderStatus.get_canceled_status().id, OperationStatus.get_completed_status().id
+        )
+        keys = {order_id: f"order-slack:{order_id}" for order_id in fingerprints}
+        cached = cache.get_many(keys.values())
+
+        rows = {}
+        for order_id, fingerprint in fingerprints.items():
+            if keys[order_id] in cached and cached[keys[order_id]][0] == fingerprint:
+                rows[order_id] = cached[keys[order_id]][1]
+
+        stale = [order_id for order_id in fingerprints if order_id not in rows]
+        if stale:
+            operations_by_order: dict[UUID, list[PlanOperation]] = defaultdict(list)
+            for record, order_id in PlanOperation.load(
+                Operation.objects
+                .filter(work__order_id__in=stale)
+                .exclude(operation_status=OperationStatus.get_completed_status()),
+                "work__order_id",
+            ):
+                operations_by_order[order_id].append(record)
+
+            calendar = WorkCalendar.load()
+            now = datetime.now(tz=pytz.UTC)
+            computed = {}
+            for order_id, operations in operations_by_order.items():
+                analysis = OrderSlack.analyze(operations, calendar, now, OperationService.PAUSE)
+                rows[order_id] = OrderSlackSerializer({"order": order_id, **asdict(analysis)}).data
+                computed[keys[order_id]] = (fingerprints[order_id], rows[order_id])
+            cache.set_many(computed, OperationService.SLACK_CACHE_TIMEOUT)
+
+        return Response(sorted(rows.values(), key=lambda row: (row["slack"], row["deadline"])))
 
-        # First process all non-editable operations to set tech availability
-        non_editable_ops = [op for op in operations if not op.is_exec_start_editable and op.exec_start and op.tech]
-        for op in non_editable_ops:
-            exec_time = op.get_exec_time()
-            op_duration = timedelta(
-                minutes=exec_time.minute,
-                hours=exec_time.hour,
+    @staticmethod
+    def _capture_planner_input(
+        kind: str,
+        index: TimelineIndex,
+        operations: list[PlanOperation],
+        work_operations: list[PlanOperation],
+        now: datetime,
+    ) -> None:
+        """
+        Writes the planner input to PLAN_CAPTURE_DIR, if it is set, so that it can be replayed by replay_plan.
+        """
+        if not settings.PLAN_CAPTURE_DIR:
+            return
+        path = os.path.join(settings.PLAN_CAPTURE_DIR, f"{kind}-{now:%Y%m%dT%H%M%S%f}.json.gz")
+        PlanCapture.from_planner_input(kind, index, operations, work_operations, now).dump(path)
+
+    @staticmethod
+    def _build_plan(mode: str, time_budget: float, on_progress=None) -> tuple[list | dict, list[PlanDraftOperation]]:
+        """
+        Builds the greedy plan, planning every operation group in its own worker process. In the "local_search"
+        mode the greedy plan is then improved in a worker process within the time budget, and the metrics of both
+        plans are returned with it.
+        Returns the serialized plan and the unsaved draft rows of the operations the plan moves.
+        """
+        report = on_progress or (lambda progress: None)
+        now = datetime.now(tz=pytz.UTC)
+        rows, blocking = OperationService._get_operations_to_distribute(now)
+        operations = [op for op, _ in rows]
+        versions = {op.id: version for op, version in rows}
+        placements = {op.id: (op.tech_id, op.exec_start) for op in operations}
+
+        # Operations that keep their place are only loaded as busy intervals of the technicians
+        calendar = WorkCalendar.load()
+        index = TimelineIndex.for_technicians(calendar)
+        index.load_busy(blocking)
+        report(10)
+
+        to_plan = [op for op in operations if op.is_exec_start_editable]
+        OperationService._capture_planner_input("optimized_plan", index, to_plan, operations, now)
+
+        # Operation groups are planned in parallel worker processes
+        planner = DecomposedPlanner(index, now)
+        planner.plan(to_plan, operations)
+        report(40)
+
+        metrics = None
+        if mode == "local_search":
+            problem = SearchProblem.from_plan(operations, index, planner.now, planner.pause)
+            assignment, greedy_metrics, improved_metrics = run_in_process(
+                improve_plan, problem, time_budget, timeout=time_budget + 30
+            )
+            for op in operations:
+                if op.id in assignment:
+                    op.tech_id, op.exec_start, _ = assignment[op.id]
+            metrics = {"greedy": greedy_metrics, "improved": improved_metrics}
+        report(90)
+
+        draft = [
+            PlanDraftOperation(
+                operation_id=op.id, tech_id=op.tech_id, exec_start=op.exec_start, version=versions[op.id]
             )
-            tech_end_time = op.exec_start + op_duration + pause
-            heapq.heappush(tech_queues[op.tech.get_tech_group()], (tech_end_time, op.tech.id, op.tech))
-
-        # Then add all remaining available techs
-        for tech in technicians:
-            # Only add if not already in queue (from non-editable ops)
-            if not any(t.id == tech.id for queue in tech_queues.values() for (_, _, t) in queue):
-                heapq.heappush(tech_queues[tech.get_tech_group()], (datetime.now(tz=pytz.UTC), tech.id, tech))
-
-        ops_to_update: list[Operation] = []
-
-        for work_id, work_ops in operations_by_work.items():
-            for op in work_ops:
-                # Skip operations that shouldn't be modified
-                if not op.is_exec_start_editable:
-                    continue
-
-                if not tech_queues.get(op.operation_type.group):
-                    raise ValueError(f"No available technician for operation type {op.operation_type.group}")
-
-                available_time, tech_id, tech = heapq.heappop(tech_queues[op.operation_type.group])
-
-                # Calculate start time
-                start_time: datetime = available_time
-
-                # Consider previous operations in work (both editable and non-editable)
-                if op.ordinal_number > 1:
-                    prev_ops = [o for o in operations_by_work[op.work_id]
-                                if o.ordinal_number == op.ordinal_number - 1]
-                    if prev_ops:
-                        prev_op = prev_ops[0]
-                        if prev_op.exec_start:
-                            exec_time = prev_op.get_exec_time()
-                            prev_duration = timedelta(
-                                minutes=exec_time.minute,
-                                hours=exec_time.hour,
-                            )
-                            prev_end = prev_op.exec_start + prev_duration + pause
-                            start_time = max(start_time, prev_end)
-
-                exec_time = op.get_exec_time()
-                op_duration: timedelta = timedelta(
-                    minutes=exec_time.minute,
-                    hours=exec_time.hour,
-                )
-
-                start_time, end_time = OperationService._adjust_to_work_hours(start_time, op_duration)
-
-                # Prepare for update
-                op.exec_start = start_time
-                op.tech = tech
-                ops_to_update.append(op)
-
-                # Update tech availability
-                new_available_time = start_time + op_duration + pause
-                heapq.heappush(tech_queues[tech.get_tech_group()], (new_available_time, tech.id, tech))
-
-        preprocessed_operations = [
-            OperationService._preprocess_operation_for_schedule(operation, with_tech=True) for operation in operations
+            for op in changed_operations(operations, placements)
         ]
-        grouped_operations = OperationService._group_operations_by_work(preprocessed_operations)
-        serializer = OperationForScheduleSerializer(grouped_operations, many=True)
-        return Response(serializer.data)
+        grouped_operations = OperationService._planned_for_schedule(operations, index, calendar)
+        if metrics is None:
+            return ScheduleEntrySerializer(grouped_operations, many=True).data, draft
+        return OptimizedPlanSerializer({"operations": grouped_operations, "metrics": metrics}).data, draft
 
     @staticmethod
-    def apply_optimized_plan(request) -> Response:
-        serializer = ApplyOperationsPlanSerializer(data=request.data)
+    def _save_plan_draft(job: PlanJob, draft: list[PlanDraftOperation]) -> None:
+        for row in draft:
+            row.job = job
+        PlanDraftOperation.objects.bulk_create(draft, batch_size=1000)
+
+    @staticmethod
+    def _get_plan_params(request) -> tuple[str, float] | Response:
+        serializer = GeneratePlanSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        mode = serializer.validated_data["mode"]
+        # The budget only matters for the local search, greedy plans are shared whatever budget was sent
+        time_budget = serializer.validated_data["time_budget"] if mode == "local_search" else 0
+        return mode, time_budget
+
+    @staticmethod
+    def _find_plan_job(mode: str, time_budget: float, version: int) -> PlanJob | None:
+        """
+        Returns a recently finished or still running job that plans the same snapshot of the schedule.
+        """
+        now = timezone.now()
+        return (
+            PlanJob.objects
+            .filter(is_active=True, mode=mode, time_budget=time_budget, snapshot_version=version)
+            .filter(
+                Q(status=PlanJob.Status.DONE, created_at__gte=now - settings.PLAN_RESULT_TTL)
+                | Q(status__in=[PlanJob.Status.PENDING, PlanJob.Status.RUNNING],
+                    created_at__gte=now - settings.PLAN_JOB_TIMEOUT)
+            )
+            # "done" goes before "pending" and "running"
+            .order_by("status", "-created_at")
+            .first()
+        )
 
-        tech_email_tech = {}
-        techs = User.objects.all()
-        for tech in techs:
-            tech_email_tech[tech.email] = tech
+    @staticmethod
+    def _generate_plan(request) -> PlanJob | Response:
+        """
+        Builds the plan and stores it as a finished job with its draft. A finished job planning the same
+        snapshot of the schedule is returned instead of building a new plan.
+        """
+        params = OperationService._get_plan_params(request)
+        if isinstance(params, Response):
+            return params
+        mode, time_budget = params
+
+        version = ScheduleVersion.current()
+        job = OperationService._find_plan_job(mode, time_budget, version)
+        if job is not None and job.status == PlanJob.Status.DONE:
+            return job
+
+        data, draft = OperationService._build_plan(mode, time_budget)
+        with transaction.atomic():
+            job = PlanJob.objects.create(
+                status=PlanJob.Status.DONE,
+                mode=mode,
+                time_budget=time_budget,
+                # The data has changed while planning: the result must not be reused for the new snapshot
+                snapshot_version=version if ScheduleVersion.current() == version else None,
+                progress=100,
+                result=data,
+                created_by=request.user,
+                finished_at=timezone.now(),
+            )
+            OperationService._save_plan_draft(job, draft)
+        return job
 
-        operations_to_update = []
-        for operation_schema in serializer.validated_data["operations"]:
-            operation = Operation.objects.get(id=operation_schema["operation_id"])
-            operation.tech_id = tech_email_tech[operation_schema["tech_email"]].id
-            operation.exec_start = operation_schema["exec_start"]
-            operations_to_update.append(operation)
+    @staticmethod
+    def generate_optimized_plan(request) -> Response:
+        job = OperationService._generate_plan(request)
+        if isinstance(job, Response):
+            return job
+        return Response(job.result)
 
-        Operation.objects.bulk_update(
-            operations_to_update,
-            ["exec_start", "tech_id"],
-            batch_size=500,
+    @staticmethod
+    def create_plan_draft(request) -> Response:
+        """
+        Builds the plan like generate_optimized_plan, but returns only its difference from the current schedule.
+        """
+        job = OperationService._generate_plan(request)
+        if isinstance(job, Response):
+            return job
+        serializer = PlanDraftSerializer(OperationService._plan_draft_diff(job))
+        return Response(serializer.data)
+
+    @staticmethod
+    def _plan_draft_diff(job: PlanJob) -> dict:
+        """
+        The draft operations whose placement differs from the current schedule.
+        """
+        rows = job.draft_operations.values(
+            "operation_id",
+            "exec_start",
+            "version",
+            tech_email=F("tech__email"),
+            current_tech_email=F("operation__tech__email"),
+            current_exec_start=F("operation__exec_start"),
+            current_version=F("operation__version"),
         )
+        operations = []
+        for row in rows:
+            if (row["tech_email"], row["exec_start"]) == (row["current_tech_email"], row["current_exec_start"]):
+                continue
+            row["stale"] = row.pop("current_version") != row["version"]
+            operations.append(row)
+        operations.sort(key=lambda row: (row["exec_start"], str(row["operation_id"])))
+        return {
+            "id": job.id,
+            "snapshot_version": job.snapshot_version,
+            "is_current": job.snapshot_version is not None and job.snapshot_version == ScheduleVersion.current(),
+            "operations": operations,
+        }
 
-        return Response(status=status.HTTP_200_OK)
+    @staticmethod
+    def get_plan_draft(job_id: str) -> Response:
+        job = get_object_or_404(PlanJob, id=job_id, is_active=True, status=PlanJob.Status.DONE)
+        serializer = PlanDraftSerializer(OperationService._plan_draft_diff(job))
+        return Response(serializer.data)
 
     @staticmethod
-    def _get_operations_for_order(order: Order) -> list[Operation]:
-        operations: list[Operation] = []
-        for work in order.works.all():
-            operations += work.operations.all()
-        return operations
+    def apply_plan_draft(job_id: str) -> Response:
+        """
+        Applies the stored draft like apply_optimized_plan, writing only the operations whose placement
+        differs from the current schedule.
+        """
+        job = get_object_or_404(PlanJob, id=job_id, is_active=True, status=PlanJob.Status.DONE)
+        planned = [
+            {
+                "operation_id": row["operation_id"],
+                "tech_email": row["tech_email"],
+                "exec_start": row["exec_start"],
+                "version": row["version"],
+            }
+            for row in OperationService._plan_draft_diff(job)["operations"]
+        ]
+        return OperationService._apply_plan_or_conflicts(planned)
 
     @staticmethod
-    def _get_operations_with_exclusion(order_to_exclude: Order) -> list[Operation]:
-        today = datetime.now(tz=pytz.UTC)
-        today.replace(hour=0, minute=0, second=0, microsecond=0)
-        operations = (
-            Operation.objects
-            .select_related(
-                "work__order",
+    def create_plan_job(request) -> Response:
+        """
+        Starts the plan generation in background. A job planning the same snapshot of the schedule
+        is returned instead of starting a new one.
+        """
+        params = OperationService._get_plan_params(request)
+        if isinstance(params, Response):
+            return params
+        mode, time_budget = params
+
+        version = ScheduleVersion.current()
+        job = OperationService._find_plan_job(mode, time_budget, version)
+        if job is None:
+            job = PlanJob.objects.create(
+                mode=mode,
+                time_budget=time_budget,
+                snapshot_version=version,
+                created_by=request.user,
             )
-            .filter(exec_start__gt=today)
-            .order_by(
-                "work__order__deadline",
-                "work_id",
-                "ordinal_number"
+            transaction.on_commit(lambda: run_in_background(OperationService.run_plan_job, job.id))
+
+        serializer = PlanJobSerializer(job)
+        if job.status == PlanJob.Status.DONE:
+            return Response(serializer.data)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @staticmethod
+    def run_plan_job(job_id: UUID) -> None:
+        job = PlanJob.objects.get(id=job_id)
+        jobs = PlanJob.objects.filter(id=job_id)
+        jobs.update(status=PlanJob.Status.RUNNING)
+        try:
+            data, draft = OperationService._build_plan(
+                job.mode, job.time_budget, on_progress=lambda progress: jobs.update(progress=progress)
             )
+        except Exception as e:
+            jobs.update(status=PlanJob.Status.FAILED, error=str(e), finished_at=timezone.now())
+            return
+
+        # The data has changed while planning: the result must not be reused for the new snapshot
+        snapshot_version = job.snapshot_version if ScheduleVersion.current() == job.snapshot_version else None
+        with transaction.atomic():
+            OperationService._save_plan_draft(job, draft)
+            jobs.update(
+                status=PlanJob.Status.DONE,
+                progress=100,
+                result=data,
+                snapshot_version=snapshot_version,
+                finished_at=timezone.now(),
+            )
+
+    @staticmethod
+    def create_order_assignment_job(order: Order, user: User | None) -> PlanJob:
+        """
+        Starts generating and placing the operations of the order in background, once the current
+        transaction is committed.
+        """
+        job = PlanJob.objects.create(
+            mode=PlanJob.ORDER_ASSIGNMENT_MODE,
+            time_budget=0,
+            order=order,
+            created_by=user,
         )
-        operations = [op for op in operations if op.work.order_id != order_to_exclude.id]
-        return operations
+        transaction.on_commit(lambda: run_in_background(OperationService.run_order_assignment_job, job.id))
+        return job
 
     @staticmethod
-    def assign_order_operations(request) -> Response:
-        serializer = AssignOrderOperations(data=request.data)
+    def run_order_assignment_job(job_id: UUID) -> None:
+        job = PlanJob.objects.select_related("order").get(id=job_id)
+        jobs = PlanJob.objects.filter(id=job_id)
+        jobs.update(status=PlanJob.Status.RUNNING)
+        try:
+            WorkService.generate_operations(job.order)
+            jobs.update(progress=30)
+            OperationService._assign_orders_operations([job.order])
+            jobs.update(progress=90)
+
+            entries = ScheduleEntry.objects.filter(order_id=job.order.id).order_by("ordinal_number")
+            operations = OperationService._group_operations_by_work(
+                [OperationService._schedule_entry_for_schedule(entry, with_tech=True) for entry in entries],
+                WorkCalendar.load(),
+            )
+            data = ScheduleEntrySerializer(operations, many=True).data
+        except Exception as e:
+            jobs.update(status=PlanJob.Status.FAILED, error=str(e), finished_at=timezone.now())
+            return
+
+        jobs.update(status=PlanJob.Status.DONE, progress=100, result=data, finished_at=timezone.now())
+
+    @staticmethod
+    def get_order_assignment_job(order_id: str) -> Response:
+        """
+        The latest assignment job of the order with the placed operations as its result.
+        """
+        job = (
+            PlanJob.objects
+            .filter(is_active=True, mode=PlanJob.ORDER_ASSIGNMENT_MODE, order_id=order_id)
+            .order_by("-created_at")
+            .first()
+        )
+        if job is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        serializer = PlanJobSerializer(job)
+        return Response(serializer.data)
+
+    @staticmethod
+    def get_plan_job(job_id: str) -> Response:
+        job = get_object_or_404(PlanJob, id=job_id, is_active=True)
+        serializer = PlanJobSerializer(job)
+        return Response(serializer.data)
+
+    @staticmethod
+    def generate_incremental_plan(request) -> Response:
+        """
+        Places unassigned operations (and the explicitly requested ones) into the gaps of the current
+        schedule instead of re-planning everything. Returns only the operations that have changed.
+        Started and completed operations keep their place.
+        """
+        serializer = IncrementalPlanSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        pause = timedelta(minutes=5)
+        not_started = ~Q(
+            operation_status__in=[OperationStatus.get_in_progress_status(), OperationStatus.get_completed_status()]
+        )
+        to_plan = (
+            Q(id__in=serializer.validated_data["operations"]) | Q(exec_start__isnull=True) | Q(tech__isnull=True)
+        ) & Q(is_exec_start_editable=True) & not_started
+        work_ids = (
+            Operation.objects
+            .filter(to_plan)
+            .exclude(work__order__status=OrderStatus.get_canceled_status())
+            .exclude(work__work_status=WorkStatus.get_defect_status())
+            .values("work_id")
+        )
+        rows = PlanOperation.load(
+            Operation.objects
+            .filter(work_id__in=work_ids)
+            .annotate(to_plan=ExpressionWrapper(to_plan, output_field=BooleanField())),
+            "to_plan",
+        )
+        work_operations = [op for op, _ in rows]
+        operations = [op for op, is_to_plan in rows if is_to_plan]
+
+        # Only the technicians of the groups the affected works go through are loaded with their unfinished work
+        now = datetime.now(tz=pytz.UTC)
+        calendar = WorkCalendar.load()
+        index = TimelineIndex.for_technicians(calendar)
+        techs = [
+            timeline.tech.id
+            for group in {op.group for op in work_operations}
+            for timeline in index.groups.get(group, [])
+        ]
+        index.load_busy(
+            Operation.objects
+            .filter(tech_id__in=techs, exec_range__overlap=(now, None))
+            .exclude(id__in=[op.id for op in operations])
+        )
+        OperationService._capture_planner_input("incremental_plan", index, operations, work_operations, now)
+        planner = IncrementalPlanner(index, now)
+        changed = planner.plan(operations, work_operations)
+
+        grouped_operations = OperationService._planned_for_schedule(changed, index, calendar)
+        serializer = ScheduleEntrySerializer(grouped_operations, many=True)
+        return Response(serializer.data)
 
-        order = serializer.validated_data["order"]
-        operations: list[Operation] = OperationService._get_operations_for_order(order)
-        technicians: list[User] = UserService.get_technician_models()
+    @staticmethod
+    def apply_optimized_plan(request) -> Response:
+        """
+        Applies the plan in one transaction. If any operation has changed since the plan was built
+        or a technician would be double-booked, nothing is applied and the conflicting operations are returned.
+        """
+        serializer = ApplyOperationsPlanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Prepare data structures
-        operations_by_work: dict[UUID, list[Operation]] = defaultdict(list)
-        for op in operations:
-            operations_by_work[op.work_id].append(op)
+        return OperationService._apply_plan_or_conflicts(serializer.validated_data["operations"])
 
-        # Initialize tech queues with their current assignments
-        tech_queues: dict[str, list[tuple[datetime, UUID, User]]] = defaultdict(list)
+    @staticmethod
+    def _apply_plan_or_conflicts(planned: list[dict]) -> Response:
+        try:
+            return OperationService._apply_plan(planned)
+        except IntegrityError as e:
+            operation_id = OperationService._double_booked_operation(e)
+            if operation_id is None:
+                raise
+            serializer = PlanConflictsSerializer(
+                {"conflicts": [{"operation_id": operation_id, "reason": "double_booking", "version": None}]}
+            )
+            return Response(serializer.data, status=status.HTTP_409_CONFLICT)
 
-        # First process all non-editable operations to set tech availability
-        non_editable_ops = OperationService._get_operations_with_exclusion(order)
-        for op in non_editable_ops:
-            exec_time = op.get_exec_time()
-            op_duration = timedelta(
-                minutes=exec_time.minute,
-                hours=exec_time.hour,
+    @staticmethod
+    def _apply_plan(planned: list[dict]) -> Response:
+        with transaction.atomic():
+            operations = Operation.objects.select_for_update().in_bulk([item["operation_id"] for item in planned])
+            placements = {operation.id: (operation.tech_id, operation.exec_start) for operation in operations.values()}
+            techs = User.objects.filter(email__in={item["tech_email"] for item in planned}).in_bulk(
+                field_name="email"
             )
-            tech_end_time = op.exec_start + op_duration + pause
-            heapq.heappush(tech_queues[op.tech.get_tech_group()], (tech_end_time, op.tech.id, op.tech))
-
-        # Then add all remaining available techs
-        for tech in technicians:
-            # Only add if not already in queue (from non-editable ops)
-            if not any(t.id == tech.id for queue in tech_queues.values() for (_, _, t) in queue):
-                heapq.heappush(tech_queues[tech.get_tech_group()], (datetime.now(tz=pytz.UTC), tech.id, tech))
-
-        ops_to_update: list[Operation] = []
-
-        for work_id, work_ops in operations_by_work.items():
-            for op in work_ops:
-                # Skip operations that shouldn't be modified
-                if not op.is_exec_start_editable:
-                    continue
-
-                if not tech_queues.get(op.operation_type.group):
-                    raise ValueError(f"No available technician for operation type {op.operation_type.group}")
-
-                available_time, tech_id, tech = heapq.heappop(tech_queues[op.operation_type.group])
-
-                # Calculate start time
-                start_time: datetime = available_time
-
-                # Consider previous operations in work (both editable and non-editable)
-                if op.ordinal_number > 1:
-                    prev_ops = [o for o in operations_by_work[op.work_id]
-                                if o.ordinal_number == op.ordinal_number - 1]
-                    if prev_ops:
-                        prev_op = prev_ops[0]
-                        if prev_op.exec_start:
-                            exec_time = prev_op.get_exec_time()
-                            prev_duration = timedelta(
-                                minutes=exec_time.minute,
-                                hours=exec_time.hour,
-                            )
-                            prev_end = prev_op.exec_start + prev_duration + pause
-                            start_time = max(start_time, prev_end)
-
-                exec_time = op.get_exec_time()
-                op_duration: timedelta = timedelta(
-                    minutes=exec_time.minute,
-                    hours=exec_time.hour,
-                )
-
-                start_time, end_time = OperationService._adjust_to_work_hours(start_time, op_duration)
-
-                # Prepare for update
-                op.exec_start = start_time
-                op.tech = tech
-                ops_to_update.append(op)
-
-                # Update tech availability
-                new_available_time = start_time + op_duration + pause
-                heapq.heappush(tech_queues[tech.get_tech_group()], (new_available_time, tech.id, tech))
 
+            conflicts = []
+            for item in planned:
+                operation = operations.get(item["operation_id"])
+                if operation is None:
+                    conflicts.append({"operation_id": item["operation_id"], "reason": "not_found", "version": None})
+                elif item["version"] != operation.version:
+                    conflicts.append(
+                        {"operation_id": operation.id, "reason": "changed", "version": operation.version}
+                    )
+                elif item["tech_email"] not in techs:
+                    conflicts.append(
+                        {"operation_id": operation.id, "reason": "tech_not_found", "version": operation.version}
+                    )
+                else:
+                    operation.tech_id = techs[item["tech_email"]].id
+                    operation.exec_start = item["exec_start"]
+
+            if conflicts:
+                serializer = PlanConflictsSerializer({"conflicts": conflicts})
+                return Response(serializer.data, status=status.HTTP_409_CONFLICT)
+
+            # Only the operations that have moved are written
+            moved = [
+                operation for operation in operations.values()
+                if placements[operation.id] != (operation.tech_id, operation.exec_start)
+            ]
+            Operation.objects.bulk_update(moved, ["exec_start", "tech_id"], batch_size=1000)
+
+        return Response(status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _get_operations_with_exclusion(orders_to_exclude: list[Order]) -> QuerySet:
+        """
+        Operations from the start of today that block the technicians while the orders are planned:
+        the operations of the other orders and the ones of the orders that cannot be moved.
+        """
+        today = datetime.now(tz=pytz.UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+        operations = (
+            Operation.objects
+            .filter(exec_start__gt=today)
+            .exclude(work__order__in=orders_to_exclude, is_exec_start_editable=True)
+        )
+        return operations
+
+    @staticmethod
+    def _assign_orders_operations(orders: list[Order]) -> None:
+        """
+        Plans the editable operations of the orders in one pass, orders with earlier deadlines first,
+        and writes the operations that have moved with one bulk update.
+        """
+        operations = PlanOperation.load(Operation.objects.filter(work__order__in=orders))
+        placements = {op.id: (op.tech_id, op.exec_start) for op in operations}
+
+        # Operations of the other orders block the technician timelines
+        index = TimelineIndex.for_technicians(WorkCalendar.load())
+        index.load_busy(OperationService._get_operations_with_exclusion(orders))
+
+        now = datetime.now(tz=pytz.UTC)
+        to_plan = [op for op in operations if op.is_exec_start_editable]
+        OperationService._capture_planner_input("order_assignment", index, to_plan, operations, now)
+        planner = TimelinePlanner(index, now)
+        planner.plan(to_plan, operations)
+
+        # Only the operations that have moved are written
         Operation.objects.bulk_update(
-            operations,
+            changed_operations(operations, placements),
             ["tech", "exec_start"]
         )
+
+    @staticmethod
+    def assign_order_operations(request) -> Response:
+        serializer = AssignOrderOperations(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        OperationService._assign_orders_operations([serializer.validated_data["order"]])
+        return Response(status=status.HTTP_200_OK)
+
+    @staticmethod
+    def assign_orders_operations(request) -> Response:
+        serializer = AssignOrdersOperations(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        OperationService._assign_orders_operations(serializer.validated_data["orders"])
         return Response(status=status.HTTP_200_OK)
@@ -124,3 +124,15 @@ class OperationsTest(BaseTestCase):
         self.assertEqual(operation.tech.email, tech_email)
         self.assertEqual(operation.exec_start.year, 2024)
         self.assertEqual(operation.exec_start.month, 4)
+
+    def test_assign_orders_operations_unknown_order(self):
+        self.set_up_for_admin()
+
+        response = self.client.post(
+            self.url + "/assign-operations/orders",
+            data={"orders": ["6acfbcb5-66eb-460b-a9c9-52a26b1b3461"]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("orders", response.data)
@@ -0,0 +1,863 @@
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from core.models import ScheduleVersion
+from core.tests import ScheduleTestCase, ScheduleTransactionTestCase
+from operations.models import (
+    ALLOW_DOUBLE_BOOKING_SETTING,
+    Holiday,
+    Operation,
+    OperationStatus,
+    OperationType,
+    PlanJob,
+    ScheduleEntry,
+    TechnicianAbsence,
+    WorkShift,
+)
+from operations.scheduling import ScheduleRepair, ScheduleSnapshot, WorkCalendar
+from operations.service import OperationService
+from orders.models import Order
+from works.models import Work
+
+
+class OperationDurationTest(ScheduleTestCase):
+    def setUp(self):
+        super().setUp()
+        last_monday = self.next_monday(weeks=-1)
+        self.finished = self.order_operations(self.create_order(last_monday + timedelta(days=1), "Работа 1"))[0]
+        self.planned = self.order_operations(self.create_order(self.next_monday(), "Работа 1"))[0]
+        Operation.objects.filter(id=self.finished.id).update(
+            tech=User.objects.get(email="tech1@gmail.com"),
+            exec_start=self.moment(last_monday, 4),
+            operation_status=OperationStatus.get_completed_status(),
+        )
+        self.finished.refresh_from_db()
+
+    def test_type_change_keeps_finished_operations(self):
+        OperationType.objects.filter(id=self.finished.operation_type_id).update(fixed_exec_time=time(1, 30))
+
+        self.assertEqual(Operation.objects.get(id=self.planned.id).duration, 90)
+        finished = Operation.objects.get(id=self.finished.id)
+        self.assertEqual(finished.duration, self.finished.duration)
+        self.assertEqual(finished.exec_range, self.finished.exec_range)
+
+        # Saving the finished operation keeps its duration too
+        finished.is_exec_start_editable = False
+        finished.save()
+        self.assertEqual(Operation.objects.get(id=self.finished.id).duration, self.finished.duration)
+
+    def test_amount_change_keeps_finished_operations(self):
+        finished = Operation.objects.filter(work_id=self.finished.work_id, ordinal_number=2)
+        finished.update(exec_start=self.finished.exec_start + timedelta(hours=2))
+        duration = finished.get().duration
+
+        Work.objects.filter(id=self.finished.work_id).update(amount=5)
+
+        self.assertEqual(finished.get().duration, duration)
+        # The operation not started yet follows the new amount: 30 minutes + 8 per item
+        self.assertEqual(Operation.objects.get(work_id=self.finished.work_id, ordinal_number=3).duration, 70)
+
+
+class ScheduleEntryTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        self.monday = self.next_monday()
+        self.tech = User.objects.get(email="tech1@gmail.com")
+        self.order = self.create_order(self.monday + timedelta(days=7), "Работа 1")
+        self.operation = self.order_operations(self.order)[0]
+        Operation.objects.filter(id=self.operation.id).update(tech=self.tech, exec_start=self.moment(self.monday, 4))
+        self.operation.refresh_from_db()
+
+    def entry(self) -> ScheduleEntry:
+        return ScheduleEntry.objects.get(operation=self.operation)
+
+    def test_entries_follow_operations(self):
+        entry = self.entry()
+        self.assertEqual(
+            set(ScheduleEntry.objects.values_list("operation_id", flat=True)),
+            {operation.id for operation in self.order_operations(self.order)},
+        )
+        self.assertEqual(entry.tech_email, self.tech.email)
+        self.assertEqual(entry.exec_start, self.moment(self.monday, 4))
+        self.assertEqual(entry.exec_end, self.moment(self.monday, 5, 10))
+        self.assertEqual(entry.version, self.operation.version)
+
+        Operation.objects.filter(id=self.operation.id).update(
+            operation_status=OperationStatus.get_in_progress_status(), exec_start=self.moment(self.monday, 9)
+        )
+
+        entry = self.entry()
+        self.assertEqual(entry.operation_status_name, "В работе")
+        self.assertEqual(entry.exec_start, self.moment(self.monday, 9))
+        self.assertEqual(entry.version, self.operation.version + 1)
+
+    def test_entries_follow_related_rows(self):
+        Work.objects.filter(id=self.operation.work_id).update(amount=3)
+        User.objects.filter(id=self.tech.id).update(email="modeller@gmail.com")
+
+        entry = ScheduleEntry.objects.get(operation=self.order_operations(self.order)[1])
+        self.assertEqual(entry.work_amount, 3)
+        self.assertEqual(entry.duration, 35 + 10 * 3)
+        self.assertEqual(self.entry().tech_email, "modeller@gmail.com")
+
+    def test_entries_of_deleted_operations_are_deleted(self):
+        self.order.delete()
+
+        self.assertFalse(ScheduleEntry.objects.exists())
+
+    def test_schedule_is_served_from_entries(self):
+        response = self.client.get(f"{self.url}/operations-for-schedule/{self.monday:%d.%m.%Y}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([operation["id"] for operation in response.data], [str(self.operation.id)])
+        self.assertEqual(response.data[0]["resource_id"], self.tech.email)
+
+        response = self.client.get(f"{self.url}/operations-for-schedule/{self.monday:%d.%m.%Y}/{self.tech.email}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([operation["id"] for operation in response.data], [str(self.operation.id)])
+
+
+class ScheduleExportTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        self.monday = self.next_monday()
+        modelling, casting, _ = self.order_operations(self.create_order(self.monday + timedelta(days=7), "Работа 1"))
+        Operation.objects.filter(id=modelling.id).update(
+            tech=User.objects.get(email="tech1@gmail.com"), exec_start=self.moment(self.monday, 4)
+        )
+        Operation.objects.filter(id=casting.id).update(
+            tech=User.objects.get(email="tech2@gmail.com"), exec_start=self.moment(self.monday + timedelta(days=1), 4)
+        )
+        self.modelling, self.casting = modelling, casting
+
+    def export(self, date_start: date, date_end: date, **params):
+        return self.client.get(f"{self.url}/schedule-export/{date_start:%d.%m.%Y}/{date_end:%d.%m.%Y}", params)
+
+    @staticmethod
+    def content(response) -> str:
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        response = self.export(self.monday, self.monday + timedelta(days=1))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("application/x-ndjson"))
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row["operationId"] for row in rows], [str(self.modelling.id), str(self.casting.id)])
+        self.assertEqual(rows[0]["techEmail"], "tech1@gmail.com")
+        self.assertEqual(rows[0]["duration"], 70)
+
+    def test_export_csv_filtered(self):
+        response = self.export(self.monday, self.monday + timedelta(days=6), file_format="csv", group="CA")
+
+        self.assertEqual(response.status_code, 200)
+        header, *rows = list(csv.reader(io.StringIO(self.content(response))))
+        self.assertEqual(header[0], "operationId")
+        self.assertEqual([row[0] for row in rows], [str(self.casting.id)])
+
+    def test_export_end_date_is_inclusive(self):
+        response = self.export(self.monday + timedelta(days=1), self.monday + timedelta(days=1))
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row["operationId"] for row in rows], [str(self.casting.id)])
+
+        response = self.export(self.monday, self.monday, tech_email="tech2@gmail.com")
+        self.assertEqual(self.content(response), "")
+
+    def test_export_invalid_period(self):
+        response = self.export(self.monday, self.monday - timedelta(days=1))
+        self.assertEqual(response.status_code, 400)
+
+        response = self.export(self.monday, self.monday + timedelta(days=400))
+        self.assertEqual(response.status_code, 400)
+
+        response = self.export(self.monday, self.monday, file_format="xml")
+        self.assertEqual(response.status_code, 400)
+
+
+class FreeSlotsTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def test_free_slots_include_end_date_and_long_operations(self):
+        monday = self.next_monday(weeks=2)
+        tech = User.objects.get(email="tech2@gmail.com")
+        # 35 minutes + 10 per item: about six working days
+        order = self.create_order(monday + timedelta(days=14), "Работа 2", amount=300)
+        # Started on Saturday, it covers the whole Monday
+        Operation.objects.filter(work__order=order, ordinal_number=1).update(
+            tech=tech, exec_start=self.moment(monday - timedelta(days=2), 0)
+        )
+
+        day = monday.strftime("%d.%m.%Y")
+        response = self.client.get(f"{self.url}/free-slots/CA/{day}/{day}")
+
+        self.assertEqual(response.status_code, 200)
+        resources = {slot["resource_id"] for slot in response.data}
+        self.assertIn("tech6@gmail.com", resources)
+        self.assertNotIn(tech.email, resources)
+        self.assertTrue(all(slot["start"].startswith(monday.isoformat()) for slot in response.data))
+
+    def test_free_slots_period_too_long(self):
+        monday = self.next_monday()
+        response = self.client.get(
+            f"{self.url}/free-slots/MO/{monday:%d.%m.%Y}/{monday + timedelta(days=100):%d.%m.%Y}"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class CapacityTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        self.monday = self.next_monday(weeks=2)
+        self.tech = User.objects.get(email="tech1@gmail.com")
+
+    def available(self) -> dict[str, int]:
+        day = self.monday.strftime("%d.%m.%Y")
+        response = self.client.get(f"{self.url}/capacity/{day}/{day}")
+        self.assertEqual(response.status_code, 200)
+        return {row["resource_id"]: row["available"][0] for row in response.data["technicians"]}
+
+    def test_unchanged_capacity_is_cached(self):
+        self.available()
+
+        with mock.patch("operations.service.CapacityGrid.build") as build:
+            self.available()
+
+        build.assert_not_called()
+
+    def test_cache_is_invalidated_by_calendar_changes(self):
+        full_day = self.available()[self.tech.email]
+        self.assertGreater(full_day, 0)
+
+        TechnicianAbsence.objects.create(
+            tech=self.tech, start=self.moment(self.monday, 0), end=self.moment(self.monday + timedelta(days=1), 0)
+        )
+        available = self.available()
+        self.assertEqual(available[self.tech.email], 0)
+        self.assertEqual(available["tech5@gmail.com"], full_day)
+
+        WorkShift.objects.create(weekday=WorkShift.Weekday.MONDAY, start=time(4), end=time(6))
+        self.assertEqual(self.available()["tech5@gmail.com"], 120)
+
+        Holiday.objects.create(date=self.monday)
+        self.assertEqual(set(self.available().values()), {0})
+
+
+class OrderSlackTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        self.late = self.create_order(date.today() - timedelta(days=1), "Работа 1")
+        self.on_time = self.create_order(self.next_monday(weeks=4), "Работа 1")
+        self.cancelled = self.create_order(self.next_monday(weeks=4), "Работа 1", status_number=6)
+        self.completed = self.create_order(self.next_monday(weeks=4), "Работа 1")
+        Operation.objects.filter(work__order=self.completed).update(
+            operation_status=OperationStatus.get_completed_status()
+        )
+
+    def get_slack(self) -> dict[str, dict]:
+        response = self.client.get(f"{self.url}/order-slack")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["order"] for row in response.data], [str(self.late.id), str(self.on_time.id)])
+        return {row["order"]: row for row in response.data}
+
+    def test_order_slack(self):
+        rows = self.get_slack()
+
+        late, on_time = rows[str(self.late.id)], rows[str(self.on_time.id)]
+        self.assertTrue(late["at_risk"])
+        self.assertLess(late["slack"], 0)
+        self.assertFalse(on_time["at_risk"])
+        self.assertGreater(on_time["slack"], 0)
+        # Modelling 70, casting 35 + 10 and ceramics 30 + 8 minutes one after another
+        self.assertEqual(on_time["critical_path"], 153)
+        self.assertEqual(on_time["deadline"], self.on_time.deadline.isoformat())
+
+    def test_changed_deadline_is_not_cached(self):
+        self.get_slack()
+        Order.objects.filter(id=self.late.id).update(deadline=self.next_monday(weeks=8))
+
+        response = self.client.get(f"{self.url}/order-slack")
+
+        self.assertEqual(response.data[-1]["order"], str(self.late.id))
+        self.assertFalse(response.data[-1]["at_risk"])
+
+    def test_order_slack_is_for_admins_only(self):
+        self.client.force_authenticate(User.objects.get(email="tech1@gmail.com"))
+        self.assertEqual(self.client.get(f"{self.url}/order-slack").status_code, 403)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(f"{self.url}/order-slack").status_code, 401)
+
+
+class ScheduleVersionTest(ScheduleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order(self.next_monday(), "Работа 1")
+        self.fire_deferred_triggers()
+
+    def assertBumped(self, bumped: bool, update):
+        version = ScheduleVersion.current()
+        update()
+        self.fire_deferred_triggers()
+        self.assertEqual(ScheduleVersion.current() > version, bumped)
+
+    def test_schedule_changes_bump_version(self):
+        orders = Order.objects.filter(id=self.order.id)
+        self.assertBumped(True, lambda: orders.update(deadline=self.next_monday(weeks=2)))
+        self.assertBumped(True, lambda: Operation.objects.filter(work__order=self.order).update(exec_start=None))
+        self.assertBumped(True, lambda: Holiday.objects.create(date=self.next_monday()))
+
+    def test_other_changes_keep_version(self):
+        self.assertBumped(False, lambda: Order.objects.filter(id=self.order.id).update(discount=10))
+        self.assertBumped(False, lambda: Work.objects.filter(order=self.order).update(discount=10))
+
+    def test_snapshot_is_rebuilt_next_day(self):
+        today = ScheduleSnapshot._today()
+        ScheduleSnapshot._index = None
+        with mock.patch.object(ScheduleSnapshot, "_load", wraps=ScheduleSnapshot._load) as load:
+            ScheduleSnapshot.run(lambda index: None)
+            ScheduleSnapshot.run(lambda index: None)
+            self.assertEqual(load.call_count, 1)
+
+            with mock.patch.object(ScheduleSnapshot, "_today", return_value=today + timedelta(days=1)):
+                ScheduleSnapshot.run(lambda index: None)
+
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(load.call_args.args, (today + timedelta(days=1),))
+
+
+class PlanJobReuseTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def create_finished_job(self, age: timedelta) -> PlanJob:
+        return PlanJob.objects.create(
+            status=PlanJob.Status.DONE,
+            mode="greedy",
+            time_budget=0,
+            snapshot_version=ScheduleVersion.current(),
+            progress=100,
+            result=[{"id": "cached"}],
+            created_at=timezone.now() - age,
+            finished_at=timezone.now() - age,
+        )
+
+    def test_recent_plan_is_reused(self):
+        job = self.create_finished_job(timedelta(minutes=1))
+
+        response = self.client.post(f"{self.url}/plan/jobs", {"mode": "greedy"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(job.id))
+
+        response = self.client.post(f"{self.url}/plan", {"mode": "greedy"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{"id": "cached"}])
+
+    def test_expired_plan_is_not_reused(self):
+        job = self.create_finished_job(settings.PLAN_RESULT_TTL + timedelta(minutes=1))
+
+        response = self.client.post(f"{self.url}/plan/jobs", {"mode": "greedy"}, format="json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data["id"], str(job.id))
+        self.assertEqual(response.data["status"], PlanJob.Status.PENDING)
+
+    def test_plan_of_changed_schedule_is_not_reused(self):
+        job = self.create_finished_job(timedelta(minutes=1))
+        self.create_order(self.next_monday(), "Работа 1")
+        self.fire_deferred_triggers()
+
+        response = self.client.post(f"{self.url}/plan/jobs", {"mode": "greedy"}, format="json")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data["id"], str(job.id))
+
+
+class PlanApplyTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        self.monday = self.next_monday()
+        self.modelling, self.casting, _ = self.order_operations(
+            self.create_order(self.monday + timedelta(days=7), "Работа 1")
+        )
+
+    def apply(self, *operations: dict):
+        return self.client.post(f"{self.url}/plan/apply", {"operations": list(operations)}, format="json")
+
+    def planned(self, operation: Operation, email: str, hour: int) -> dict:
+        return {
+            "operation_id": str(operation.id),
+            "tech_email": email,
+            "exec_start": self.moment(self.monday, hour).isoformat(),
+            "version": operation.version,
+        }
+
+    def test_plan_is_applied(self):
+        response = self.apply(
+            self.planned(self.modelling, "tech1@gmail.com", 4),
+            self.planned(self.casting, "tech2@gmail.com", 6),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.modelling.refresh_from_db()
+        self.casting.refresh_from_db()
+        self.assertEqual(self.modelling.tech.email, "tech1@gmail.com")
+        self.assertEqual(self.modelling.exec_start, self.moment(self.monday, 4))
+        self.assertEqual(self.casting.tech.email, "tech2@gmail.com")
+        self.assertEqual(self.casting.exec_start, self.moment(self.monday, 6))
+
+    def test_only_moved_operations_are_written(self):
+        Operation.objects.filter(id=self.modelling.id).update(
+            tech=User.objects.get(email="tech1@gmail.com"), exec_start=self.moment(self.monday, 4)
+        )
+        self.modelling.refresh_from_db()
+
+        response = self.apply(
+            self.planned(self.modelling, "tech1@gmail.com", 4),
+            self.planned(self.casting, "tech2@gmail.com", 6),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Operation.objects.get(id=self.modelling.id).version, self.modelling.version)
+        self.assertEqual(Operation.objects.get(id=self.casting.id).version, self.casting.version + 1)
+
+    def test_stale_plan_is_conflict(self):
+        planned = [
+            self.planned(self.modelling, "tech1@gmail.com", 4),
+            self.planned(self.casting, "tech2@gmail.com", 6),
+        ]
+        # The operation changes after the plan has been built
+        Operation.objects.filter(id=self.casting.id).update(is_exec_start_editable=False)
+        self.casting.refresh_from_db()
+
+        response = self.apply(*planned)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            response.data["conflicts"],
+            [{"operation_id": str(self.casting.id), "reason": "changed", "version": self.casting.version}],
+        )
+        self.modelling.refresh_from_db()
+        self.assertIsNone(self.modelling.exec_start)
+
+    def test_plan_without_version_is_rejected(self):
+        planned = self.planned(self.modelling, "tech1@gmail.com", 4)
+        del planned["version"]
+
+        response = self.apply(planned)
+
+        self.assertEqual(response.status_code, 400)
+        self.modelling.refresh_from_db()
+        self.assertIsNone(self.modelling.exec_start)
+
+    def test_unknown_operation_and_tech_are_conflicts(self):
+        unknown = self.planned(self.modelling, "tech1@gmail.com", 4) | {"operation_id": str(uuid.uuid4())}
+
+        response = self.apply(unknown, self.planned(self.casting, "nobody@gmail.com", 6))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            [conflict["reason"] for conflict in response.data["conflicts"]], ["not_found", "tech_not_found"]
+        )
+
+
+class PlanDraftTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        self.operations = self.order_operations(self.create_order(self.next_monday() + timedelta(days=7), "Работа 1"))
+
+    def create_draft(self) -> dict:
+        response = self.client.post(f"{self.url}/plan/drafts", {"mode": "greedy"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_draft_holds_moved_operations(self):
+        draft = self.create_draft()
+
+        self.assertTrue(draft["is_current"])
+        self.assertEqual(
+            {row["operation_id"] for row in draft["operations"]}, {str(operation.id) for operation in self.operations}
+        )
+        self.assertTrue(all(row["tech_email"] and not row["stale"] for row in draft["operations"]))
+        # Nothing is written until the draft is applied
+        self.assertFalse(Operation.objects.filter(id__in=[op.id for op in self.operations], tech__isnull=False))
+
+        response = self.client.get(f"{self.url}/plan/drafts/{draft['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, draft)
+
+    def test_apply_writes_only_diff(self):
+        draft = self.create_draft()
+        rows = {row["operation_id"]: row for row in draft["operations"]}
+        # The first operation is put in its planned place before the draft is applied
+        first = self.operations[0]
+        row = rows[str(first.id)]
+        Operation.objects.filter(id=first.id).update(
+            tech=User.objects.get(email=row["tech_email"]), exec_start=row["exec_start"]
+        )
+        first.refresh_from_db()
+
+        response = self.client.get(f"{self.url}/plan/drafts/{draft['id']}")
+        self.assertNotIn(str(first.id), {row["operation_id"] for row in response.data["operations"]})
+
+        response = self.client.post(f"{self.url}/plan/drafts/{draft['id']}/apply")
+
+        self.assertEqual(response.status_code, 200)
+        for operation in self.operations:
+            applied = Operation.objects.select_related("tech").get(id=operation.id)
+            self.assertEqual(applied.tech.email, rows[str(operation.id)]["tech_email"])
+            self.assertEqual(applied.exec_start, datetime.fromisoformat(rows[str(operation.id)]["exec_start"]))
+            self.assertEqual(applied.version, first.version if operation == first else operation.version + 1)
+
+    def test_apply_stale_draft_is_conflict(self):
+        draft = self.create_draft()
+        changed = self.operations[1]
+        Operation.objects.filter(id=changed.id).update(is_exec_start_editable=False)
+        self.fire_deferred_triggers()
+        changed.refresh_from_db()
+
+        response = self.client.get(f"{self.url}/plan/drafts/{draft['id']}")
+        self.assertFalse(response.data["is_current"])
+        self.assertEqual(
+            [row["operation_id"] for row in response.data["operations"] if row["stale"]], [str(changed.id)]
+        )
+
+        response = self.client.post(f"{self.url}/plan/drafts/{draft['id']}/apply")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            response.data["conflicts"],
+            [{"operation_id": str(changed.id), "reason": "changed", "version": changed.version}],
+        )
+        self.assertFalse(Operation.objects.filter(id__in=[op.id for op in self.operations], tech__isnull=False))
+
+
+class ScheduleRepairTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        last_monday = self.next_monday(weeks=-1)
+        self.modelling, self.casting, self.ceramics = self.order_operations(
+            self.create_order(self.next_monday(weeks=2), "Работа 1")
+        )
+        # Planned last week: the successors wait for the modelling reported only now
+        for operation, email, hour in (
+            (self.modelling, "tech1@gmail.com", 4), (self.casting, "tech2@gmail.com", 6),
+            (self.ceramics, "tech3@gmail.com", 8),
+        ):
+            Operation.objects.filter(id=operation.id).update(
+                tech=User.objects.get(email=email), exec_start=self.moment(last_monday, hour)
+            )
+
+    def test_completed_operation_shifts_successors(self):
+        reported = timezone.now()
+
+        response = self.client.patch(
+            f"{self.url}/operation/{self.modelling.id}",
+            {"status": str(OperationStatus.get_completed_status().id)},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.casting.refresh_from_db()
+        self.ceramics.refresh_from_db()
+        self.assertEqual(
+            {row["id"]: datetime.fromisoformat(row["exec_start"]) for row in response.data["moved_operations"]},
+            {str(self.casting.id): self.casting.exec_start, str(self.ceramics.id): self.ceramics.exec_start},
+        )
+        pause = ScheduleRepair.pause
+        calendar = WorkCalendar.load()
+        self.assertGreaterEqual(self.casting.exec_start, reported + pause)
+        self.assertGreaterEqual(
+            self.ceramics.exec_start,
+            calendar.end_of(self.casting.exec_start, self.casting.get_exec_duration()) + pause,
+        )
+        self.assertEqual(self.casting.tech.email, "tech2@gmail.com")
+
+    def test_not_started_operation_does_not_shift_successors(self):
+        response = self.client.patch(
+            f"{self.url}/operation/{self.modelling.id}",
+            {"status": str(OperationStatus.get_default_status().id)},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["moved_operations"], [])
+
+
+class PlanningFiltersTest(ScheduleTestCase):
+    def setUp(self):
+        super().setUp()
+        deadline = self.next_monday(weeks=2)
+        self.planned = self.order_operations(self.create_order(deadline, "Работа 1"))
+        self.completed = self.order_operations(self.create_order(deadline, "Работа 1"))[0]
+        Operation.objects.filter(id=self.completed.id).update(
+            operation_status=OperationStatus.get_completed_status()
+        )
+        self.cancelled = self.order_operations(self.create_order(deadline, "Работа 1", status_number=6))
+        beyond_horizon = date.today() + settings.PLANNING_HORIZON + timedelta(days=7)
+        self.beyond_horizon = self.order_operations(self.create_order(beyond_horizon, "Работа 1"))
+
+    def test_planner_gets_only_operations_in_horizon(self):
+        rows, blocking = OperationService._get_operations_to_distribute(timezone.now())
+
+        loaded = {op.id for op, _ in rows}
+        self.assertTrue({op.id for op in self.planned} <= loaded)
+        left_out = {op.id for op in [self.completed, *self.cancelled, *self.beyond_horizon]}
+        self.assertFalse(loaded & left_out)
+        self.assertFalse(blocking.filter(id__in=left_out).exists())
+
+
+class IncrementalPlanTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def test_started_operations_are_not_moved(self):
+        completed, *operations = self.order_operations(self.create_order(self.next_monday(), "Работа 1"))
+        Operation.objects.filter(id=completed.id).update(operation_status=OperationStatus.get_completed_status())
+
+        response = self.client.post(f"{self.url}/plan/incremental", {}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row["id"] for row in response.data}, {str(operation.id) for operation in operations})
+        completed.refresh_from_db()
+        self.assertIsNone(completed.exec_start)
+
+
+class OrdersAssignmentTest(ScheduleTestCase):
+    url = "/api/operations"
+
+    def assign(self, *orders: Order):
+        return self.client.post(
+            f"{self.url}/assign-operations/orders", {"orders": [str(order.id) for order in orders]}, format="json"
+        )
+
+    def test_orders_are_assigned_by_deadline(self):
+        monday = self.next_monday()
+        # Four orders compete for the three modelling technicians
+        orders = [self.create_order(monday + timedelta(days=days), "Работа 1") for days in (10, 9, 8, 7)]
+
+        response = self.assign(*orders)
+
+        self.assertEqual(response.status_code, 200)
+        starts = [self.order_operations(order)[0].exec_start for order in reversed(orders)]
+        self.assertTrue(all(start is not None for start in starts))
+        self.assertEqual(starts, sorted(starts))
+        self.assertLess(starts[0], starts[-1])
+
+    def test_only_moved_operations_are_written(self):
+        monday = self.next_monday()
+        locked, order = (self.create_order(monday + timedelta(days=7), "Работа 1") for _ in range(2))
+        for operation, email, hour in zip(self.order_operations(locked), ("tech1", "tech2", "tech3"), (4, 6, 9)):
+            Operation.objects.filter(id=operation.id).update(
+                tech=User.objects.get(email=f"{email}@gmail.com"),
+                exec_start=self.moment(monday, hour),
+                is_exec_start_editable=False,
+            )
+        versions = {operation.id: operation.version for operation in Operation.objects.all()}
+
+        response = self.assign(locked, order)
+
+        self.assertEqual(response.status_code, 200)
+        for operation in self.order_operations(locked):
+            self.assertEqual(operation.version, versions[operation.id])
+        for operation in self.order_operations(order):
+            self.assertIsNotNone(operation.exec_start)
+            self.assertEqual(operation.version, versions[operation.id] + 1)
+
+    def test_unknown_order(self):
+        response = self.assign(Order(id=uuid.uuid4()))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("orders", response.data)
+
+
+class DoubleBookingTest(ScheduleTransactionTestCase):
+    url = "/api/operations"
+
+    def setUp(self):
+        super().setUp()
+        self.monday = self.next_monday()
+        self.tech = User.objects.get(email="tech1@gmail.com")
+        # The first operations of both orders are 70 minute modelling operations
+        self.booked = self.order_operations(self.create_order(self.monday + timedelta(days=7), "Работа 1"))[0]
+        self.other = self.order_operations(self.create_order(self.monday + timedelta(days=7), "Работа 1"))[0]
+        Operation.objects.filter(id=self.booked.id).update(tech=self.tech, exec_start=self.moment(self.monday, 4))
+
+    def test_overlapping_operation_is_rejected(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Operation.objects.filter(id=self.other.id).update(
+                    tech=self.tech, exec_start=self.moment(self.monday, 5)
+                )
+
+        self.other.refresh_from_db()
+        self.assertIsNone(self.other.tech_id)
+
+    def test_operation_moved_into_released_time(self):
+        with transaction.atomic():
+            # The first change is checked against the rows as they are at the commit
+            Operation.objects.filter(id=self.booked.id).update(exec_start=self.moment(self.monday, 9))
+            Operation.objects.filter(id=self.booked.id).update(tech=None, exec_start=None)
+            Operation.objects.filter(id=self.other.id).update(tech=self.tech, exec_start=self.moment(self.monday, 9))
+
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.tech_id, self.tech.id)
+
+    def test_overlapping_plan_is_conflict(self):
+        response = self.client.post(
+            f"{self.url}/plan/apply",
+            {
+                "operations": [
+                    {
+                        "operation_id": str(self.other.id),
+                        "tech_email": self.tech.email,
+                        "exec_start": self.moment(self.monday, 4, 30).isoformat(),
+                        "version": self.other.version,
+                    },
+                ],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            response.data["conflicts"],
+            [{"operation_id": str(self.other.id), "reason": "double_booking", "version": None}],
+        )
+        self.other.refresh_from_db()
+        self.assertIsNone(self.other.exec_start)
+
+    def test_plan_next_to_booked_operation_is_applied(self):
+        response = self.client.post(
+            f"{self.url}/plan/apply",
+            {
+                "operations": [
+                    {
+                        "operation_id": str(self.other.id),
+                        "tech_email": self.tech.email,
+                        "exec_start": self.moment(self.monday, 5, 15).isoformat(),
+                        "version": self.other.version,
+                    },
+                ],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.tech_id, self.tech.id)
+
+    def book_overlapping(self):
+        """
+        Books `other` over `booked`, as the schedules written before the guard was installed may be.
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config(%s, 'on', TRUE)", [ALLOW_DOUBLE_BOOKING_SETTING])
+            Operation.objects.filter(id=self.other.id).update(tech=self.tech, exec_start=self.moment(self.monday, 5))
+
+    def test_status_of_overlapping_operation_is_updated(self):
+        self.book_overlapping()
+
+        response = self.client.patch(
+            f"{self.url}/operation/{self.other.id}",
+            {"status": str(OperationStatus.get_in_progress_status().id)},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.operation_status, OperationStatus.get_in_progress_status())
+
+    def test_conflicting_schedule_repair_is_conflict(self):
+        def repair(operation: Operation) -> list:
+            Operation.objects.filter(id=self.other.id).update(tech=self.tech, exec_start=self.moment(self.monday, 5))
+            return []
+
+        with mock.patch.object(OperationService, "_repair_schedule", side_effect=repair):
+            response = self.client.patch(
+                f"{self.url}/operation/{self.booked.id}",
+                {"status": str(OperationStatus.get_completed_status().id)},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 409)
+        self.booked.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.booked.operation_status, OperationStatus.get_default_status())
+        self.assertIsNone(self.other.tech_id)
+
+    def test_overlapping_operations_are_released(self):
+        self.book_overlapping()
+
+        out = io.StringIO()
+        call_command("check_double_bookings", stdout=out)
+        self.assertIn("1 overlapping pairs", out.getvalue())
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.tech_id, self.tech.id)
+
+        call_command("check_double_bookings", "--release", stdout=out)
+
+        self.other.refresh_from_db()
+        self.booked.refresh_from_db()
+        self.assertIsNone(self.other.tech_id)
+        self.assertIsNone(self.other.exec_start)
+        self.assertEqual(self.booked.tech_id, self.tech.id)
+
+
+class CalendarExecRangeTest(ScheduleTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.monday = self.next_monday()
+        self.tech = User.objects.get(email="tech2@gmail.com")
+        # 35 minutes + 10 per item: longer than a working day
+        order = self.create_order(self.monday + timedelta(days=14), "Работа 1", amount=60)
+        self.long = self.order_operations(order)[1]
+        Operation.objects.filter(id=self.long.id).update(tech=self.tech, exec_start=self.moment(self.monday, 4))
+        self.long.refresh_from_db()
+
+    def test_long_operation_ends_per_calendar(self):
+        end = WorkCalendar.load().end_of(self.long.exec_start, self.long.get_exec_duration())
+
+        self.assertEqual(end, self.moment(self.monday + timedelta(days=1), 6, 35))
+        self.assertEqual(self.long.exec_range.upper, end)
+        self.assertEqual(ScheduleEntry.objects.get(operation=self.long).exec_end, end)
+        self.assertEqual(Operation.objects.with_exec_end().get(id=self.long.id).exec_end, end)
+
+    def test_overlap_on_next_working_day_is_rejected(self):
+        other = self.order_operations(self.create_order(self.monday + timedelta(days=14), "Работа 2"))[0]
+
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Operation.objects.filter(id=other.id).update(
+                    tech=self.tech, exec_start=self.moment(self.monday + timedelta(days=1), 5)
+                )
+
+    def test_holiday_moves_end(self):
+        Holiday.objects.create(date=self.monday + timedelta(days=1))
+
+        self.long.refresh_from_db()
+        end = self.moment(self.monday + timedelta(days=2), 6, 35)
+        self.assertEqual(self.long.exec_range.upper, end)
+        self.assertEqual(ScheduleEntry.objects.get(operation=self.long).exec_end, end)
@@ -0,0 +1,643 @@
+import copy
+import multiprocessing
+import os
+import random
+import tempfile
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import pytz
+from django.test import SimpleTestCase
+
+from accounts.models import User
+from operations.scheduling import (
+    BackfillPlanner,
+    CapacityGrid,
+    DecomposedPlanner,
+    IncrementalPlanner,
+    OrderSlack,
+    PlanCapture,
+    PlanOperation,
+    Precedence,
+    ScheduleRepair,
+    SearchProblem,
+    TechTimeline,
+    TimelineIndex,
+    TimelinePlanner,
+    WorkCalendar,
+    WorkTypePrecedence,
+    improve_plan,
+    run_in_process,
+    validate_schedule,
+    workers,
+)
+from operations.scheduling.local_search import SearchOperation
+from operations.scheduling.validation import (
+    DEADLINE_ERROR,
+    NO_PAUSE_ERROR,
+    OPERATION_IN_BREAK_ERROR,
+    OPERATIONS_ORDER_ERROR,
+)
+
+
+def plan_operation(work_id: uuid.UUID, ordinal_number: int, group: str, minutes: int) -> PlanOperation:
+    return PlanOperation(
+        id=uuid.uuid4(),
+        work_id=work_id,
+        ordinal_number=ordinal_number,
+        group=group,
+        duration=timedelta(minutes=minutes),
+        deadline=date(2024, 3, 27),
+        is_exec_start_editable=True,
+        tech_id=None,
+        exec_start=None,
+    )
+
+
+class TechTimelineTest(SimpleTestCase):
+    pause = timedelta(minutes=5)
+
+    def setUp(self):
+        self.day = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+        self.timeline = TechTimeline(tech=None, group="MO", calendar=WorkCalendar(WorkCalendar.DEFAULT_SHIFTS))
+        self.timeline.add(self.day, self.day + timedelta(hours=1), uuid.uuid4())
+        self.timeline.add(self.day + timedelta(hours=2), self.day + timedelta(hours=3), uuid.uuid4())
+
+    def test_first_fit_uses_gap_between_operations(self):
+        start, end = self.timeline.first_fit(self.day, timedelta(minutes=30), self.pause)
+
+        self.assertEqual(start, self.day + timedelta(hours=1, minutes=5))
+        self.assertEqual(end, self.day + timedelta(hours=1, minutes=35))
+
+    def test_first_fit_skips_too_small_gap(self):
+        start, _ = self.timeline.first_fit(self.day, timedelta(minutes=55), self.pause)
+
+        self.assertEqual(start, self.day + timedelta(hours=3, minutes=5))
+
+    def test_remove_frees_interval(self):
+        operation_id = uuid.uuid4()
+        self.timeline.add(self.day + timedelta(hours=1, minutes=5), self.day + timedelta(hours=1, minutes=50),
+                          operation_id)
+        self.timeline.remove(operation_id)
+
+        start, _ = self.timeline.first_fit(self.day, timedelta(minutes=30), self.pause)
+
+        self.assertEqual(len(self.timeline), 2)
+        self.assertEqual(start, self.day + timedelta(hours=1, minutes=5))
+
+    def test_overlapping_respects_pause(self):
+        conflicts = self.timeline.overlapping(
+            self.day + timedelta(hours=1, minutes=2), self.day + timedelta(hours=1, minutes=30), self.pause
+        )
+
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(self.timeline.overlapping(self.day + timedelta(hours=1, minutes=5),
+                                                   self.day + timedelta(hours=1, minutes=55), self.pause), [])
+
+    def test_free_gaps(self):
+        gaps = self.timeline.free_gaps(self.day, self.day + timedelta(hours=4), self.pause)
+
+        self.assertEqual(gaps, [
+            (self.day + timedelta(hours=1, minutes=5), self.day + timedelta(hours=1, minutes=55)),
+            (self.day + timedelta(hours=3, minutes=5), self.day + timedelta(hours=4)),
+        ])
+
+
+class WorkCalendarTest(SimpleTestCase):
+    def setUp(self):
+        # Friday 29.03.2024, Monday 01.04.2024 is a holiday
+        self.friday = datetime(2024, 3, 29, tzinfo=pytz.UTC)
+        self.calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS, holidays=[datetime(2024, 4, 1).date()])
+
+    def test_next_working_instant_skips_weekend_and_holiday(self):
+        moment = self.calendar.next_working_instant(self.friday + timedelta(hours=14))
+
+        self.assertEqual(moment, datetime(2024, 4, 2, 4, 0, tzinfo=pytz.UTC))
+
+    def test_add_working_minutes_skips_break(self):
+        moment = self.calendar.add_working_minutes(self.friday + timedelta(hours=7, minutes=30), 60)
+
+        self.assertEqual(moment, self.friday + timedelta(hours=9, minutes=30))
+
+    def test_fit_moves_operation_out_of_break(self):
+        start, end = self.calendar.fit(self.friday + timedelta(hours=7, minutes=30), timedelta(hours=1))
+
+        self.assertEqual(start, self.friday + timedelta(hours=9))
+        self.assertEqual(end, self.friday + timedelta(hours=10))
+
+    def test_fit_continues_long_operation(self):
+        start, end = self.calendar.fit(self.friday + timedelta(hours=12), timedelta(hours=6))
+
+        self.assertEqual(start, self.friday + timedelta(hours=12))
+        self.assertEqual(end, datetime(2024, 4, 2, 10, 0, tzinfo=pytz.UTC))
+        self.assertEqual(self.calendar.working_time_between(start, end), timedelta(hours=6))
+
+    def test_working_time_between_on_fresh_calendar(self):
+        calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS)
+        sunday = datetime(2024, 3, 24, 6, 50, tzinfo=pytz.UTC)
+        self.assertEqual(calendar.working_time_between(sunday, self.friday), timedelta(hours=32))
+
+    def test_absence_removes_working_time(self):
+        calendar = self.calendar.with_absences([(self.friday + timedelta(hours=4), self.friday + timedelta(hours=6))])
+
+        start, _ = calendar.fit(self.friday, timedelta(hours=3))
+
+        self.assertEqual(start, self.friday + timedelta(hours=9))
+
+
+class LocalSearchTest(SimpleTestCase):
+    now = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+
+    def setUp(self):
+        calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS)
+        self.busy_tech, self.free_tech = uuid.uuid4(), uuid.uuid4()
+        operations, greedy = {}, {}
+        for number in range(3):
+            operation_id = uuid.uuid4()
+            operations[operation_id] = SearchOperation(
+                id=operation_id, group="MO", duration=timedelta(hours=1), deadline=self.now, predecessors=()
+            )
+            start = self.now + timedelta(hours=number, minutes=5 * number)
+            greedy[operation_id] = (self.busy_tech, start, start + timedelta(hours=1))
+        self.problem = SearchProblem(
+            operations=operations,
+            fixed_ends={},
+            timelines={tech_id: TechTimeline(None, "MO", calendar) for tech_id in (self.busy_tech, self.free_tech)},
+            techs_by_group={"MO": [self.busy_tech, self.free_tech]},
+            greedy=greedy,
+            now=self.now,
+            pause=timedelta(minutes=5),
+        )
+
+    def test_improve_plan_spreads_operations_between_technicians(self):
+        assignment, greedy_metrics, improved_metrics = improve_plan(self.problem, time_budget=0.5, seed=1)
+
+        self.assertEqual(greedy_metrics.makespan, 190)
+        self.assertLess(improved_metrics.tardiness, greedy_metrics.tardiness)
+        self.assertEqual(improved_metrics.makespan, 125)
+        self.assertEqual({tech_id for tech_id, _, _ in assignment.values()}, {self.busy_tech, self.free_tech})
+
+    def test_improve_plan_in_worker_process(self):
+        # Workers start in a fresh interpreter, as with the default start method of newer Python versions
+        pool = workers._new_process_pool(multiprocessing.get_context("forkserver"))
+        try:
+            with mock.patch.object(workers, "_process_pool", pool):
+                assignment, _, improved_metrics = run_in_process(improve_plan, self.problem, 0.5, 1, timeout=60)
+        finally:
+            pool.shutdown()
+
+        self.assertEqual(improved_metrics.makespan, 125)
+        self.assertEqual(set(assignment), set(self.problem.operations))
+
+
+class DecomposedPlannerTest(SimpleTestCase):
+    now = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+
+    def setUp(self):
+        self.techs = {
+            group: [User(email=f"{group}{number}@example.com") for number in range(2)]
+            for group in ("MO", "CA", "CE")
+        }
+
+    @staticmethod
+    def _operations() -> list[PlanOperation]:
+        # Works alternate between the groups, so the groups depend on each other
+        routes = [("MO", "CA", "CE"), ("CA", "MO"), ("CE", "CA", "MO"), ("MO", "CE"), ("CA", "CE", "MO")]
+        operations = []
+        for number, route in enumerate(routes * 3):
+            work_id = uuid.uuid4()
+            for ordinal, group in enumerate(route, start=1):
+                operations.append(plan_operation(work_id, ordinal, group, 30 + 15 * ((number + ordinal) % 4)))
+        return operations
+
+    def _index(self) -> TimelineIndex:
+        index = TimelineIndex(WorkCalendar(WorkCalendar.DEFAULT_SHIFTS))
+        for group, techs in self.techs.items():
+            for tech in techs:
+                index.add_technician(tech, group)
+        return index
+
+    def test_plan_matches_serial_planner(self):
+        expected = self._operations()
+        operations = [copy.copy(op) for op in expected]
+        TimelinePlanner(self._index(), self.now).plan(expected, expected)
+
+        planner = DecomposedPlanner(self._index(), self.now, map_func=map)
+        planner.plan(operations, operations)
+
+        self.assertLessEqual(planner.rounds, DecomposedPlanner.max_rounds)
+        self.assertEqual(
+            [(op.tech_id, op.exec_start) for op in operations],
+            [(op.tech_id, op.exec_start) for op in expected],
+        )
+
+    def test_plan_in_worker_processes(self):
+        expected = self._operations()
+        operations = [copy.copy(op) for op in expected]
+        TimelinePlanner(self._index(), self.now).plan(expected, expected)
+
+        # Workers start in a fresh interpreter, as with the default start method of newer Python versions
+        pool = workers._new_process_pool(multiprocessing.get_context("forkserver"))
+        try:
+            with mock.patch.object(workers, "_process_pool", pool):
+                DecomposedPlanner(self._index(), self.now).plan(operations, operations)
+        finally:
+            pool.shutdown()
+
+        self.assertEqual(
+            [(op.tech_id, op.exec_start) for op in operations],
+            [(op.tech_id, op.exec_start) for op in expected],
+        )
+
+
+class PrecedenceTest(SimpleTestCase):
+    now = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+    pause = TimelinePlanner.pause
+
+    def setUp(self):
+        self.techs = {
+            group: [User(email=f"{group}{number}@example.com") for number in range(2)]
+            for group in ("MO", "CA", "CE")
+        }
+
+    def _index(self, **groups: int) -> TimelineIndex:
+        index = TimelineIndex(WorkCalendar(WorkCalendar.DEFAULT_SHIFTS))
+        for group, count in groups.items():
+            for tech in self.techs[group][:count]:
+                index.add_technician(tech, group)
+        return index
+
+    @staticmethod
+    def _bridges() -> list[PlanOperation]:
+        # Two designs of one work are independent, the milling waits for both
+        work_id = uuid.uuid4()
+        operations = [
+            plan_operation(work_id, ordinal, group, 60) for ordinal, group in enumerate(("MO", "MO", "CA"), start=1)
+        ]
+        operations[0].predecessors = ()
+        operations[1].predecessors = ()
+        operations[2].predecessors = (1, 2)
+        return operations
+
+    def test_independent_steps_run_in_parallel(self):
+        index = self._index(MO=2, CA=1)
+        first, second, milling = operations = self._bridges()
+        TimelinePlanner(index, self.now).plan(operations, operations)
+
+        self.assertEqual(first.exec_start, second.exec_start)
+        self.assertNotEqual(first.tech_id, second.tech_id)
+        self.assertEqual(milling.exec_start, index.calendar.end_of(first.exec_start, first.duration) + self.pause)
+
+    def test_longest_chain_is_planned_first(self):
+        short_work, long_work = uuid.uuid4(), uuid.uuid4()
+        short = plan_operation(short_work, 1, "MO", 30)
+        long_first, long_second = plan_operation(long_work, 1, "MO", 30), plan_operation(long_work, 2, "CA", 240)
+        operations = [short, long_first, long_second]
+
+        precedence = Precedence(operations)
+        self.assertEqual(precedence.tails[long_first.id], timedelta(minutes=270))
+        self.assertEqual(precedence.order(operations), [long_first, long_second, short])
+
+        TimelinePlanner(self._index(MO=1, CA=1), self.now).plan(operations, operations)
+        self.assertLess(long_first.exec_start, short.exec_start)
+
+    def test_cycle_is_rejected(self):
+        operations = self._bridges()
+        operations[0].predecessors = (3,)
+        with self.assertRaises(ValueError):
+            Precedence(operations)
+
+    def test_decomposed_plan_matches_serial_planner(self):
+        expected = self._bridges() + self._bridges() + DecomposedPlannerTest._operations()
+        operations = [copy.copy(op) for op in expected]
+        TimelinePlanner(self._index(MO=2, CA=2, CE=2), self.now).plan(expected, expected)
+        DecomposedPlanner(self._index(MO=2, CA=2, CE=2), self.now, map_func=map).plan(operations, operations)
+
+        self.assertEqual(
+            [(op.tech_id, op.exec_start) for op in operations],
+            [(op.tech_id, op.exec_start) for op in expected],
+        )
+
+
+class OrderSlackTest(SimpleTestCase):
+    now = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+
+    def _operations(self, deadline: date) -> list[PlanOperation]:
+        work_id = uuid.uuid4()
+        first, second = plan_operation(work_id, 1, "MO", 60), plan_operation(work_id, 2, "CA", 120)
+        first.tech_id, first.exec_start = uuid.uuid4(), self.now
+        for op in (first, second):
+            op.deadline = deadline
+        return [first, second]
+
+    def test_unassigned_operations_follow_assigned_ones(self):
+        calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS)
+        analysis = OrderSlack.analyze(self._operations(date(2024, 3, 25)), calendar, self.now, TimelinePlanner.pause)
+
+        self.assertEqual(analysis.critical_path, 180)
+        self.assertEqual(analysis.finish, datetime(2024, 3, 25, 7, 5, tzinfo=pytz.UTC))
+        # 07:05-08:00 and 09:00-13:00 are left on the deadline day
+        self.assertEqual(analysis.slack, 295)
+        self.assertFalse(analysis.at_risk)
+
+    def test_late_order_has_negative_slack(self):
+        calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS)
+        analysis = OrderSlack.analyze(self._operations(date(2024, 3, 24)), calendar, self.now, TimelinePlanner.pause)
+
+        self.assertEqual(analysis.slack, -185)
+        self.assertTrue(analysis.at_risk)
+
+
+class MemoryScheduleRepair(ScheduleRepair):
+    def __init__(self, index: TimelineIndex, now: datetime, operations: list[PlanOperation]):
+        super().__init__(index, now)
+        self.stored = operations
+
+    def load_work(self, work_id: uuid.UUID) -> list[PlanOperation]:
+        return [op for op in self.stored if op.work_id == work_id]
+
+    def load_technician(self, tech_id: uuid.UUID) -> list[PlanOperation]:
+        return [op for op in self.stored if op.tech_id == tech_id]
+
+
+class ScheduleRepairTest(SimpleTestCase):
+    start = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+
+    def setUp(self):
+        self.index = TimelineIndex(WorkCalendar(WorkCalendar.DEFAULT_SHIFTS))
+        self.modeller, self.caster = User(email="mo@example.com"), User(email="ca@example.com")
+        self.index.add_technician(self.modeller, "MO")
+        self.index.add_technician(self.caster, "CA")
+
+        work_id = uuid.uuid4()
+        self.first, self.second = plan_operation(work_id, 1, "MO", 60), plan_operation(work_id, 2, "CA", 60)
+        # An operation of another work right after the first one
+        self.other = plan_operation(uuid.uuid4(), 1, "MO", 60)
+        for op, tech, minutes in ((self.first, self.modeller, 0), (self.second, self.caster, 65),
+                                  (self.other, self.modeller, 65)):
+            op.tech_id, op.exec_start = tech.id, self.start + timedelta(minutes=minutes)
+
+    def _repair(self, now: datetime) -> list[PlanOperation]:
+        operations = [copy.copy(op) for op in (self.first, self.second, self.other)]
+        repair = MemoryScheduleRepair(self.index, now, operations)
+        return repair.repair(copy.copy(self.first), now)
+
+    def test_late_operation_pushes_successor_and_technician_timeline(self):
+        now = self.start + timedelta(minutes=90)
+        moved = {op.id: op.exec_start for op in self._repair(now)}
+
+        self.assertEqual(moved, {self.second.id: now + timedelta(minutes=5), self.other.id: now + timedelta(minutes=5)})
+
+    def test_early_completion_pulls_successor(self):
+        now = self.start + timedelta(minutes=30)
+        moved = {op.id: op.exec_start for op in self._repair(now)}
+
+        # The modeller keeps the planned place of the completed operation
+        self.assertEqual(moved, {self.second.id: now + timedelta(minutes=5)})
+
+
+class BackfillPlannerTest(SimpleTestCase):
+    start = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+
+    def test_pulls_earliest_deadlines_into_released_timeline(self):
+        index = TimelineIndex(WorkCalendar(WorkCalendar.DEFAULT_SHIFTS))
+        released, busy, caster = (User(email=f"tech{number}@example.com") for number in range(3))
+        index.add_technician(released, "MO")
+        index.add_technician(busy, "MO")
+        index.add_technician(caster, "CA")
+
+        urgent = plan_operation(uuid.uuid4(), 1, "MO", 60)
+        cast_work = uuid.uuid4()
+        cast, after_cast = plan_operation(cast_work, 1, "CA", 90), plan_operation(cast_work, 2, "MO", 60)
+        later = plan_operation(uuid.uuid4(), 1, "MO", 60)
+        later.deadline = date(2024, 3, 28)
+        for op, tech, minutes in ((urgent, busy, 180), (cast, caster, 0), (after_cast, busy, 300),
+                                  (later, busy, 120)):
+            op.tech_id, op.exec_start = tech.id, self.start + timedelta(minutes=minutes)
+            index.add(tech.id, op.exec_start, op.exec_start + op.duration, op.id)
+
+        operations = [urgent, cast, after_cast, later]
+        moved = BackfillPlanner(index, self.start).plan([urgent, after_cast, later], operations, {released.id})
+
+        self.assertEqual(moved, [urgent, after_cast])
+        self.assertEqual((urgent.tech_id, urgent.exec_start), (released.id, self.start))
+        # Waits for the casting that ends at 05:30
+        self.assertEqual(after_cast.exec_start, self.start + timedelta(minutes=95))
+        self.assertEqual((later.tech_id, later.exec_start), (busy.id, self.start + timedelta(minutes=120)))
+
+
+class IncrementalPlannerTest(SimpleTestCase):
+    start = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+
+    def setUp(self):
+        self.index = TimelineIndex(WorkCalendar(WorkCalendar.DEFAULT_SHIFTS))
+        self.modeller, self.caster = User(email="mo@example.com"), User(email="ca@example.com")
+        self.index.add_technician(self.modeller, "MO")
+        self.index.add_technician(self.caster, "CA")
+
+        work_id, other_work_id = uuid.uuid4(), uuid.uuid4()
+        self.first, self.second = plan_operation(work_id, 1, "MO", 60), plan_operation(work_id, 2, "CA", 60)
+        self.new, self.cast = plan_operation(other_work_id, 1, "MO", 60), plan_operation(other_work_id, 2, "CA", 60)
+        # Operations of other works keep their place
+        self.modelled = plan_operation(uuid.uuid4(), 1, "MO", 60)
+        self.casting = plan_operation(uuid.uuid4(), 1, "CA", 60)
+        # The successor of the first operation is planned before it could start, the other one well after
+        for op, tech, minutes in ((self.second, self.caster, 10), (self.cast, self.caster, 300),
+                                  (self.modelled, self.modeller, 0), (self.casting, self.caster, 200)):
+            op.tech_id, op.exec_start = tech.id, self.start + timedelta(minutes=minutes)
+            self.index.add(tech.id, op.exec_start, op.exec_start + op.duration, op.id)
+
+    def _plan(self) -> list[PlanOperation]:
+        work_operations = [self.first, self.second, self.new, self.cast]
+        return IncrementalPlanner(self.index, self.start).plan([self.first, self.new], work_operations)
+
+    def test_successor_in_wrong_order_is_retimed(self):
+        self._plan()
+
+        # The modeller is busy until 05:00, the first operation ends at 06:05
+        self.assertEqual(self.first.tech_id, self.modeller.id)
+        self.assertEqual(self.first.exec_start, self.start + timedelta(minutes=65))
+        self.assertEqual(self.second.exec_start, self.start + timedelta(minutes=130))
+        self.assertEqual(self.cast.exec_start, self.start + timedelta(minutes=300))
+
+    def test_only_changed_operations_are_returned(self):
+        changed = self._plan()
+
+        self.assertEqual({op.id for op in changed}, {self.first.id, self.second.id, self.new.id})
+
+
+class PlanCaptureTest(SimpleTestCase):
+    now = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+
+    def test_replayed_capture_gives_same_plan(self):
+        calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS, holidays=[date(2024, 3, 26)])
+        index = TimelineIndex(calendar)
+        techs = [User(email=f"tech{number}@example.com") for number in range(2)]
+        index.add_technician(techs[0], "MO")
+        index.add_technician(techs[1], "CA", calendar.with_absences([(self.now, self.now + timedelta(hours=2))]))
+        index.add(techs[0].id, self.now, self.now + timedelta(hours=1), uuid.uuid4())
+
+        operations = []
+        for number in range(4):
+            work_id = uuid.uuid4()
+            for ordinal, group in enumerate(("MO", "CA"), start=1):
+                operations.append(plan_operation(work_id, ordinal, group, 40 + 10 * number))
+
+        capture = PlanCapture.from_planner_input("optimized_plan", index, operations, operations, self.now)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "capture.json.gz")
+            capture.dump(path)
+            restored = PlanCapture.load(path)
+        restored_index, restored_operations, work_operations = restored.restore()
+        TimelinePlanner(index, self.now).plan(operations, operations)
+        TimelinePlanner(restored_index, restored.now).plan(restored_operations, work_operations)
+
+        self.assertEqual(restored.now, self.now)
+        self.assertEqual(restored_operations, operations)
+
+
+def validate_with_loops(operations: list[dict], calendar: WorkCalendar, pause: timedelta) -> list[dict]:
+    # Row by row checks the schedule validation was written with, kept as the reference
+    work_operations: dict = defaultdict(list)
+    tech_operations: dict = defaultdict(list)
+    for operation in operations:
+        work_operations[operation["work_id"]].append(operation)
+        if operation["resource_id"] is not None:
+            tech_operations[operation["resource_id"]].append(operation)
+
+    for tech_rows in tech_operations.values():
+        timeline = TechTimeline(tech=None, group=None)
+        for operation in tech_rows:
+            timeline.add(operation["start"], operation["end"], operation["id"])
+        for operation in tech_rows:
+            if len(timeline.overlapping(operation["start"], operation["end"], pause)) > 1:
+                operation["error"], operation["error_description"] = True, NO_PAUSE_ERROR
+        for operation in tech_rows:
+            exec_time = operation["end"] - operation["start"]
+            if exec_time <= calendar.longest_interval and calendar.overlaps_break(operation["start"], operation["end"]):
+                operation["error"], operation["error_description"] = True, OPERATION_IN_BREAK_ERROR
+
+    for work_rows in work_operations.values():
+        for i in range(1, len(work_rows)):
+            if work_rows[i - 1]["end"] >= work_rows[i]["start"]:
+                work_rows[i - 1]["error"], work_rows[i - 1]["error_description"] = True, OPERATIONS_ORDER_ERROR
+                work_rows[i]["error"], work_rows[i]["error_description"] = True, OPERATIONS_ORDER_ERROR
+            elif work_rows[i]["end"].date() > work_rows[i]["deadline"]:
+                work_rows[i]["error"], work_rows[i]["error_description"] = True, DEADLINE_ERROR
+
+    return [operation for work_rows in work_operations.values() for operation in work_rows]
+
+
+class ScheduleValidationTest(SimpleTestCase):
+    start = datetime(2024, 3, 25, 4, 0, tzinfo=pytz.UTC)
+    pause = timedelta(minutes=5)
+
+    def setUp(self):
+        self.calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS)
+
+    def _row(self, work_id, tech: str | None, start_minute: int, minutes: int, deadline: date) -> dict:
+        start = self.start + timedelta(minutes=start_minute)
+        return {
+            "id": uuid.uuid4(),
+            "work_id": work_id,
+            "resource_id": tech,
+            "start": start,
+            "end": start + timedelta(minutes=minutes),
+            "deadline": deadline,
+            "error": False,
+            "error_description": "",
+        }
+
+    def _descriptions(self, operations: list[dict]) -> dict:
+        return {operation["id"]: operation["error_description"] for operation in operations}
+
+    def test_reports_every_error_class(self):
+        first_work, second_work = uuid.uuid4(), uuid.uuid4()
+        deadline = self.start.date()
+        rows = [
+            self._row(first_work, "a", 0, 30, deadline),
+            # Starts before the previous operation of the work ends
+            self._row(first_work, "b", 20, 30, deadline),
+            # Less than 5 minutes after the operation of the same technician
+            self._row(second_work, "a", 32, 20, deadline),
+            # Goes into the 08:00-09:00 break
+            self._row(second_work, "c", 230, 20, deadline),
+            # Ends the day after the deadline
+            self._row(second_work, "c", 1440, 20, deadline),
+        ]
+        operations = validate_schedule(rows, self.calendar, self.pause)
+
+        self.assertEqual(
+            [operation["error_description"] for operation in operations],
+            [OPERATIONS_ORDER_ERROR, OPERATIONS_ORDER_ERROR, NO_PAUSE_ERROR, OPERATION_IN_BREAK_ERROR, DEADLINE_ERROR],
+        )
+
+    def test_checks_explicit_predecessors(self):
+        work_id, work_type_id = uuid.uuid4(), uuid.uuid4()
+        deadline = self.start.date() + timedelta(days=1)
+        rows = [
+            # Both designs run at once, the milling starts before the second one ends
+            self._row(work_id, "a", 0, 60, deadline),
+            self._row(work_id, "b", 0, 60, deadline),
+            self._row(work_id, "c", 30, 60, deadline),
+        ]
+        for ordinal, row in enumerate(rows, start=1):
+            row["ordinal_number"], row["work"] = ordinal, {"work_type": {"id": work_type_id}}
+        precedence = WorkTypePrecedence([(work_type_id, 3, [2])])
+        operations = validate_schedule(rows, self.calendar, self.pause, precedence)
+
+        self.assertEqual(
+            [operation["error_description"] for operation in operations],
+            ["", OPERATIONS_ORDER_ERROR, OPERATIONS_ORDER_ERROR],
+        )
+
+    def test_matches_row_by_row_validation(self):
+        rng = random.Random(0)
+        deadlines = [self.start.date() + timedelta(days=days) for days in range(4)]
+        works = [(uuid.uuid4(), rng.choice(deadlines)) for _ in range(150)]
+        techs = [f"tech{number}@example.com" for number in range(6)] + [None]
+        rows = []
+        for _ in range(400):
+            work_id, deadline = rng.choice(works)
+            minutes = rng.choice((5, 20, 45, 90, 300, 600))
+            rows.append(self._row(work_id, rng.choice(techs), rng.randrange(0, 4 * 1440, 5), minutes, deadline))
+
+        expected = validate_with_loops(copy.deepcopy(rows), self.calendar, self.pause)
+        operations = validate_schedule(rows, self.calendar, self.pause)
+
+        self.assertEqual([operation["id"] for operation in operations], [operation["id"] for operation in expected])
+        self.assertEqual(self._descriptions(operations), self._descriptions(expected))
+        self.assertTrue(all(operation["error"] == bool(operation["error_description"]) for operation in operations))
+
+
+class CapacityGridTest(SimpleTestCase):
+    monday = datetime(2024, 3, 25, tzinfo=pytz.UTC)
+
+    def test_bins_working_time_by_technician_and_day(self):
+        calendar = WorkCalendar(WorkCalendar.DEFAULT_SHIFTS)
+        index = TimelineIndex(calendar)
+        techs = [User(email=f"tech{number}@example.com") for number in range(2)]
+        index.add_technician(techs[0], "MO")
+        # Away on Tuesday morning
+        absence = (self.monday + timedelta(days=1, hours=4), self.monday + timedelta(days=1, hours=8))
+        index.add_technician(techs[1], "MO", calendar.with_absences([absence]))
+
+        busy = [
+            (techs[0].id, self.monday + timedelta(hours=4), 60),
+            # Longer than any working interval: 3 hours on Monday after the break, 5 hours on Tuesday
+            (techs[1].id, self.monday + timedelta(hours=10), 8 * 60),
+            # Started on Sunday, before the range
+            (techs[0].id, self.monday - timedelta(hours=20), 30),
+        ]
+        grid = CapacityGrid.build(index, busy, self.monday.date(), 2)
+
+        self.assertEqual(grid.minutes(grid.booked[0]), [60, 0])
+        self.assertEqual(grid.minutes(grid.booked[1]), [180, 300])
+        self.assertEqual(grid.minutes(grid.available[0]), [480, 480])
+        self.assertEqual(grid.minutes(grid.available[1]), [480, 240])
+
+        booked, available = grid.by_group()["MO"]
+        self.assertEqual(grid.minutes(booked), [240, 300])
+        self.assertEqual(grid.minutes(available), [960, 720])
@@ -17,9 +17,37 @@ urlpatterns = [
         views.get_operations_for_schedule,
         name="operations-for-schedule",
     ),
+    path(
+        "free-slots/<str:group>/<str:date_start>/<str:date_end>",
+        views.get_free_slots,
+        name="free-slots",
+    ),
+    path(
+        "capacity/<str:date_start>/<str:date_end>",
+        views.get_capacity,
+        name="capacity",
+    ),
+    path("order-slack", views.get_order_slack, name="order-slack"),
+    path(
+        "schedule-export/<str:date_start>/<str:date_end>",
+        views.export_schedule,
+        name="schedule-export",
+    ),
     path("update-operation", views.update_operation, name="update-operation"),
     path("assign-operation", views.assign_operation, name="operation-assignment"),
     path("plan", views.generate_optimized_plan, name="generate-optimized-plan"),
+    path("plan/jobs", views.create_plan_job, name="create-plan-job"),
+    path("plan/jobs/<str:job_id>", views.get_plan_job, name="plan-job"),
+    path("plan/drafts", views.create_plan_draft, name="create-plan-draft"),
+    path("plan/drafts/<str:job_id>", views.get_plan_draft, name="plan-draft"),
+    path("plan/drafts/<str:job_id>/apply", views.apply_plan_draft, name="apply-plan-draft"),
+    path("plan/incremental", views.generate_incremental_plan, name="generate-incremental-plan"),
     path("plan/apply", views.apply_optimized_plan, name="apply-optimized-plan"),
     path("assign-operations/order", views.assign_order_operations, name="assign-operations-order"),
+    path("assign-operations/orders", views.assign_orders_operations, name="assign-operations-orders"),
+    path(
+        "assign-operations/order/<str:order_id>",
+        views.get_order_assignment_job,
+        name="order-assignment-job",
+    ),
 ]
@@ -1,5 +1,5 @@
 from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.utils import extend_schema, OpenApiParameter, PolymorphicProxySerializer
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated
@@ -82,6 +82,115 @@ def get_operations_for_schedule(request, date_start: str):
     return OperationService().get_for_schedule(date_start)
 
 
+@extend_schema(
+    operation_id="get_free_slots",
+    responses=FreeSlotSerializer(many=True),
+    parameters=[
+        OpenApiParameter(
+            name="group",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.PATH,
+            enum=OperationType.OperationGroup.values,
+        ),
+        OpenApiParameter(
+            name="date_start",
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.PATH,
+        ),
+        OpenApiParameter(
+            name="date_end",
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.PATH,
+        ),
+        OpenApiParameter(
+            name="min_duration",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description="Minimal slot length in minutes",
+        ),
+    ],
+)
+@api_view(["GET"])
+@permission_classes([IsLabAdmin])
+def get_free_slots(request, group: str, date_start: str, date_end: str):
+    return OperationService.get_free_slots(request, group, date_start, date_end)
+
+
+@extend_schema(
+    operation_id="get_capacity",
+    responses=CapacitySerializer,
+    parameters=[
+        OpenApiParameter(
+            name="date_start",
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.PATH,
+        ),
+        OpenApiParameter(
+            name="date_end",
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.PATH,
+        ),
+    ],
+)
+@api_view(["GET"])
+@permission_classes([IsLabAdmin])
+def get_capacity(request, date_start: str, date_end: str):
+    return OperationService.get_capacity(date_start, date_end)
+
+
+@extend_schema(
+    operation_id="get_order_slack",
+    responses=OrderSlackSerializer(many=True),
+)
+@api_view(["GET"])
+@permission_classes([IsLabAdmin])
+def get_order_slack(request):
+    return OperationService.get_order_slack()
+
+
+@extend_schema(
+    operation_id="export_schedule",
+    responses={
+        (200, "application/x-ndjson"): OpenApiTypes.STR,
+        (200, "text/csv"): OpenApiTypes.STR,
+    },
+    parameters=[
+        OpenApiParameter(
+            name="date_start",
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.PATH,
+        ),
+        OpenApiParameter(
+            name="date_end",
+            type=OpenApiTypes.DATE,
+            location=OpenApiParameter.PATH,
+            description="Last day of the range, inclusive",
+        ),
+        OpenApiParameter(
+            name="file_format",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=["ndjson", "csv"],
+        ),
+        OpenApiParameter(
+            name="tech_email",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="group",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=OperationType.OperationGroup.values,
+        ),
+    ],
+)
+@api_view(["GET"])
+@permission_classes([IsLabAdmin])
+def export_schedule(request, date_start: str, date_end: str):
+    return OperationService.export_schedule(request, date_start, date_end)
+
+
 @extend_schema(
     operation_id="update_operation",
     request=SetOperationDataSerializer,
@@ -105,7 +214,7 @@ def assign_operation(request):
 @extend_schema(
     operation_id="update_operation_status",
     request=UpdateOperationStatusSerializer,
-    responses=OperationSerializer,
+    responses=UpdatedOperationSerializer,
     parameters=[
         OpenApiParameter(
             name="operation_id",
@@ -129,17 +238,88 @@ class OperationStatusesList(ListAPIView):
 
 @extend_schema(
     operation_id="generate_optimized_plan",
-    responses=OperationForScheduleSerializer(many=True),
+    request=GeneratePlanSerializer,
+    responses=PolymorphicProxySerializer(
+        component_name="GeneratedPlan",
+        serializers=[OperationForScheduleSerializer(many=True), OptimizedPlanSerializer],
+        resource_type_field_name=None,
+        many=False,
+    ),
 )
 @api_view(["POST"])
 @permission_classes([IsLabAdmin])
 def generate_optimized_plan(request):
-    return OperationService.generate_optimized_plan()
+    return OperationService.generate_optimized_plan(request)
+
+
+@extend_schema(
+    operation_id="create_plan_job",
+    request=GeneratePlanSerializer,
+    responses={200: PlanJobSerializer, 202: PlanJobSerializer},
+)
+@api_view(["POST"])
+@permission_classes([IsLabAdmin])
+def create_plan_job(request):
+    return OperationService.create_plan_job(request)
+
+
+@extend_schema(
+    operation_id="get_plan_job",
+    responses=PlanJobSerializer,
+)
+@api_view(["GET"])
+@permission_classes([IsLabAdmin])
+def get_plan_job(request, job_id: str):
+    return OperationService.get_plan_job(job_id)
+
+
+@extend_schema(
+    operation_id="generate_incremental_plan",
+    request=IncrementalPlanSerializer,
+    responses=OperationForScheduleSerializer(many=True),
+)
+@api_view(["POST"])
+@permission_classes([IsLabAdmin])
+def generate_incremental_plan(request):
+    return OperationService.generate_incremental_plan(request)
+
+
+@extend_schema(
+    operation_id="create_plan_draft",
+    request=GeneratePlanSerializer,
+    responses=PlanDraftSerializer,
+)
+@api_view(["POST"])
+@permission_classes([IsLabAdmin])
+def create_plan_draft(request):
+    return OperationService.create_plan_draft(request)
+
+
+@extend_schema(
+    operation_id="get_plan_draft",
+    responses=PlanDraftSerializer,
+)
+@api_view(["GET"])
+@permission_classes([IsLabAdmin])
+def get_plan_draft(request, job_id: str):
+    return OperationService.get_plan_draft(job_id)
+
+
+@extend_schema(
+    operation_id="apply_plan_draft",
+    request=None,
+    responses={200: None, 409: PlanConflictsSerializer},
+)
+@api_view(["POST"])
+@permission_classes([IsLabAdmin])
+def apply_plan_draft(request, job_id: str):
+    return OperationService.apply_plan_draft(job_id)
 
 
 @extend_schema(
     operation_id="apply_optimized_plan",
     request=ApplyOperationsPlanSerializer,
+    responses={200: None, 409: PlanConflictsSerializer},
 )
 @api_view(["POST"])
 @permission_classes([IsLabAdmin])
@@ -155,3 +335,23 @@ def apply_optimized_plan(request):
 @permission_classes([IsLabAdmin])
 def assign_order_operations(request):
     return OperationService.assign_order_operations(request)
+
+
+@extend_schema(
+    operation_id="get_order_assignment_job",
+    responses=PlanJobSerializer,
+)
+@api_view(["GET"])
+@permission_classes([IsLabAdmin])
+def get_order_assignment_job(request, order_id: str):
+    return OperationService.get_order_assignment_job(order_id)
+
+
+@extend_schema(
+    operation_id="assign_orders_operations",
+    request=AssignOrdersOperations,
+)
+@api_view(["POST"])
+@permission_classes([IsLabAdmin])
+def assign_orders_operations(request):
+    return OperationService.assign_orders_operations(request)
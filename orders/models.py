@@ -6,7 +6,7 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
-from core.models import BaseModel
+from core.models import BaseModel, schedule_version_trigger
 from works.models import Work
 
 User = get_user_model()
@@ -102,6 +102,7 @@ class Order(BaseModel):
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        triggers = [schedule_version_trigger("deadline", "status_id", "is_active")]
 
     def __str__(self):
         return f"Заказ для {self.user.last_name} {self.user.first_name}, дата создания: {self.order_date}"
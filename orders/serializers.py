@@ -73,6 +73,29 @@ class OrderCreationResponseSerializer(serializers.Serializer):
     order_id = serializers.UUIDField(required=True)
 
 
+class SimulatedWorkTypeSerializer(serializers.Serializer):
+    work_type_id = serializers.UUIDField(required=True)
+    amount = serializers.IntegerField(required=True, min_value=1)
+
+
+class OrderSimulationSerializer(serializers.Serializer):
+    work_types = SimulatedWorkTypeSerializer(many=True, allow_empty=False)
+
+
+class SimulatedWorkSerializer(serializers.Serializer):
+    work_type_id = serializers.UUIDField()
+    amount = serializers.IntegerField()
+    cost = serializers.FloatField()
+    finish = serializers.DateTimeField(allow_null=True)
+
+
+class OrderSimulationResultSerializer(serializers.Serializer):
+    works = SimulatedWorkSerializer(many=True)
+    cost = serializers.FloatField()
+    finish = serializers.DateTimeField(allow_null=True)
+    deadline = serializers.DateField(allow_null=True)
+
+
 class LoadOrderFilesSerializer(serializers.Serializer):
     files = serializers.ListField(child=serializers.FileField())
 
@@ -2,10 +2,13 @@ import base64
 import calendar
 import mimetypes
 import os
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Type, BinaryIO
+from uuid import UUID, uuid4
 
 from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
 from django.db.models import Q
 from django.http import HttpResponse, Http404
 from django.shortcuts import get_object_or_404
@@ -14,10 +17,19 @@ from rest_framework.response import Response
 
 from accounts.models import DentalLabData
 from core.paginations import StandardResultsSetPagination
+from operations.models import Operation, WorkTypeOperationType
+from operations.scheduling import (
+    PlanOperation,
+    ScheduleSnapshot,
+    TimelineIndex,
+    TimelinePlanner,
+    WorkTypePrecedence,
+)
+from operations.service import OperationService
 from orders.reports import Report
 from orders.serializers import *
 from orders.serializers import GetFileDataSerializer
-from works.models import Work, WorkStatus
+from works.models import Work, WorkStatus, WorkType
 
 
 class OrderService:
@@ -72,6 +84,87 @@ class OrderService:
         serializer = OrderCreationResponseSerializer(instance={"order_id": order.id})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @staticmethod
+    def simulate_order(request) -> Response:
+        """
+        Projects when an order with the given works would be finished if it was confirmed now,
+        planning its operations into a copy of the current technician timelines. Nothing is saved.
+        """
+        serializer = OrderSimulationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data["work_types"]
+        work_types = WorkType.objects.in_bulk({item["work_type_id"] for item in items})
+        unknown = [str(item["work_type_id"]) for item in items if item["work_type_id"] not in work_types]
+        if unknown:
+            return Response({"work_types": [f"Неизвестный тип работы {', '.join(unknown)}"]},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        steps: dict[UUID, list[WorkTypeOperationType]] = defaultdict(list)
+        for step in (
+            WorkTypeOperationType.objects
+            .filter(work_type_id__in=work_types.keys())
+            .select_related("operation_type")
+            .order_by("ordinal_number")
+        ):
+            steps[step.work_type_id].append(step)
+        precedence = WorkTypePrecedence(
+            (step.work_type_id, step.ordinal_number, step.predecessors)
+            for work_type_steps in steps.values()
+            for step in work_type_steps
+        )
+
+        order = Order(discount=0)
+        works: list[Work] = []
+        operations: list[PlanOperation] = []
+        for item in items:
+            work = Work(work_type=work_types[item["work_type_id"]], amount=item["amount"], order=order)
+            works.append(work)
+            for step in steps[work.work_type_id]:
+                operations.append(PlanOperation(
+                    id=uuid4(),
+                    work_id=work.id,
+                    ordinal_number=step.ordinal_number,
+                    group=step.operation_type.group,
+                    duration=step.operation_type.get_exec_duration(work.amount),
+                    deadline=None,
+                    is_exec_start_editable=True,
+                    tech_id=None,
+                    exec_start=None,
+                    predecessors=precedence.get(work.work_type_id, step.ordinal_number),
+                ))
+
+        def plan(index: TimelineIndex) -> dict[UUID, datetime]:
+            TimelinePlanner(index).plan(operations, operations)
+            finish: dict[UUID, datetime] = {}
+            for op in operations:
+                end = index.calendar.end_of(op.exec_start, op.get_exec_duration())
+                finish[op.work_id] = max(finish.get(op.work_id, end), end)
+            return finish
+
+        try:
+            finish = ScheduleSnapshot.run(plan)
+        except ValueError as e:
+            return Response({"work_types": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        order_finish = max(finish.values(), default=None)
+        result = {
+            "works": [
+                {
+                    "work_type_id": work.work_type_id,
+                    "amount": work.amount,
+                    "cost": work.get_cost(),
+                    "finish": finish.get(work.id),
+                }
+                for work in works
+            ],
+            "cost": round(sum(work.get_cost() for work in works), 2),
+            "finish": order_finish,
+            "deadline": order_finish.date() if order_finish else None,
+        }
+        return Response(OrderSimulationResultSerializer(result).data)
+
     @staticmethod
     def load_order_files(request, order_id: int) -> Response:
         files = request.FILES.getlist("files")
@@ -128,6 +221,9 @@ class OrderService:
                 work.discount = work_validated["discount"]
                 work.save()
 
+            # Operations are generated and placed in background, see the order assignment job
+            OperationService.create_order_assignment_job(order, request.user)
+
             order_serializer = OrderWithPhysicianSerializer(order)
             return Response(order_serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
@@ -161,13 +257,17 @@ class OrderService:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         order = serializer.validated_data["order"]
-        order.comment_after_accept = serializer.validated_data["comment_after_accept"]
-        order.status = OrderStatus.get_defect_status()
-        order.save()
+        with transaction.atomic():
+            order.comment_after_accept = serializer.validated_data["comment_after_accept"]
+            order.status = OrderStatus.get_defect_status()
+            order.save()
 
-        for work in serializer.validated_data["works"]:
-            work.work_status = WorkStatus.get_defect_status()
-            work.save()
+            for work in serializer.validated_data["works"]:
+                work.work_status = WorkStatus.get_defect_status()
+                work.save()
+
+            # The defective works are redone, their remaining operations no longer hold the technicians
+            OperationService.release_and_backfill(Operation.objects.filter(work__in=serializer.validated_data["works"]))
 
         return Response(status=status.HTTP_200_OK)
 
@@ -178,7 +278,9 @@ class OrderService:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         order = serializer.validated_data["order"]
-        order.status = OrderStatus.get_canceled_status()
-        order.save()
+        with transaction.atomic():
+            order.status = OrderStatus.get_canceled_status()
+            order.save()
+            OperationService.release_and_backfill(Operation.objects.filter(work__order=order))
 
         return Response(status=status.HTTP_200_OK)
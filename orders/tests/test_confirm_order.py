@@ -0,0 +1,61 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from core.tests import ScheduleTestCase
+from operations.models import Operation, PlanJob
+from orders.models import OrderStatus
+
+
+class OrderConfirmationTest(ScheduleTestCase):
+    url = "/api/orders"
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order(self.next_monday() + timedelta(days=7), "Работа 1", "Работа 2", status_number=1)
+        # The operations of a new order are generated once it is confirmed
+        operations = Operation.objects.filter(work__order=self.order)
+        self.operations_count = operations.count()
+        operations.delete()
+
+    def confirm(self):
+        data = {
+            "order_discount_data": {"id": str(self.order.id), "discount": 5},
+            "works_discounts_data": [{"id": str(work.id), "discount": 0} for work in self.order.works.all()],
+        }
+        return self.client.post(f"{self.url}/confirm-order/", data, format="json")
+
+    def test_confirmed_order_is_assigned_in_background(self):
+        with mock.patch("operations.service.run_in_background") as run_in_background:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.confirm()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.order.works.first().operations.count(), 0)
+        job = PlanJob.objects.get(order=self.order)
+        self.assertEqual(job.mode, PlanJob.ORDER_ASSIGNMENT_MODE)
+        self.assertEqual(job.status, PlanJob.Status.PENDING)
+        run_in_background.assert_called_once()
+        func, job_id = run_in_background.call_args.args
+        self.assertEqual(job_id, job.id)
+
+        func(job_id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PlanJob.Status.DONE)
+        operations = self.order_operations(self.order)
+        self.assertEqual(len(operations), self.operations_count)
+        self.assertTrue(all(operation.tech_id and operation.exec_start > timezone.now() for operation in operations))
+        self.assertEqual({row["id"] for row in job.result}, {str(operation.id) for operation in operations})
+
+        response = self.client.get(f"/api/operations/assign-operations/order/{self.order.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(job.id))
+
+    def test_unconfirmed_order_has_no_job(self):
+        self.assertEqual(self.order.status, OrderStatus.objects.get(number=1))
+
+        response = self.client.get(f"/api/operations/assign-operations/order/{self.order.id}")
+
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.test import override_settings
+
+from accounts.models import User
+from core.tests import ScheduleTestCase
+from operations.models import Operation
+
+
+class ReleaseAndBackfillTest(ScheduleTestCase):
+    url = "/api/orders"
+
+    def setUp(self):
+        super().setUp()
+        self.monday = self.next_monday()
+        tech = User.objects.get(email="tech1@gmail.com")
+        self.order = self.create_order(self.monday + timedelta(days=7), "Работа 1")
+        self.released = self.order_operations(self.order)[0]
+        Operation.objects.filter(id=self.released.id).update(tech=tech, exec_start=self.moment(self.monday, 4))
+        # A later modelling operation of the same technician is pulled forward into the released time
+        self.later = self.order_operations(self.create_order(self.monday + timedelta(days=7), "Работа 1"))[0]
+        Operation.objects.filter(id=self.later.id).update(
+            tech=tech, exec_start=self.moment(self.monday + timedelta(days=1), 4)
+        )
+
+    def incremental_plan(self) -> set[str]:
+        response = self.client.post("/api/operations/plan/incremental", {}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return {operation["id"] for operation in response.data}
+
+    def test_cancelled_order_is_released(self):
+        response = self.client.post(f"{self.url}/cancel-order", {"order": str(self.order.id)}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.released.refresh_from_db()
+        self.later.refresh_from_db()
+        self.assertIsNone(self.released.tech_id)
+        self.assertIsNone(self.released.exec_start)
+        self.assertEqual(self.later.exec_start, self.moment(self.monday, 4))
+        # The released operations are not planned again
+        released = {str(operation.id) for operation in self.order_operations(self.order)}
+        self.assertFalse(self.incremental_plan() & released)
+
+    def test_defective_work_is_released(self):
+        response = self.client.post(
+            f"{self.url}/report-defect",
+            {"order": str(self.order.id), "works": [str(self.released.work_id)]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.released.refresh_from_db()
+        self.assertIsNone(self.released.exec_start)
+        self.assertNotIn(str(self.released.id), self.incremental_plan())
+
+    @override_settings(BACKFILL_CANDIDATES=0)
+    def test_backfill_candidates_limit(self):
+        self.client.post(f"{self.url}/cancel-order", {"order": str(self.order.id)}, format="json")
+
+        self.later.refresh_from_db()
+        self.assertEqual(self.later.exec_start, self.moment(self.monday + timedelta(days=1), 4))
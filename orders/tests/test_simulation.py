@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime
+
+from django.utils import timezone
+
+from core.models import ScheduleVersion
+from core.tests import ScheduleTestCase
+from operations.models import Operation, ScheduleEntry
+from orders.models import Order
+from works.models import Work, WorkType
+
+
+class OrderSimulationTest(ScheduleTestCase):
+    url = "/api/orders"
+
+    def simulate(self, *work_types: tuple[WorkType | str, int]):
+        data = {"work_types": [{"work_type_id": str(getattr(work_type, "id", work_type)), "amount": amount}
+                               for work_type, amount in work_types]}
+        return self.client.post(f"{self.url}/simulate-order/", data, format="json")
+
+    def test_simulate_order(self):
+        first, second = WorkType.objects.get(name="Работа 1"), WorkType.objects.get(name="Работа 2")
+        self.create_order(self.next_monday(), "Работа 1")
+        counts = (Order.objects.count(), Work.objects.count(), Operation.objects.count(), ScheduleEntry.objects.count())
+        version = ScheduleVersion.current()
+
+        response = self.simulate((first, 2), (second, 1))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["works"][0]["work_type_id"], str(first.id))
+        self.assertEqual(response.data["works"][0]["cost"], float(first.cost * 2))
+        self.assertEqual(response.data["cost"], float(first.cost * 2 + second.cost))
+        finishes = [datetime.fromisoformat(work["finish"]) for work in response.data["works"]]
+        self.assertTrue(all(finish > timezone.now() for finish in finishes))
+        self.assertEqual(datetime.fromisoformat(response.data["finish"]), max(finishes))
+        self.assertEqual(response.data["deadline"], max(finishes).date().isoformat())
+
+        # Nothing is saved
+        self.assertEqual(
+            (Order.objects.count(), Work.objects.count(), Operation.objects.count(), ScheduleEntry.objects.count()),
+            counts,
+        )
+        self.assertEqual(ScheduleVersion.current(), version)
+
+    def test_simulate_unknown_work_type(self):
+        response = self.simulate((uuid.uuid4(), 1))
+        self.assertEqual(response.status_code, 400)
+
+    def test_simulate_invalid_request(self):
+        response = self.simulate()
+        self.assertEqual(response.status_code, 400)
+
+        response = self.simulate((WorkType.objects.get(name="Работа 1"), 0))
+        self.assertEqual(response.status_code, 400)
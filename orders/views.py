@@ -62,6 +62,17 @@ def create_order(request):
     return OrderService.create_order(request)
 
 
+@extend_schema(
+    operation_id="simulate_order",
+    request=OrderSimulationSerializer,
+    responses=OrderSimulationResultSerializer,
+)
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def simulate_order(request):
+    return OrderService.simulate_order(request)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
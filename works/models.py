@@ -7,7 +7,7 @@ from django.contrib.postgres.fields import ArrayField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-from core.models import BaseModel
+from core.models import BaseModel, schedule_version_trigger
 
 if TYPE_CHECKING:
     from orders.models import Order
@@ -79,6 +79,7 @@ class Work(BaseModel):
     class Meta:
         verbose_name = "Работа"
         verbose_name_plural = "Работы"
+        triggers = [schedule_version_trigger("work_status_id", "is_active")]
 
     def __str__(self):
         return (
@@ -108,11 +109,12 @@ class Work(BaseModel):
     def get_discount(self) -> float:
         return max(self.discount, self.order.discount)
 
+    @staticmethod
+    def calculate_cost(type_cost: Decimal, amount: int, discount: int) -> float:
+        return round(type_cost * amount * Decimal.from_float(1 - discount / 100), 2)
+
     def get_cost(self) -> float:
-        return round(
-            self.work_type.cost * self.amount * Decimal.from_float(1 - self.get_discount() / 100),
-            2,
-        )
+        return Work.calculate_cost(self.work_type.cost, self.amount, self.get_discount())
 
 
 # История изменения статусов работ
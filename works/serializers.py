@@ -61,6 +61,7 @@ class OperationForWorkSerializer(serializers.ModelSerializer):
             "exec_start",
             "ordinal_number",
             "exec_time",
+            "duration",
         ]
 
     def get_exec_time(self, obj: Operation) -> time:
@@ -1,9 +1,11 @@
+from collections import defaultdict
+
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 
 from orders.models import Order
 from .models import Work
-from operations.models import OperationStatus, Operation
+from operations.models import OperationStatus, Operation, WorkTypeOperationType
 from .serializers import WorkSerializer, WorkAndOperationsSerializer
 
 
@@ -14,6 +16,36 @@ class WorkService:
         serializer = WorkSerializer(works, many=True)
         return Response(serializer.data)
 
+    @staticmethod
+    def generate_operations(order: Order) -> None:
+        """
+        Creates the operations of the work type for every work of the order that has no operations yet.
+        """
+        works = list(order.works.filter(operations__isnull=True))
+        steps = (
+            WorkTypeOperationType.objects
+            .filter(work_type_id__in={work.work_type_id for work in works})
+            .order_by("ordinal_number")
+        )
+        steps_by_work_type = defaultdict(list)
+        for step in steps:
+            steps_by_work_type[step.work_type_id].append(step)
+
+        status = OperationStatus.get_default_status()
+        Operation.objects.bulk_create(
+            [
+                Operation(
+                    work=work,
+                    operation_type_id=step.operation_type_id,
+                    operation_status=status,
+                    ordinal_number=step.ordinal_number,
+                )
+                for work in works
+                for step in steps_by_work_type[work.work_type_id]
+            ],
+            ignore_conflicts=True,
+        )
+
     @staticmethod
     def get_works_with_operations(order_id):
         """
@@ -21,22 +53,7 @@ class WorkService:
         An operation list is generated for each item if it has not been generated previously.
         """
         order = get_object_or_404(Order, id=order_id)
-        works = order.works.all()
-        for work in works:
-            if work.operations.count() == 0:
-                for operation_type, through in zip(
-                    work.work_type.operation_types.all(),
-                    work.work_type.operation_types.through.objects.all(),
-                ):
-                    try:
-                        Operation.objects.create(
-                            work=work,
-                            operation_type=operation_type,
-                            operation_status=OperationStatus.get_default_status(),
-                            ordinal_number=through.ordinal_number,
-                        )
-                    except:
-                        pass
+        WorkService.generate_operations(order)
 
         serializer = WorkAndOperationsSerializer(order.works, many=True)
         return Response(serializer.data)